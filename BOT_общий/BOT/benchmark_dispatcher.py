@@ -0,0 +1,153 @@
+"""
+Бенчмарк диспетчеров напоминаний: APScheduler (задача на напоминание) и min-heap
+Используется: python benchmark_dispatcher.py [размер ...]
+По умолчанию: 10000 100000 1000000
+
+Без БД и Telegram замеряются:
+- планирование N напоминаний на ближайшие сутки
+- перепланирование и отмена по 10% из них
+- извлечение наступивших 10% (как при срабатывании)
+- память на одно напоминание (tracemalloc, на выборке до 100000)
+
+APScheduler хранит задачи в отсортированном списке, поэтому на 1 000 000
+его замер идёт несколько минут.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from bot.utils.dispatcher import APSchedulerDispatcher, HeapDispatcher
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+MEMORY_SAMPLE = 100_000
+SHARE = 0.1
+
+async def noop(reminder_id: int):
+    """Callback напоминания (в бенчмарке не вызывается)"""
+
+def make_times(size: int, base: datetime) -> list:
+    """Случайные моменты в течение суток после base"""
+    rng = random.Random(size)
+    return [base + timedelta(seconds=rng.uniform(0, 86400)) for _ in range(size)]
+
+class APSchedulerCase:
+    name = "apscheduler"
+
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler(timezone=timezone.utc)
+        # На паузе задачи попадают в хранилище, но не выполняются
+        self.scheduler.start(paused=True)
+        self.dispatcher = APSchedulerDispatcher(self.scheduler, noop)
+
+    def pop_due(self, now: datetime) -> int:
+        """Как BaseScheduler._process_jobs: выбрать наступившие и удалить выполненные date-задачи"""
+        jobstore = self.scheduler._lookup_jobstore('default')
+        due = jobstore.get_due_jobs(now.replace(tzinfo=timezone.utc))
+        for job in due:
+            jobstore.remove_job(job.id)
+        return len(due)
+
+    def close(self):
+        self.scheduler.shutdown(wait=False)
+
+class HeapCase:
+    name = "heap"
+
+    def __init__(self):
+        self.dispatcher = HeapDispatcher(noop, datetime.utcnow)
+
+    def pop_due(self, now: datetime) -> int:
+        return len(self.dispatcher.pop_due(now))
+
+    def close(self):
+        pass
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def run_case(case_class, size: int, base: datetime, times: list) -> dict:
+    """Замерить один диспетчер на одном размере"""
+    case = case_class()
+    dispatcher = case.dispatcher
+    sample = random.Random(0).sample(range(size), int(size * SHARE))
+
+    def schedule_all():
+        for reminder_id, run_at in enumerate(times):
+            dispatcher.schedule(reminder_id, run_at)
+
+    def reschedule():
+        for reminder_id in sample:
+            dispatcher.schedule(reminder_id, times[reminder_id] + timedelta(minutes=5))
+
+    def cancel():
+        for reminder_id in sample:
+            dispatcher.cancel(reminder_id)
+
+    result = {
+        'schedule': timed(schedule_all),
+        'reschedule': timed(reschedule),
+        'cancel': timed(cancel),
+    }
+    cutoff = base + timedelta(seconds=86400 * SHARE)
+    start = time.perf_counter()
+    fired = case.pop_due(cutoff)
+    result['pop_due'] = time.perf_counter() - start
+    result['fired'] = fired
+    case.close()
+    return result
+
+def measure_memory(case_class, times: list) -> float:
+    """Байт на одно запланированное напоминание"""
+    tracemalloc.start()
+    case = case_class()
+    before = tracemalloc.get_traced_memory()[0]
+    for reminder_id, run_at in enumerate(times):
+        case.dispatcher.schedule(reminder_id, run_at)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    case.close()
+    return (after - before) / len(times)
+
+def format_rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>14,.0f}/с" if seconds else f"{'-':>16}"
+
+async def run(sizes: list):
+    base = datetime.utcnow()
+    for size in sizes:
+        times = make_times(size, base)
+        changed = int(size * SHARE)
+        print(f"\n=== {size:,} напоминаний ===")
+        print(f"{'':<12}{'планирование':>16}{'перепланир.':>16}{'отмена':>16}{'срабатывание':>16}{'время, с':>10}{'байт/шт':>10}")
+        for case_class in (APSchedulerCase, HeapCase):
+            result = run_case(case_class, size, base, times)
+            memory = measure_memory(case_class, times[:MEMORY_SAMPLE])
+            total = result['schedule'] + result['reschedule'] + result['cancel'] + result['pop_due']
+            print(
+                f"{case_class.name:<12}"
+                f"{format_rate(size, result['schedule'])}"
+                f"{format_rate(changed, result['reschedule'])}"
+                f"{format_rate(changed, result['cancel'])}"
+                f"{format_rate(result['fired'], result['pop_due'])}"
+                f"{total:>10.2f}"
+                f"{memory:>10.0f}"
+            )
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    # APScheduler пишет в лог каждую добавленную задачу
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(sizes))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,9 +10,55 @@ class Config:
     # Telegram
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     ADMIN_ID = int(os.getenv('ADMIN_ID', 0))
+    # Адрес Bot API (например, локальный fake_telegram.py: http://127.0.0.1:8081/bot); пусто - api.telegram.org
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+    # Приём обновлений: 'polling' (getUpdates) или 'webhook' (встроенный сервер aiohttp)
+    BOT_MODE = os.getenv('BOT_MODE', 'polling')
+    # Публичный адрес, на который Telegram шлёт обновления (без пути), и путь webhook
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))
+    # Секретный токен: Telegram передаёт его в заголовке каждого запроса
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', 40))
+    # Сколько обновлений разных пользователей обрабатывается одновременно
+    # (обновления одного пользователя - всегда по очереди); 1 - последовательная обработка
+    UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', 16))
     
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./student_tracker.db')
+    # Асинхронный драйвер (asyncpg / aiosqlite); False - синхронная сессия в пуле потоков
+    DB_ASYNC = os.getenv('DB_ASYNC', 'True').lower() == 'true'
+    # URL для асинхронного engine (по умолчанию выводится из DATABASE_URL)
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
+    # Реплики только для чтения (через запятую); пусто - всё читается с основной БД
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # Сколько секунд после своей записи пользователь читает с основной БД (отставание реплик)
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+    
+    # Пул соединений (для SQLite - один писатель и SQLITE_READ_POOL_SIZE читателей)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    # Через сколько секунд соединение переоткрывается
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    # Сколько секунд ждать свободного соединения
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    
+    # SQLite: прагмы соединений и разделение на писателя и читателей
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # Отрицательное значение - размер кеша в КиБ
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_READ_POOL_SIZE = int(os.getenv('SQLITE_READ_POOL_SIZE', 4))
+    # Сколько секунд транзакция ждёт своей очереди к писателю
+    SQLITE_WRITE_TIMEOUT = int(os.getenv('SQLITE_WRITE_TIMEOUT', 30))
+    
+    # Кеш пользователей (telegram_id -> id, роль)
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
     
     # Google Calendar
     GOOGLE_CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json')
@@ -22,7 +69,58 @@ class Config:
     
     # Приложение
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+    # Напоминания: в памяти держатся только те, что наступят в ближайшие N минут (0 - все будущие)
+    REMINDER_WINDOW_MINUTES = int(os.getenv('REMINDER_WINDOW_MINUTES', 10))
+    # Диспетчер напоминаний: 'apscheduler' (задача на напоминание) или 'heap' (min-heap и один таск)
+    REMINDER_DISPATCHER = os.getenv('REMINDER_DISPATCHER', 'apscheduler')
+    # Наступившие напоминания отправляются пачками: размер пачки, задержка сбора (с), параллельных отправок
+    REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 100))
+    REMINDER_BATCH_DELAY = float(os.getenv('REMINDER_BATCH_DELAY', 0.2))
+    REMINDER_SEND_CONCURRENCY = int(os.getenv('REMINDER_SEND_CONCURRENCY', 10))
+    # Напоминания одного чата из одной пачки объединяются в сообщение (не больше N в сообщении)
+    REMINDER_COALESCE_MAX = int(os.getenv('REMINDER_COALESCE_MAX', 10))
+    # Доставка: 'local' (один процесс) или 'lease' (воркеры арендуют напоминания в БД, без дублей)
+    REMINDER_DELIVERY = os.getenv('REMINDER_DELIVERY', 'local')
+    WORKER_ID = os.getenv('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+    # Срок аренды: после него напоминание упавшего воркера забирает другой
+    REMINDER_LEASE_SECONDS = int(os.getenv('REMINDER_LEASE_SECONDS', 120))
+    # Как часто искать наступившие никем не отправленные напоминания (с)
+    REMINDER_POLL_SECONDS = int(os.getenv('REMINDER_POLL_SECONDS', 15))
+    # Напоминания старше этого (мин.) больше не пытаются отправить
+    REMINDER_LEASE_LOOKBACK_MINUTES = int(os.getenv('REMINDER_LEASE_LOOKBACK_MINUTES', 60))
+    # Как часто подгружать следующее окно напоминаний (секунды)
+    REMINDER_SWEEP_SECONDS = int(os.getenv('REMINDER_SWEEP_SECONDS', 60))
+    # После запуска досылаются напоминания, пропущенные за последние N минут (0 - не досылать)
+    REMINDER_CATCHUP_GRACE_MINUTES = int(os.getenv('REMINDER_CATCHUP_GRACE_MINUTES', 60))
+    # Досылка: не больше N сообщений в секунду, пропущенные читаются из БД порциями
+    REMINDER_CATCHUP_RATE = int(os.getenv('REMINDER_CATCHUP_RATE', 10))
+    REMINDER_CATCHUP_CHUNK = int(os.getenv('REMINDER_CATCHUP_CHUNK', 500))
+    # Оповещения о сроках задач: за сколько минут до срока (через запятую, пусто - выключены)
+    TASK_DUE_ALERT_OFFSETS = [int(x) for x in os.getenv('TASK_DUE_ALERT_OFFSETS', '1440,60').split(',') if x.strip()]
+    # Как часто искать задачи с приближающимся сроком (с)
+    TASK_DUE_ALERT_INTERVAL = int(os.getenv('TASK_DUE_ALERT_INTERVAL', 60))
+    # Ежедневная сводка: подписчики читаются порциями по N, не больше M сообщений в секунду
+    DIGEST_CHUNK_SIZE = int(os.getenv('DIGEST_CHUNK_SIZE', 1000))
+    DIGEST_SEND_RATE = float(os.getenv('DIGEST_SEND_RATE', 25))
+    # Рассылка: получатели читаются порциями по N (после каждой - контрольная точка),
+    # прогресс обновляется раз в N секунд, рассылку упавшего воркера забирают через N секунд
+    BROADCAST_CHUNK_SIZE = int(os.getenv('BROADCAST_CHUNK_SIZE', 50))
+    BROADCAST_PROGRESS_SECONDS = float(os.getenv('BROADCAST_PROGRESS_SECONDS', 5))
+    BROADCAST_LEASE_SECONDS = int(os.getenv('BROADCAST_LEASE_SECONDS', 120))
+    # Интервал сверки счётчиков статистики (минуты)
+    STATS_RECONCILE_INTERVAL = int(os.getenv('STATS_RECONCILE_INTERVAL', 60))
     TIMEZONE = os.getenv('TIMEZONE', 'Europe/Moscow')
+    # Очередь исходящих сообщений: общий лимит (сообщений/с и всплеск), интервал для одного чата
+    # и для группы (с, ответы пользователю его не ждут), одновременных запросов к API, повторов после RetryAfter
+    OUTBOX_RATE = float(os.getenv('OUTBOX_RATE', 30))
+    OUTBOX_BURST = int(os.getenv('OUTBOX_BURST', 30))
+    OUTBOX_CHAT_INTERVAL = float(os.getenv('OUTBOX_CHAT_INTERVAL', 1.0))
+    OUTBOX_GROUP_INTERVAL = float(os.getenv('OUTBOX_GROUP_INTERVAL', 3.0))
+    OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', 20))
+    OUTBOX_MAX_RETRIES = int(os.getenv('OUTBOX_MAX_RETRIES', 3))
+    # Эндпоинт метрик Prometheus (/metrics); 0 - выключен
+    METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
     
     # Логирование
     LOG_LEVEL = 'DEBUG' if DEBUG else 'INFO'
@@ -31,6 +129,10 @@ class Config:
     def validate():
         """Проверка обязательных переменных"""
         required = ['BOT_TOKEN', 'ADMIN_ID']
+        if Config.BOT_MODE == 'webhook':
+            required += ['WEBHOOK_URL', 'WEBHOOK_SECRET']
+        elif Config.BOT_MODE != 'polling':
+            raise ValueError(f"Неизвестный BOT_MODE: {Config.BOT_MODE} (polling или webhook)")
         missing = [var for var in required if not os.getenv(var)]
         if missing:
             raise ValueError(f"Отсутствуют переменные окружения: {', '.join(missing)}")
@@ -1,9 +1,10 @@
 from .start import start_command, help_command, cancel_command
-from .tasks import add_task_command, my_tasks_command, task_callback_handler, TASK_TITLE, TASK_DESC, TASK_PRIORITY, TASK_DUE_DATE
-from .reminders import add_reminder_command, my_reminders_command, reminder_callback_handler, send_reminder, REMINDER_TITLE, REMINDER_DESC, REMINDER_TIME
+from .tasks import add_task_command, my_tasks_command, tasks_page_callback, complete_tasks_command, tasks_select_callback, task_callback_handler, send_due_alert, TASK_TITLE, TASK_DESC, TASK_PRIORITY, TASK_DUE_DATE
+from .reminders import add_reminder_command, my_reminders_command, reminders_page_callback, reminder_callback_handler, send_reminder, REMINDER_TITLE, REMINDER_DESC, REMINDER_TIME, REMINDER_REPEAT
 from .calendar import add_event_command, calendar_command, today_events_command, event_callback_handler, EVENT_TITLE, EVENT_START, EVENT_END, EVENT_DESC, EVENT_LOCATION, EVENT_TYPE
-from .admin import admin_command, grant_admin_command, user_list_command, broadcast_command, broadcast_message_handler, users_stats_command, system_info_command
+from .admin import admin_command, grant_admin_command, user_list_command, users_page_callback, broadcast_command, broadcast_message_handler, users_stats_command, system_info_command, reminder_stats_command
 from .stats import stats_command
+from .digest import digest_command, send_digest
 
 __all__ = [
     'start_command',
@@ -11,9 +12,14 @@ __all__ = [
     'cancel_command',
     'add_task_command',
     'my_tasks_command',
+    'tasks_page_callback',
+    'complete_tasks_command',
+    'tasks_select_callback',
     'task_callback_handler',
+    'send_due_alert',
     'add_reminder_command',
     'my_reminders_command',
+    'reminders_page_callback',
     'reminder_callback_handler',
     'send_reminder',
     'add_event_command',
@@ -23,9 +29,13 @@ __all__ = [
     'admin_command',
     'grant_admin_command',
     'user_list_command',
+    'users_page_callback',
     'broadcast_command',
     'broadcast_message_handler',
     'users_stats_command',
     'system_info_command',
+    'reminder_stats_command',
     'stats_command',
+    'digest_command',
+    'send_digest',
 ]
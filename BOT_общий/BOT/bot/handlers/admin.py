@@ -1,217 +1,311 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
-from database.crud import UserCRUD, StatisticCRUD
-from database.database import SessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncStatisticCRUD, AsyncBroadcastCRUD
+from database.pool_metrics import get_pool_stats
 from bot.keyboards.reply import get_admin_menu_keyboard
-from bot.keyboards.inline import get_yes_no_keyboard
+from bot.keyboards.inline import get_yes_no_keyboard, get_pagination_keyboard
+from bot.utils.helpers import parse_page_callback
+from bot.utils.delivery_metrics import delivery_metrics
+from bot.utils.outbox import outbox
+from bot.utils.broadcaster import broadcaster, format_broadcast_progress
 import logging
 
 logger = logging.getLogger(__name__)
 
+USERS_PER_PAGE = 10
+
 async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Админ-панель"""
-    db = SessionLocal()
-    try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
-            await update.message.reply_text("❌ У вас нет доступа к админ-панели.")
-            return
-        
-        admin_text = """
+    db = context.db
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ У вас нет доступа к админ-панели.")
+        return
+    
+    admin_text = """
 🔑 <b>Админ-панель</b>
 
 Доступные команды:
 /grant_admin - Назначить администратора
 /user_list - Список пользователей
 /broadcast - Отправить сообщение всем пользователям
+/broadcast status|pause|resume|cancel - Управление текущей рассылкой
 /users_stats - Статистика по пользователям
 /system_info - Информация о системе
+/reminder_stats - Задержка доставки напоминаний
 """
-        
-        await update.message.reply_text(
-            admin_text,
-            parse_mode=ParseMode.HTML,
-            reply_markup=get_admin_menu_keyboard()
-        )
-    finally:
-        db.close()
+    
+    await update.message.reply_text(
+        admin_text,
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_admin_menu_keyboard()
+    )
 
 async def grant_admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Назначить администратора"""
-    db = SessionLocal()
+    db = context.db
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ Только администраторы могут назначать админов.")
+        return
+    
+    if not context.args:
+        await update.message.reply_text(
+            "Использование: /grant_admin <telegram_id>"
+        )
+        return
+    
     try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
-            await update.message.reply_text("❌ Только администраторы могут назначать админов.")
-            return
-        
-        if not context.args:
-            await update.message.reply_text(
-                "Использование: /grant_admin <telegram_id>"
-            )
-            return
-        
-        try:
-            target_id = int(context.args[0])
-        except ValueError:
-            await update.message.reply_text("❌ Неверный telegram_id")
-            return
-        
-        user = UserCRUD.set_admin(db, target_id, 'ADMIN')
-        
-        if user:
-            await update.message.reply_text(
-                f"✅ Пользователь {user.username} ({user.telegram_id}) назначен администратором."
-            )
-            logger.info(f"✅ Пользователь {target_id} назначен администратором")
-        else:
-            await update.message.reply_text("❌ Пользователь не найден.")
-    finally:
-        db.close()
+        target_id = int(context.args[0])
+    except ValueError:
+        await update.message.reply_text("❌ Неверный telegram_id")
+        return
+    
+    user = await AsyncUserCRUD.set_admin(db, target_id, 'ADMIN')
+    
+    if user:
+        await update.message.reply_text(
+            f"✅ Пользователь {user.username} ({user.telegram_id}) назначен администратором."
+        )
+        logger.info(f"✅ Пользователь {target_id} назначен администратором")
+    else:
+        await update.message.reply_text("❌ Пользователь не найден.")
+
+async def build_users_page(db, page: int = 1, after_id: int = None, before_id: int = None):
+    """Сформировать страницу списка пользователей: (текст, клавиатура) или None"""
+    total = await AsyncUserCRUD.count(db)
+    if not total:
+        return None
+    
+    users = await AsyncUserCRUD.get_page(db, limit=USERS_PER_PAGE, after_id=after_id, before_id=before_id)
+    if not users:
+        page = 1
+        users = await AsyncUserCRUD.get_page(db, limit=USERS_PER_PAGE)
+    
+    total_pages = (total + USERS_PER_PAGE - 1) // USERS_PER_PAGE
+    page = max(1, min(page, total_pages))
+    
+    message_text = f"👥 <b>Список пользователей ({total})</b>\n\n"
+    
+    for user in users:
+        message_text += f"<b>{user.full_name or 'Unknown'}</b>\n"
+        message_text += f"ID: {user.telegram_id}\n"
+        message_text += f"Username: @{user.username or 'N/A'}\n"
+        message_text += f"Роль: {user.role}\n"
+        message_text += f"Создан: {user.created_at.strftime('%d.%m.%Y')}\n\n"
+    
+    keyboard = get_pagination_keyboard(
+        page, total_pages, "users", first_id=users[0].id, last_id=users[-1].id
+    ) if total_pages > 1 else None
+    
+    return message_text, keyboard
 
 async def user_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Список всех пользователей"""
-    db = SessionLocal()
-    try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
-            await update.message.reply_text("❌ Только администраторы могут просматривать список пользователей.")
-            return
-        
-        from database.models import User
-        users = db.query(User).all()
-        
-        if not users:
-            await update.message.reply_text("📭 Нет пользователей в системе.")
-            return
-        
-        message_text = f"👥 <b>Список пользователей ({len(users)})</b>\n\n"
-        
-        for user in users:
-            message_text += f"<b>{user.full_name or 'Unknown'}</b>\n"
-            message_text += f"ID: {user.telegram_id}\n"
-            message_text += f"Username: @{user.username or 'N/A'}\n"
-            message_text += f"Роль: {user.role}\n"
-            message_text += f"Создан: {user.created_at.strftime('%d.%m.%Y')}\n\n"
-        
-        await update.message.reply_text(
-            message_text,
-            parse_mode=ParseMode.HTML
-        )
-    finally:
-        db.close()
+    db = context.db_read
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ Только администраторы могут просматривать список пользователей.")
+        return
+    
+    users_page = await build_users_page(db)
+    
+    if not users_page:
+        await update.message.reply_text("📭 Нет пользователей в системе.")
+        return
+    
+    message_text, keyboard = users_page
+    
+    await update.message.reply_text(
+        message_text,
+        parse_mode=ParseMode.HTML,
+        reply_markup=keyboard
+    )
+
+async def users_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Переключение страниц списка пользователей"""
+    query = update.callback_query
+    await query.answer()
+    
+    db = context.db_read
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        return
+    
+    page, after_id, before_id = parse_page_callback(query.data)
+    users_page = await build_users_page(db, page, after_id, before_id)
+    
+    if not users_page:
+        await query.edit_message_text("📭 Нет пользователей в системе.")
+        return
+    
+    message_text, keyboard = users_page
+    
+    await query.edit_message_text(
+        text=message_text,
+        parse_mode=ParseMode.HTML,
+        reply_markup=keyboard
+    )
+
+BROADCAST_ACTIONS = {
+    'pause': (broadcaster.pause, "⏸ Рассылка #{id} поставлена на паузу.", "❌ Рассылка #{id} не идёт."),
+    'resume': (broadcaster.resume, "▶️ Рассылка #{id} продолжена.", "❌ Рассылка #{id} не на паузе."),
+    'cancel': (broadcaster.cancel, "⏹ Рассылка #{id} отменена.", "❌ Рассылку #{id} уже не отменить."),
+}
 
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Начать массовую рассылку"""
-    db = SessionLocal()
-    try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
-            await update.message.reply_text("❌ Только администраторы могут отправлять рассылки.")
+    """Начать массовую рассылку или управлять текущей (/broadcast status|pause|resume|cancel)"""
+    db = context.db
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ Только администраторы могут отправлять рассылки.")
+        return
+    
+    if context.args:
+        action = context.args[0].lower()
+        if action != 'status' and action not in BROADCAST_ACTIONS:
+            await update.message.reply_text("❌ Используйте: /broadcast [status|pause|resume|cancel]")
             return
         
-        context.user_data['is_broadcasting'] = True
+        broadcast = await AsyncBroadcastCRUD.get_current(db)
+        if broadcast is None:
+            await update.message.reply_text("📭 Нет идущих или приостановленных рассылок.")
+            return
+        if action == 'status':
+            await update.message.reply_text(format_broadcast_progress(broadcast))
+            return
         
-        await update.message.reply_text(
-            "📢 Введите текст для рассылки всем пользователям:\n\n"
-            "(Поддерживает HTML разметку)"
-        )
-    finally:
-        db.close()
+        handler, done_text, failed_text = BROADCAST_ACTIONS[action]
+        changed = await handler(broadcast.id)
+        await update.message.reply_text((done_text if changed else failed_text).format(id=broadcast.id))
+        return
+    
+    context.user_data['is_broadcasting'] = True
+    
+    await update.message.reply_text(
+        "📢 Введите текст для рассылки всем пользователям:\n\n"
+        "(Поддерживает HTML разметку)"
+    )
 
 async def broadcast_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик текста для рассылки"""
     if not context.user_data.get('is_broadcasting'):
         return
     
-    db = SessionLocal()
+    db = context.db
     try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
+        if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
             return
         
-        from database.models import User
-        from bot.main import bot_instance
-        
-        message_text = update.message.text
-        users = db.query(User).all()
-        
-        success_count = 0
-        for user in users:
-            try:
-                await bot_instance.send_message(
-                    chat_id=user.telegram_id,
-                    text=message_text,
-                    parse_mode=ParseMode.HTML
-                )
-                success_count += 1
-            except Exception as e:
-                logger.warning(f"⚠️ Не удалось отправить сообщение пользователю {user.telegram_id}: {e}")
-        
-        await update.message.reply_text(
-            f"✅ Рассылка завершена.\n"
-            f"Успешно отправлено: {success_count}/{len(users)}"
-        )
+        # Рассылка идёт в фоне; прогресс обновляется в отдельном сообщении
+        await broadcaster.submit(update.effective_user.id, update.message.text, update.effective_chat.id)
         
         context.user_data['is_broadcasting'] = False
-        logger.info(f"📢 Рассылка отправлена {success_count} пользователям")
     except Exception as e:
         logger.error(f"❌ Ошибка при рассылке: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка при отправке рассылки.")
-    finally:
-        db.close()
 
 async def users_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Статистика по пользователям"""
-    db = SessionLocal()
-    try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
-            await update.message.reply_text("❌ Только администраторы могут просматривать статистику.")
-            return
-        
-        from database.models import User, Statistic
-        
-        total_users = db.query(User).count()
-        total_admins = db.query(User).filter(User.role.in_(['ADMIN', 'SUPERADMIN'])).count()
-        
-        stats = db.query(Statistic).all()
-        
-        total_tasks = sum(s.total_tasks for s in stats)
-        completed_tasks = sum(s.completed_tasks for s in stats)
-        total_reminders = sum(s.total_reminders for s in stats)
-        total_events = sum(s.total_events for s in stats)
-        
-        message_text = "📊 <b>Статистика системы</b>\n\n"
-        message_text += f"👥 Всего пользователей: {total_users}\n"
-        message_text += f"🔑 Администраторов: {total_admins}\n\n"
-        message_text += f"📝 Всего задач: {total_tasks}\n"
-        message_text += f"✅ Завершено задач: {completed_tasks}\n"
-        message_text += f"🔔 Всего напоминаний: {total_reminders}\n"
-        message_text += f"📅 Всего событий: {total_events}\n"
-        
-        await update.message.reply_text(
-            message_text,
-            parse_mode=ParseMode.HTML
-        )
-    finally:
-        db.close()
+    db = context.db_read
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ Только администраторы могут просматривать статистику.")
+        return
+    
+    total_users = await AsyncUserCRUD.count(db)
+    total_admins = await AsyncUserCRUD.count(db, admins_only=True)
+    
+    totals = await AsyncStatisticCRUD.get_totals(db)
+    
+    total_tasks = totals['total_tasks']
+    completed_tasks = totals['completed_tasks']
+    total_reminders = totals['total_reminders']
+    total_events = totals['total_events']
+    
+    message_text = "📊 <b>Статистика системы</b>\n\n"
+    message_text += f"👥 Всего пользователей: {total_users}\n"
+    message_text += f"🔑 Администраторов: {total_admins}\n\n"
+    message_text += f"📝 Всего задач: {total_tasks}\n"
+    message_text += f"✅ Завершено задач: {completed_tasks}\n"
+    message_text += f"🔔 Всего напоминаний: {total_reminders}\n"
+    message_text += f"📅 Всего событий: {total_events}\n"
+    
+    await update.message.reply_text(
+        message_text,
+        parse_mode=ParseMode.HTML
+    )
 
 async def system_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Информация о системе"""
-    db = SessionLocal()
-    try:
-        if not UserCRUD.is_admin(db, update.effective_user.id):
-            await update.message.reply_text("❌ Только администраторы могут просматривать информацию о системе.")
-            return
-        
-        from bot.config import config
-        import platform
-        
-        info_text = "⚙️ <b>Информация о системе</b>\n\n"
-        info_text += f"🐍 Python: {platform.python_version()}\n"
-        info_text += f"📝 ОС: {platform.system()} {platform.release()}\n"
-        info_text += f"🌍 Часовой пояс: {config.TIMEZONE}\n"
-        info_text += f"🔧 Режим отладки: {'Включен' if config.DEBUG else 'Отключен'}\n"
-        
-        await update.message.reply_text(
-            info_text,
-            parse_mode=ParseMode.HTML
+    db = context.db
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ Только администраторы могут просматривать информацию о системе.")
+        return
+    
+    from bot.config import config
+    import platform
+    
+    info_text = "⚙️ <b>Информация о системе</b>\n\n"
+    info_text += f"🐍 Python: {platform.python_version()}\n"
+    info_text += f"📝 ОС: {platform.system()} {platform.release()}\n"
+    info_text += f"🌍 Часовой пояс: {config.TIMEZONE}\n"
+    info_text += f"🔧 Режим отладки: {'Включен' if config.DEBUG else 'Отключен'}\n"
+    
+    pools = get_pool_stats()
+    if pools:
+        info_text += "\n🔌 <b>Пулы соединений БД</b>\n"
+    for pool in pools:
+        info_text += (
+            f"\n<b>{pool['name']}</b>\n"
+            f"  Занято: {pool['in_use']} из {pool['size']} (пик {pool['peak_in_use']}, сверх пула {pool['overflow']})\n"
+            f"  Выдано соединений: {pool['checkouts']}, из них сверх пула: {pool['overflow_checkouts']}\n"
+            f"  Ожидание: среднее {pool['wait_avg_ms']:.1f} мс, максимум {pool['wait_max_ms']:.1f} мс\n"
+            f"  Таймаутов ожидания: {pool['timeouts']}\n"
         )
-    finally:
-        db.close()
+    
+    await update.message.reply_text(
+        info_text,
+        parse_mode=ParseMode.HTML
+    )
+
+async def reminder_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задержка доставки напоминаний, очереди и ошибки отправки"""
+    db = context.db
+    if not await AsyncUserCRUD.is_admin(db, update.effective_user.id):
+        await update.message.reply_text("❌ Только администраторы могут просматривать статистику доставки.")
+        return
+    
+    stats = delivery_metrics.snapshot()
+    
+    text = "⏱️ <b>Доставка напоминаний</b>\n\n"
+    text += f"✅ Доставлено: {stats['delivered']} (досланных после простоя: {stats['delivered_late']})\n"
+    text += f"❌ Ошибок отправки: {stats['failed']}\n"
+    text += f"📊 Задержка: средняя {stats['lag_avg']:.2f} с, максимум {stats['lag_max']:.2f} с\n"
+    
+    for title, window in (("Последние отправки", stats['recent']), ("За последнюю минуту", stats['last_minute'])):
+        if window['count']:
+            text += (
+                f"\n<b>{title}</b> ({window['count']})\n"
+                f"  p50 {window['p50']:.2f} с, p95 {window['p95']:.2f} с, p99 {window['p99']:.2f} с, максимум {window['max']:.2f} с\n"
+            )
+    
+    text += "\n<b>Гистограмма задержки</b>\n"
+    for bound, count in stats['buckets']:
+        if count:
+            label = f"≤ {bound:g} с" if bound != float('inf') else "больше"
+            text += f"  {label}: {count}\n"
+    
+    queues = stats['queues']
+    if queues:
+        text += "\n<b>Очереди</b>\n"
+        text += f"  В расписании: {queues['scheduled']}\n"
+        text += f"  Ждут пачки: {queues['pending']}\n"
+        text += f"  Отправляются: {queues['in_flight']}\n"
+        text += f"  Ждут досылки: {queues['catch_up']}\n"
+    
+    depths = outbox.depths()
+    text += "\n<b>Исходящие сообщения</b>\n"
+    text += f"  Отправлено: {outbox.sent}, повторов после RetryAfter: {outbox.retries}, ошибок: {outbox.failed}\n"
+    text += f"  В очереди: {', '.join(f'{name} {depth}' for name, depth in depths.items())}\n"
+    
+    await update.message.reply_text(
+        text,
+        parse_mode=ParseMode.HTML
+    )
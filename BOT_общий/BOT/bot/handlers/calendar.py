@@ -2,8 +2,7 @@ from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
 from datetime import datetime, timedelta
-from database.crud import UserCRUD, EventCRUD
-from database.database import SessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncEventCRUD
 from bot.keyboards.reply import get_cancel_keyboard
 from bot.keyboards.inline import get_event_actions_keyboard, get_event_type_keyboard
 from bot.utils.helpers import format_event_info, format_datetime, parse_datetime_input, is_valid_datetime
@@ -130,11 +129,11 @@ async def event_type_selection(update: Update, context: ContextTypes.DEFAULT_TYP
     data = query.data
     event_type = data.split("_")[2]
     
-    db = SessionLocal()
+    db = context.db
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
         
-        event = EventCRUD.create(
+        event = await AsyncEventCRUD.create(
             db,
             user_id=user.id,
             title=context.user_data['event_title'],
@@ -155,8 +154,7 @@ async def event_type_selection(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         
         if google_event_id:
-            event.google_event_id = google_event_id
-            db.commit()
+            await AsyncEventCRUD.set_google_event_id(db, event, google_event_id)
         
         response_text = "✅ <b>Событие создано!</b>\n\n"
         response_text += format_event_info(event)
@@ -170,18 +168,17 @@ async def event_type_selection(update: Update, context: ContextTypes.DEFAULT_TYP
         logger.info(f"✅ Событие {event.id} создано")
     except Exception as e:
         logger.error(f"❌ Ошибка при создании события: {e}")
+        context.rollback_db()
         await query.edit_message_text("❌ Произошла ошибка при создании события.")
-    finally:
-        db.close()
     
     return ConversationHandler.END
 
 async def calendar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать календарь на неделю"""
-    db = SessionLocal()
+    db = context.db_read
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
-        events = EventCRUD.get_user_events(db, user.id, days_ahead=7)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        events = await AsyncEventCRUD.get_user_events(db, user.id, days_ahead=7)
         
         if not events:
             await update.message.reply_text(
@@ -201,16 +198,15 @@ async def calendar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         )
     except Exception as e:
         logger.error(f"❌ Ошибка в calendar_command: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка.")
-    finally:
-        db.close()
 
 async def today_events_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать события на сегодня"""
-    db = SessionLocal()
+    db = context.db_read
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
-        events = EventCRUD.get_today_events(db, user.id)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        events = await AsyncEventCRUD.get_today_events(db, user.id)
         
         if not events:
             await update.message.reply_text(
@@ -230,32 +226,30 @@ async def today_events_command(update: Update, context: ContextTypes.DEFAULT_TYP
         )
     except Exception as e:
         logger.error(f"❌ Ошибка в today_events_command: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка.")
-    finally:
-        db.close()
 
 async def event_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик callback для событий"""
     query = update.callback_query
     await query.answer()
     
-    db = SessionLocal()
+    db = context.db
     try:
         data = query.data
         
         if data.startswith("event_delete_"):
             event_id = int(data.split("_")[-1])
-            event = EventCRUD.get_by_id(db, event_id)
+            event = await AsyncEventCRUD.get_by_id(db, event_id)
             
             if event and event.google_event_id:
                 google_calendar.delete_event(event.google_event_id)
             
-            EventCRUD.delete(db, event_id)
+            await AsyncEventCRUD.delete(db, event_id)
             
             await query.edit_message_text("🗑️ Событие удалено.")
     
     except Exception as e:
         logger.error(f"❌ Ошибка в event_callback_handler: {e}")
+        context.rollback_db()
         await query.edit_message_text("❌ Произошла ошибка.")
-    finally:
-        db.close()
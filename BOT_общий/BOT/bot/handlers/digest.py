@@ -0,0 +1,61 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+from database.crud_async import AsyncUserCRUD
+from bot.utils.outbox import priority, PRIORITY_NOTIFICATION
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def digest_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Подписка на ежедневную сводку: /digest ЧАС или /digest off"""
+    db = context.db
+    try:
+        telegram_id = update.effective_user.id
+        await AsyncUserCRUD.ensure_identity(db, telegram_id)
+        
+        if not context.args:
+            hour = await AsyncUserCRUD.get_digest_hour(db, telegram_id)
+            status = f"приходит в {hour:02d}:00" if hour is not None else "выключена"
+            await update.message.reply_text(
+                f"🌅 <b>Ежедневная сводка</b> {status}.\n\n"
+                "События на сегодня и задачи со сроком до конца дня одним сообщением.\n"
+                "/digest 8 - присылать в 08:00\n"
+                "/digest off - выключить",
+                parse_mode=ParseMode.HTML
+            )
+            return
+        
+        arg = context.args[0].lower()
+        if arg in ("off", "выкл"):
+            await AsyncUserCRUD.set_digest_hour(db, telegram_id, None)
+            await update.message.reply_text("✅ Ежедневная сводка выключена.")
+            return
+        
+        if not arg.isdigit() or not 0 <= int(arg) <= 23:
+            await update.message.reply_text("❌ Укажите час от 0 до 23, например: /digest 8")
+            return
+        
+        hour = int(arg)
+        await AsyncUserCRUD.set_digest_hour(db, telegram_id, hour)
+        await update.message.reply_text(f"✅ Сводка будет приходить каждый день в {hour:02d}:00.")
+    except Exception as e:
+        logger.error(f"❌ Ошибка в digest_command: {e}")
+        context.rollback_db()
+        await update.message.reply_text("❌ Произошла ошибка.")
+
+async def send_digest(telegram_id: int, text: str) -> bool:
+    """Отправить ежедневную сводку пользователю (True - если доставлено)"""
+    from bot.main import bot_instance
+    
+    try:
+        await bot_instance.send_message(
+            chat_id=telegram_id,
+            text=text,
+            parse_mode=ParseMode.HTML,
+            rate_limit_args=priority(PRIORITY_NOTIFICATION)
+        )
+        return True
+    except Exception as e:
+        logger.error(f"❌ Ошибка при отправке сводки пользователю {telegram_id}: {e}")
+        return False
@@ -1,18 +1,26 @@
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
-from database.crud import UserCRUD, ReminderCRUD
-from database.database import SessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncReminderCRUD
 from bot.keyboards.reply import get_cancel_keyboard, get_reminders_menu_keyboard
-from bot.keyboards.inline import get_reminder_actions_keyboard, get_pagination_keyboard
-from bot.utils.helpers import format_reminder_info, format_datetime, paginate_list, parse_datetime_input, is_valid_datetime
+from bot.keyboards.inline import (
+    get_reminder_actions_keyboard, get_pagination_keyboard, get_reminders_group_keyboard, replace_group_keyboard_row
+)
+from bot.utils.helpers import (
+    format_reminder_info, format_datetime, parse_page_callback, parse_datetime_input, is_valid_datetime,
+    RECURRENCE_PRESETS, parse_recurrence_input
+)
 from bot.utils.scheduler import reminder_scheduler
+from bot.utils.outbox import priority, PRIORITY_REMINDER
+from functools import partial
 import logging
 
 logger = logging.getLogger(__name__)
 
 # States
-REMINDER_TITLE, REMINDER_DESC, REMINDER_TIME = range(3)
+REMINDER_TITLE, REMINDER_DESC, REMINDER_TIME, REMINDER_REPEAT = range(4)
+
+REMINDERS_PER_PAGE = 3
 
 async def add_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Начать создание напоминания"""
@@ -67,22 +75,47 @@ async def reminder_time_input(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return REMINDER_TIME
     
-    scheduled_time = parse_datetime_input(update.message.text)
+    context.user_data['reminder_time'] = parse_datetime_input(update.message.text)
+    
+    await update.message.reply_text(
+        "🔁 Повторять напоминание?\n\n"
+        f"Варианты: {', '.join(RECURRENCE_PRESETS)}\n"
+        "или правило RRULE, например <code>FREQ=WEEKLY;BYDAY=MO,FR</code>\n"
+        "Без повтора - нет или /skip",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_cancel_keyboard()
+    )
+    return REMINDER_REPEAT
+
+async def reminder_repeat_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Получить правило повторения и создать напоминание"""
+    if update.message.text == "🔙 Отмена":
+        await update.message.reply_text("❌ Создание напоминания отменено.")
+        return ConversationHandler.END
+    
+    scheduled_time = context.user_data['reminder_time']
+    recurrence_rule = parse_recurrence_input(update.message.text, scheduled_time)
+    if recurrence_rule is None:
+        await update.message.reply_text(
+            f"❌ Не удалось разобрать повторение. Варианты: {', '.join(RECURRENCE_PRESETS)}, RRULE или /skip"
+        )
+        return REMINDER_REPEAT
     
-    db = SessionLocal()
+    db = context.db
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
         
-        reminder = ReminderCRUD.create(
+        reminder = await AsyncReminderCRUD.create(
             db,
             user_id=user.id,
             title=context.user_data['reminder_title'],
             description=context.user_data.get('reminder_description'),
-            scheduled_time=scheduled_time
+            scheduled_time=scheduled_time,
+            recurrence_rule=recurrence_rule or None
         )
         
-        # Добавить в расписание
-        reminder_scheduler.add_reminder_job(reminder.id, scheduled_time)
+        # Добавить в расписание, когда напоминание будет видно в БД
+        context.after_commit(partial(reminder_scheduler.add_reminder_job, reminder.id, scheduled_time))
         
         response_text = "✅ <b>Напоминание создано!</b>\n\n"
         response_text += format_reminder_info(reminder)
@@ -96,35 +129,55 @@ async def reminder_time_input(update: Update, context: ContextTypes.DEFAULT_TYPE
         logger.info(f"✅ Напоминание {reminder.id} создано")
     except Exception as e:
         logger.error(f"❌ Ошибка при создании напоминания: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка при создании напоминания.")
-    finally:
-        db.close()
     
     return ConversationHandler.END
 
+async def build_reminders_page(db, user_id: int, page: int = 1, after_id: int = None, before_id: int = None):
+    """Сформировать страницу напоминаний: (текст, клавиатура) или None, если их нет"""
+    total = await AsyncReminderCRUD.count_user_reminders(db, user_id)
+    if not total:
+        return None
+    
+    page_reminders = await AsyncReminderCRUD.get_user_reminders_page(
+        db, user_id, limit=REMINDERS_PER_PAGE, after_id=after_id, before_id=before_id
+    )
+    if not page_reminders:
+        # Курсор устарел (напоминание удалено) - начать с первой страницы
+        page = 1
+        page_reminders = await AsyncReminderCRUD.get_user_reminders_page(db, user_id, limit=REMINDERS_PER_PAGE)
+    
+    total_pages = (total + REMINDERS_PER_PAGE - 1) // REMINDERS_PER_PAGE
+    page = max(1, min(page, total_pages))
+    
+    message_text = f"🔔 <b>Ваши напоминания ({total})</b>\n\n"
+    
+    for reminder in page_reminders:
+        message_text += format_reminder_info(reminder)
+        message_text += "\n"
+    
+    keyboard = get_pagination_keyboard(
+        page, total_pages, "reminders", first_id=page_reminders[0].id, last_id=page_reminders[-1].id
+    ) if total_pages > 1 else None
+    
+    return message_text, keyboard
+
 async def my_reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать мои напоминания"""
-    db = SessionLocal()
+    db = context.db
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
-        reminders = ReminderCRUD.get_user_reminders(db, user.id, active_only=False)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        reminders_page = await build_reminders_page(db, user.id)
         
-        if not reminders:
+        if not reminders_page:
             await update.message.reply_text(
                 "📭 У вас нет напоминаний.",
                 reply_markup=get_reminders_menu_keyboard()
             )
             return
         
-        page_reminders, page, total_pages = paginate_list(reminders, 1, 3)
-        
-        message_text = f"🔔 <b>Ваши напоминания ({len(reminders)})</b>\n\n"
-        
-        for reminder in page_reminders:
-            message_text += format_reminder_info(reminder)
-            message_text += "\n"
-        
-        keyboard = get_pagination_keyboard(page, total_pages, "reminders") if total_pages > 1 else None
+        message_text, keyboard = reminders_page
         
         await update.message.reply_text(
             message_text,
@@ -133,24 +186,59 @@ async def my_reminders_command(update: Update, context: ContextTypes.DEFAULT_TYP
         )
     except Exception as e:
         logger.error(f"❌ Ошибка в my_reminders_command: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка.")
-    finally:
-        db.close()
+
+async def reminders_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Переключение страниц списка напоминаний"""
+    query = update.callback_query
+    await query.answer()
+    
+    db = context.db
+    try:
+        page, after_id, before_id = parse_page_callback(query.data)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        reminders_page = await build_reminders_page(db, user.id, page, after_id, before_id)
+        
+        if not reminders_page:
+            await query.edit_message_text("📭 У вас нет напоминаний.")
+            return
+        
+        message_text, keyboard = reminders_page
+        
+        await query.edit_message_text(
+            text=message_text,
+            parse_mode=ParseMode.HTML,
+            reply_markup=keyboard
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка в reminders_page_callback: {e}")
+        context.rollback_db()
+        await query.edit_message_text("❌ Произошла ошибка.")
+
+def schedule_after_commit(context, reminder):
+    """Поставить напоминание в расписание или убрать из него после фиксации изменений"""
+    if reminder.is_active:
+        context.after_commit(partial(reminder_scheduler.add_reminder_job, reminder.id, reminder.scheduled_time))
+    else:
+        context.after_commit(partial(reminder_scheduler.remove_reminder_job, reminder.id))
 
 async def reminder_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик callback для напоминаний"""
     query = update.callback_query
     await query.answer()
     
-    db = SessionLocal()
+    db = context.db
     try:
         data = query.data
         
         if data.startswith("reminder_toggle_"):
             reminder_id = int(data.split("_")[-1])
-            reminder = ReminderCRUD.toggle_active(db, reminder_id)
+            reminder = await AsyncReminderCRUD.toggle_active(db, reminder_id)
             
             if reminder:
+                schedule_after_commit(context, reminder)
+                
                 await query.edit_message_text(
                     text=f"✅ <b>Напоминание обновлено!</b>\n\n{format_reminder_info(reminder)}",
                     parse_mode=ParseMode.HTML,
@@ -159,31 +247,73 @@ async def reminder_callback_handler(update: Update, context: ContextTypes.DEFAUL
         
         elif data.startswith("reminder_delete_"):
             reminder_id = int(data.split("_")[-1])
-            ReminderCRUD.delete(db, reminder_id)
-            reminder_scheduler.remove_reminder_job(reminder_id)
+            await AsyncReminderCRUD.delete(db, reminder_id)
+            context.after_commit(partial(reminder_scheduler.remove_reminder_job, reminder_id))
             
             await query.edit_message_text("🗑️ Напоминание удалено.")
+        
+        # Кнопки напоминания в сообщении с несколькими напоминаниями: меняется только его строка
+        elif data.startswith("reminder_gtoggle_"):
+            reminder_id = int(data.split("_")[-1])
+            reminder = await AsyncReminderCRUD.toggle_active(db, reminder_id)
+            
+            if reminder:
+                schedule_after_commit(context, reminder)
+                
+                await query.edit_message_reply_markup(
+                    reply_markup=replace_group_keyboard_row(query.message.reply_markup, reminder_id, reminder.is_active)
+                )
+        
+        elif data.startswith("reminder_gdelete_"):
+            reminder_id = int(data.split("_")[-1])
+            await AsyncReminderCRUD.delete(db, reminder_id)
+            context.after_commit(partial(reminder_scheduler.remove_reminder_job, reminder_id))
+            
+            await query.edit_message_reply_markup(
+                reply_markup=replace_group_keyboard_row(query.message.reply_markup, reminder_id)
+            )
     
     except Exception as e:
         logger.error(f"❌ Ошибка в reminder_callback_handler: {e}")
+        context.rollback_db()
         await query.edit_message_text("❌ Произошла ошибка.")
-    finally:
-        db.close()
 
-async def send_reminder(reminder):
-    """Отправить напоминание пользователю"""
+async def send_reminder(reminders: list, late: bool = False) -> bool:
+    """Отправить напоминания одного пользователя одним сообщением (True - если сообщение доставлено)
+
+    late - напоминания досылаются после простоя бота.
+    """
     from bot.main import bot_instance
     
+    telegram_id = reminders[0].user.telegram_id
     try:
-        text = f"🔔 <b>Напоминание!</b>\n\n{format_reminder_info(reminder)}"
+        if len(reminders) == 1:
+            reminder = reminders[0]
+            if late:
+                text = f"⏰ <b>Пропущенное напоминание</b> (было на {format_datetime(reminder.scheduled_time)})\n\n"
+            else:
+                text = "🔔 <b>Напоминание!</b>\n\n"
+            text += format_reminder_info(reminder)
+            keyboard = get_reminder_actions_keyboard(reminder.id, reminder.is_active)
+        else:
+            if late:
+                text = f"⏰ <b>Пропущенные напоминания ({len(reminders)})</b>\n\n"
+            else:
+                text = f"🔔 <b>Напоминания ({len(reminders)})</b>\n\n"
+            for number, reminder in enumerate(reminders, 1):
+                text += f"{number}. {format_reminder_info(reminder)}\n"
+            keyboard = get_reminders_group_keyboard(reminders)
         
         await bot_instance.send_message(
-            chat_id=reminder.user.telegram_id,
+            chat_id=telegram_id,
             text=text,
             parse_mode=ParseMode.HTML,
-            reply_markup=get_reminder_actions_keyboard(reminder.id, reminder.is_active)
+            reply_markup=keyboard,
+            rate_limit_args=priority(PRIORITY_REMINDER)
         )
         
-        logger.info(f"📨 Напоминание {reminder.id} отправлено пользователю {reminder.user.telegram_id}")
+        logger.info(f"📨 Напоминания {[reminder.id for reminder in reminders]} отправлены пользователю {telegram_id}")
+        return True
     except Exception as e:
         logger.error(f"❌ Ошибка при отправке напоминания: {e}")
+        return False
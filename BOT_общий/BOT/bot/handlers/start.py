@@ -1,8 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
-from database.crud import UserCRUD
-from database.database import SessionLocal
+from database.crud_async import AsyncUserCRUD
 from bot.keyboards.reply import get_main_menu_keyboard, get_admin_menu_keyboard
 from bot.utils.helpers import get_user_summary
 import logging
@@ -11,13 +10,13 @@ logger = logging.getLogger(__name__)
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик /start"""
-    db = SessionLocal()
+    db = context.db
     try:
         user = update.effective_user
         chat_id = update.effective_chat.id
         
         # Создать или получить пользователя
-        db_user = UserCRUD.get_or_create(
+        db_user = await AsyncUserCRUD.ensure_identity(
             db,
             telegram_id=user.id,
             username=user.username,
@@ -25,7 +24,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
         
         # Выбрать клавиатуру в зависимости от роли
-        if UserCRUD.is_admin(db, user.id):
+        if db_user.is_admin:
             keyboard = get_admin_menu_keyboard()
             welcome_text = f"👋 Добро пожаловать, администратор <b>{user.first_name}</b>!\n\n"
             welcome_text += "📋 Это бот для управления напоминаниями, задачами и событиями.\n\n"
@@ -46,12 +45,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         logger.info(f"✅ Пользователь {user.id} ({user.username}) запустил бота")
     except Exception as e:
         logger.error(f"❌ Ошибка в start_command: {e}")
+        context.rollback_db()
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="❌ Произошла ошибка при инициализации. Попробуйте позже."
         )
-    finally:
-        db.close()
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик /help"""
@@ -61,6 +59,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 <b>📝 Управление задачами:</b>
 /add_task - Создать новую задачу
 /my_tasks - Просмотреть активные задачи
+/complete_tasks - Завершить несколько задач сразу
 /task_stats - Статистика по задачам
 
 <b>🔔 Управление напоминаниями:</b>
@@ -75,6 +74,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 <b>📊 Статистика:</b>
 /stats - Моя статистика
+/digest - Ежедневная сводка
 /users_stats - Статистика пользователей (админ)
 
 <b>⚙️ Системные команды:</b>
@@ -1,15 +1,15 @@
-from telegram import Update, ParseMode
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
-from database.crud import UserCRUD, TaskCRUD, StatisticCRUD
-from database.database import SessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncTaskCRUD
 from database.models import TaskStatus
 from bot.keyboards.reply import get_cancel_keyboard, get_priority_keyboard, get_tasks_menu_keyboard
-from bot.keyboards.inline import get_task_actions_keyboard, get_status_keyboard, get_pagination_keyboard
+from bot.keyboards.inline import get_task_actions_keyboard, get_status_keyboard, get_tasks_list_keyboard, get_tasks_select_keyboard
 from bot.utils.helpers import (
-    format_task_info, get_priority_emoji, format_datetime, 
-    paginate_list, parse_datetime_input, is_valid_datetime
+    format_task_info, get_priority_emoji, format_datetime, get_time_until,
+    parse_page_callback, parse_datetime_input, is_valid_datetime, parse_bulk_lines
 )
+from bot.utils.outbox import priority, PRIORITY_NOTIFICATION
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,11 +17,16 @@ logger = logging.getLogger(__name__)
 # States для ConversationHandler
 TASK_TITLE, TASK_DESC, TASK_PRIORITY, TASK_DUE_DATE = range(4)
 
+TASKS_PER_PAGE = 3
+TASKS_SELECT_LIMIT = 20
+
 async def add_task_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Начать создание задачи"""
     await update.message.reply_text(
         "📝 <b>Создание новой задачи</b>\n\n"
-        "Введите название задачи:",
+        "Введите название задачи.\n\n"
+        "Чтобы создать сразу несколько задач, отправьте список - по задаче в строке, "
+        "срок можно указать через «|»: <i>Курсовая | 30.11.2025 14:30</i>",
         parse_mode=ParseMode.HTML,
         reply_markup=get_cancel_keyboard()
     )
@@ -33,6 +38,10 @@ async def task_title_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await update.message.reply_text("❌ Создание задачи отменено.")
         return ConversationHandler.END
     
+    items = parse_bulk_lines(update.message.text)
+    if len(items) > 1:
+        return await create_tasks_from_lines(update, context, items)
+    
     context.user_data['task_title'] = update.message.text
     
     await update.message.reply_text(
@@ -42,6 +51,33 @@ async def task_title_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     )
     return TASK_DESC
 
+async def create_tasks_from_lines(update: Update, context: ContextTypes.DEFAULT_TYPE, items: list) -> int:
+    """Создать несколько задач из многострочного сообщения"""
+    db = context.db
+    try:
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        tasks = await AsyncTaskCRUD.bulk_create(db, user.id, items)
+        
+        response_text = f"✅ <b>Создано задач: {len(tasks)}</b>\n\n"
+        for task in tasks[:10]:
+            response_text += format_task_info(task)
+        if len(tasks) > 10:
+            response_text += f"\n... и ещё {len(tasks) - 10}"
+        
+        await update.message.reply_text(
+            response_text,
+            parse_mode=ParseMode.HTML,
+            reply_markup=get_tasks_menu_keyboard()
+        )
+        
+        logger.info(f"✅ {len(tasks)} задач создано пользователем {update.effective_user.id}")
+    except Exception as e:
+        logger.error(f"❌ Ошибка при создании задач списком: {e}")
+        context.rollback_db()
+        await update.message.reply_text("❌ Произошла ошибка при создании задач.")
+    
+    return ConversationHandler.END
+
 async def task_description_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Получить описание задачи"""
     if update.message.text == "🔙 Отмена":
@@ -72,8 +108,8 @@ async def task_priority_input(update: Update, context: ContextTypes.DEFAULT_TYPE
         "🟢 Низкий": 3
     }
     
-    priority = priority_map.get(update.message.text, 3)
-    context.user_data['task_priority'] = priority
+    task_priority = priority_map.get(update.message.text, 3)
+    context.user_data['task_priority'] = task_priority
     
     await update.message.reply_text(
         "📅 Введите срок выполнения в формате ДД.МММ.ГГГГ ЧЧ:МИ\n"
@@ -101,11 +137,11 @@ async def task_due_date_input(update: Update, context: ContextTypes.DEFAULT_TYPE
     context.user_data['task_due_date'] = due_date
     
     # Создать задачу
-    db = SessionLocal()
+    db = context.db
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
         
-        task = TaskCRUD.create(
+        task = await AsyncTaskCRUD.create(
             db,
             user_id=user.id,
             title=context.user_data['task_title'],
@@ -114,9 +150,6 @@ async def task_due_date_input(update: Update, context: ContextTypes.DEFAULT_TYPE
             due_date=due_date
         )
         
-        # Обновить статистику
-        StatisticCRUD.update_stats(db, user.id)
-        
         response_text = "✅ <b>Задача создана успешно!</b>\n\n"
         response_text += format_task_info(task)
         
@@ -129,36 +162,53 @@ async def task_due_date_input(update: Update, context: ContextTypes.DEFAULT_TYPE
         logger.info(f"✅ Задача {task.id} создана пользователем {update.effective_user.id}")
     except Exception as e:
         logger.error(f"❌ Ошибка при создании задачи: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка при создании задачи.")
-    finally:
-        db.close()
     
     return ConversationHandler.END
 
+async def build_tasks_page(db, user_id: int, page: int = 1, after_id: int = None, before_id: int = None):
+    """Сформировать страницу задач: (текст, клавиатура) или None, если задач нет"""
+    total = await AsyncTaskCRUD.count_user_tasks(db, user_id)
+    if not total:
+        return None
+    
+    page_tasks = await AsyncTaskCRUD.get_user_tasks_page(
+        db, user_id, limit=TASKS_PER_PAGE, after_id=after_id, before_id=before_id
+    )
+    if not page_tasks:
+        # Курсор устарел (задача удалена) - начать с первой страницы
+        page = 1
+        page_tasks = await AsyncTaskCRUD.get_user_tasks_page(db, user_id, limit=TASKS_PER_PAGE)
+    
+    total_pages = (total + TASKS_PER_PAGE - 1) // TASKS_PER_PAGE
+    page = max(1, min(page, total_pages))
+    
+    message_text = f"📋 <b>Ваши задачи ({total} всего)</b>\n\n"
+    
+    for task in page_tasks:
+        message_text += format_task_info(task)
+        message_text += "\n"
+    
+    keyboard = get_tasks_list_keyboard(page, total_pages, first_id=page_tasks[0].id, last_id=page_tasks[-1].id)
+    
+    return message_text, keyboard
+
 async def my_tasks_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать мои задачи"""
-    db = SessionLocal()
+    db = context.db_read
     try:
-        user = UserCRUD.get_by_telegram_id(db, update.effective_user.id)
-        tasks = TaskCRUD.get_user_tasks(db, user.id)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        tasks_page = await build_tasks_page(db, user.id)
         
-        if not tasks:
+        if not tasks_page:
             await update.message.reply_text(
                 "📭 У вас нет задач. Создайте первую!",
                 reply_markup=get_tasks_menu_keyboard()
             )
             return
         
-        # Пагинация
-        page_tasks, page, total_pages = paginate_list(tasks, 1, 3)
-        
-        message_text = f"📋 <b>Ваши задачи ({len(tasks)} всего)</b>\n\n"
-        
-        for task in page_tasks:
-            message_text += format_task_info(task)
-            message_text += "\n"
-        
-        keyboard = get_pagination_keyboard(page, total_pages, "tasks") if total_pages > 1 else None
+        message_text, keyboard = tasks_page
         
         await update.message.reply_text(
             message_text,
@@ -168,22 +218,132 @@ async def my_tasks_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         
     except Exception as e:
         logger.error(f"❌ Ошибка в my_tasks_command: {e}")
+        context.rollback_db()
+        await update.message.reply_text("❌ Произошла ошибка при получении задач.")
+
+async def tasks_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Переключение страниц списка задач"""
+    query = update.callback_query
+    await query.answer()
+    
+    db = context.db_read
+    try:
+        page, after_id, before_id = parse_page_callback(query.data)
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        tasks_page = await build_tasks_page(db, user.id, page, after_id, before_id)
+        
+        if not tasks_page:
+            await query.edit_message_text("📭 У вас нет задач. Создайте первую!")
+            return
+        
+        message_text, keyboard = tasks_page
+        
+        await query.edit_message_text(
+            text=message_text,
+            parse_mode=ParseMode.HTML,
+            reply_markup=keyboard
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка в tasks_page_callback: {e}")
+        context.rollback_db()
+        await query.edit_message_text("❌ Произошла ошибка при получении задач.")
+
+async def complete_tasks_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Выбрать несколько задач и завершить их одним действием"""
+    db = context.db
+    try:
+        user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+        tasks = await AsyncTaskCRUD.get_open_tasks(db, user.id, limit=TASKS_SELECT_LIMIT)
+        
+        if not tasks:
+            await update.message.reply_text("📭 Нет незавершённых задач.")
+            return
+        
+        context.user_data['select_tasks'] = {task.id: task.title for task in tasks}
+        context.user_data['selected_tasks'] = set()
+        
+        await update.message.reply_text(
+            "☑️ <b>Выберите задачи для завершения:</b>",
+            parse_mode=ParseMode.HTML,
+            reply_markup=get_tasks_select_keyboard(context.user_data['select_tasks'], set())
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка в complete_tasks_command: {e}")
+        context.rollback_db()
         await update.message.reply_text("❌ Произошла ошибка при получении задач.")
-    finally:
-        db.close()
+
+async def tasks_select_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Множественный выбор задач: отметка, завершение выбранных, отмена"""
+    query = update.callback_query
+    await query.answer()
+    
+    db = context.db
+    try:
+        data = query.data
+        
+        if data == "tasks_select_start":
+            user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+            tasks = await AsyncTaskCRUD.get_open_tasks(db, user.id, limit=TASKS_SELECT_LIMIT)
+            if not tasks:
+                await query.edit_message_text("📭 Нет незавершённых задач.")
+                return
+            
+            context.user_data['select_tasks'] = {task.id: task.title for task in tasks}
+            context.user_data['selected_tasks'] = set()
+            await query.edit_message_text(
+                text="☑️ <b>Выберите задачи для завершения:</b>",
+                parse_mode=ParseMode.HTML,
+                reply_markup=get_tasks_select_keyboard(context.user_data['select_tasks'], set())
+            )
+        
+        elif data == "tasks_select_cancel":
+            context.user_data.pop('select_tasks', None)
+            context.user_data.pop('selected_tasks', None)
+            await query.edit_message_text("❌ Выбор отменён.")
+        
+        elif data == "tasks_complete_selected":
+            selected = context.user_data.pop('selected_tasks', set())
+            context.user_data.pop('select_tasks', None)
+            if not selected:
+                await query.edit_message_text("❌ Не выбрано ни одной задачи.")
+                return
+            
+            user = await AsyncUserCRUD.get_identity(db, update.effective_user.id)
+            completed = await AsyncTaskCRUD.bulk_update_status(
+                db, user.id, list(selected), TaskStatus.COMPLETED.value
+            )
+            await query.edit_message_text(f"✅ Завершено задач: {len(completed)}")
+            logger.info(f"✅ Пользователь {update.effective_user.id} завершил задачи {completed}")
+        
+        elif data.startswith("tasks_select_"):
+            task_id = int(data.split("_")[-1])
+            tasks = context.user_data.get('select_tasks', {})
+            selected = context.user_data.setdefault('selected_tasks', set())
+            if task_id not in tasks:
+                return
+            
+            selected.symmetric_difference_update({task_id})
+            await query.edit_message_reply_markup(
+                reply_markup=get_tasks_select_keyboard(tasks, selected)
+            )
+    
+    except Exception as e:
+        logger.error(f"❌ Ошибка в tasks_select_callback: {e}")
+        context.rollback_db()
+        await query.edit_message_text("❌ Произошла ошибка.")
 
 async def task_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик callback для задач"""
     query = update.callback_query
     await query.answer()
     
-    db = SessionLocal()
+    db = context.db
     try:
         data = query.data
         
         if data.startswith("task_complete_"):
             task_id = int(data.split("_")[-1])
-            task = TaskCRUD.update_status(db, task_id, TaskStatus.COMPLETED.value)
+            task = await AsyncTaskCRUD.update_status(db, task_id, TaskStatus.COMPLETED.value)
             
             if task:
                 await query.edit_message_text(
@@ -194,7 +354,7 @@ async def task_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
         
         elif data.startswith("task_delete_"):
             task_id = int(data.split("_")[-1])
-            TaskCRUD.delete(db, task_id)
+            await AsyncTaskCRUD.delete(db, task_id)
             
             await query.edit_message_text(
                 text="🗑️ Задача удалена."
@@ -206,7 +366,7 @@ async def task_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
             status = parts[1]
             task_id = int(parts[2])
             
-            task = TaskCRUD.update_status(db, task_id, status)
+            task = await AsyncTaskCRUD.update_status(db, task_id, status)
             
             if task:
                 await query.edit_message_text(
@@ -217,6 +377,28 @@ async def task_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     except Exception as e:
         logger.error(f"❌ Ошибка в task_callback_handler: {e}")
+        context.rollback_db()
         await query.edit_message_text("❌ Произошла ошибка.")
-    finally:
-        db.close()
+
+async def send_due_alert(telegram_id: int, tasks: list, now) -> bool:
+    """Отправить сводное оповещение о приближающихся сроках задач (True - если доставлено)"""
+    from bot.main import bot_instance
+    
+    try:
+        text = "⏳ <b>Приближаются сроки задач</b>\n\n"
+        for task in tasks:
+            text += f"{get_priority_emoji(task.priority)} <b>{task.title}</b>\n"
+            text += f"Срок: {format_datetime(task.due_date)} ({get_time_until(task.due_date, now)})\n\n"
+        
+        await bot_instance.send_message(
+            chat_id=telegram_id,
+            text=text,
+            parse_mode=ParseMode.HTML,
+            rate_limit_args=priority(PRIORITY_NOTIFICATION)
+        )
+        
+        logger.info(f"📨 Оповещение о сроках {len(tasks)} задач отправлено пользователю {telegram_id}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Ошибка при отправке оповещения о сроках: {e}")
+        return False
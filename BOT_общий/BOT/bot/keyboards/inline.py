@@ -28,6 +28,39 @@ def get_reminder_actions_keyboard(reminder_id: int, is_active: bool):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+def get_reminders_group_keyboard(reminders: list):
+    """Кнопки действий для нескольких напоминаний в одном сообщении (строка на напоминание)"""
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                f"{number}. {'⏸️ Отключить' if reminder.is_active else '▶️ Включить'}",
+                callback_data=f"reminder_gtoggle_{reminder.id}"
+            ),
+            InlineKeyboardButton(f"{number}. 🗑️ Удалить", callback_data=f"reminder_gdelete_{reminder.id}")
+        ]
+        for number, reminder in enumerate(reminders, 1)
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+def replace_group_keyboard_row(markup: InlineKeyboardMarkup, reminder_id: int, is_active: bool = None):
+    """Обновить строку напоминания в групповой клавиатуре (is_active=None - убрать строку)"""
+    keyboard = []
+    for row in markup.inline_keyboard:
+        if row[0].callback_data != f"reminder_gtoggle_{reminder_id}":
+            keyboard.append(list(row))
+            continue
+        if is_active is None:
+            continue
+        number = row[0].text.split(".", 1)[0]
+        keyboard.append([
+            InlineKeyboardButton(
+                f"{number}. {'⏸️ Отключить' if is_active else '▶️ Включить'}",
+                callback_data=row[0].callback_data
+            ),
+            row[1]
+        ])
+    return InlineKeyboardMarkup(keyboard) if keyboard else None
+
 def get_event_actions_keyboard(event_id: int):
     """Кнопки действий для события"""
     keyboard = [
@@ -38,23 +71,55 @@ def get_event_actions_keyboard(event_id: int):
     ]
     return InlineKeyboardMarkup(keyboard)
 
-def get_pagination_keyboard(page: int, total_pages: int, prefix: str):
-    """Пагинация"""
+def get_pagination_keyboard(page: int, total_pages: int, prefix: str, first_id: int = None, last_id: int = None):
+    """Пагинация (с курсорами first_id/last_id - keyset-пагинация)"""
     keyboard = []
     
+    prev_data = f"{prefix}_page_{page-1}"
+    next_data = f"{prefix}_page_{page+1}"
+    if first_id is not None and last_id is not None:
+        prev_data += f"_b{first_id}"
+        next_data += f"_a{last_id}"
+    
     buttons = []
     if page > 1:
-        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"{prefix}_page_{page-1}"))
+        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=prev_data))
     
     buttons.append(InlineKeyboardButton(f"{page}/{total_pages}", callback_data="noop"))
     
     if page < total_pages:
-        buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=f"{prefix}_page_{page+1}"))
+        buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=next_data))
     
     keyboard.append(buttons)
     
     return InlineKeyboardMarkup(keyboard)
 
+def get_tasks_list_keyboard(page: int, total_pages: int, first_id: int, last_id: int):
+    """Клавиатура списка задач: пагинация и выбор нескольких задач"""
+    keyboard = []
+    
+    if total_pages > 1:
+        keyboard.extend(get_pagination_keyboard(page, total_pages, "tasks", first_id, last_id).inline_keyboard)
+    
+    keyboard.append([InlineKeyboardButton("☑️ Отметить выполненные", callback_data="tasks_select_start")])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+def get_tasks_select_keyboard(tasks: dict, selected: set):
+    """Множественный выбор задач: {id: название}, выбранные id"""
+    keyboard = []
+    
+    for task_id, title in tasks.items():
+        mark = "✅" if task_id in selected else "⬜"
+        keyboard.append([InlineKeyboardButton(f"{mark} {title[:40]}", callback_data=f"tasks_select_{task_id}")])
+    
+    keyboard.append([
+        InlineKeyboardButton(f"✅ Завершить выбранные ({len(selected)})", callback_data="tasks_complete_selected"),
+        InlineKeyboardButton("❌ Отмена", callback_data="tasks_select_cancel")
+    ])
+    
+    return InlineKeyboardMarkup(keyboard)
+
 def get_status_keyboard(task_id: int):
     """Выбор статуса задачи"""
     keyboard = [
@@ -1,26 +1,36 @@
+import asyncio
 import logging
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler, 
-    ConversationHandler, filters
+    ConversationHandler, ContextTypes, filters
 )
 from telegram.constants import ParseMode
 from bot.config import config
-from database.database import init_db
+from database.database import init_db, dispose_engines
 from bot.utils.scheduler import reminder_scheduler
+from bot.utils.due_alerts import due_date_alerts
+from bot.utils.digest import daily_digest
+from bot.utils.broadcaster import broadcaster
+from bot.utils.session import UnitOfWorkApplication, UpdateContext, commit_current_update
+from bot.utils.metrics_server import start_metrics_server
+from bot.utils.webhook_server import run_webhook
+from bot.utils.update_processor import KeyedUpdateProcessor
+from bot.utils.outbox import outbox
 from bot.handlers import (
     start_command, help_command, cancel_command,
     add_task_command, task_title_input, task_description_input, 
-    task_priority_input, task_due_date_input, my_tasks_command, task_callback_handler,
+    task_priority_input, task_due_date_input, my_tasks_command, tasks_page_callback,
+    complete_tasks_command, tasks_select_callback, task_callback_handler, send_due_alert,
     add_reminder_command, reminder_title_input, reminder_description_input,
-    reminder_time_input, my_reminders_command, reminder_callback_handler, send_reminder,
+    reminder_time_input, reminder_repeat_input, my_reminders_command, reminders_page_callback, reminder_callback_handler, send_reminder,
     add_event_command, event_title_input, event_start_time_input, event_end_time_input,
     event_description_input, event_location_input, event_type_selection,
     calendar_command, today_events_command, event_callback_handler,
-    admin_command, grant_admin_command, user_list_command, broadcast_command,
-    broadcast_message_handler, users_stats_command, system_info_command,
-    stats_command,
+    admin_command, grant_admin_command, user_list_command, users_page_callback, broadcast_command,
+    broadcast_message_handler, users_stats_command, system_info_command, reminder_stats_command,
+    stats_command, digest_command, send_digest,
     TASK_TITLE, TASK_DESC, TASK_PRIORITY, TASK_DUE_DATE,
-    REMINDER_TITLE, REMINDER_DESC, REMINDER_TIME,
+    REMINDER_TITLE, REMINDER_DESC, REMINDER_TIME, REMINDER_REPEAT,
     EVENT_TITLE, EVENT_START, EVENT_END, EVENT_DESC, EVENT_LOCATION, EVENT_TYPE
 )
 
@@ -31,16 +41,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Типы обновлений, которые получает бот (одинаково для polling и webhook)
+ALLOWED_UPDATES = ["message", "callback_query"]
+
 # Глобальный экземпляр бота
 bot_instance = None
+metrics_runner = None
 
 async def error_handler(update, context):
     """Обработчик ошибок"""
     logger.error(msg="Произошла ошибка при обработке обновления:", exc_info=context.error)
+    context.rollback_db()
 
 async def post_init(application):
     """Инициализация после запуска приложения"""
-    global bot_instance
+    global bot_instance, metrics_runner
     bot_instance = application.bot
     
     # Инициализировать БД
@@ -49,21 +64,54 @@ async def post_init(application):
     # Запустить планировщик напоминаний
     reminder_scheduler.set_callback(send_reminder)
     reminder_scheduler.start()
-    reminder_scheduler.reschedule_all_reminders()
+    await reminder_scheduler.reschedule_all_reminders()
+    reminder_scheduler.start_catch_up()
+    reminder_scheduler.schedule_stats_reconciliation(config.STATS_RECONCILE_INTERVAL)
+    
+    # Оповещения о сроках задач (время сроков - в часовом поясе планировщика)
+    due_date_alerts.set_callback(send_due_alert)
+    due_date_alerts.start(reminder_scheduler.scheduler, reminder_scheduler.now)
+    
+    # Ежедневная сводка в выбранный пользователем час
+    daily_digest.set_callback(send_digest)
+    daily_digest.start(reminder_scheduler.scheduler, reminder_scheduler.now)
+    
+    # Фоновые рассылки: продолжить прерванные перезапуском
+    broadcaster.start(application.bot, reminder_scheduler.scheduler)
+    
+    metrics_runner = await start_metrics_server()
     
     logger.info("✅ Бот инициализирован")
 
 async def post_shutdown(application):
     """Очистка при остановке"""
+    await broadcaster.stop()
     reminder_scheduler.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await dispose_engines()
     logger.info("⏹️ Бот остановлен")
 
 def main():
     """Запуск бота"""
     config.validate()
     
-    # Создание приложения
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    # Транзакция обновления фиксируется до первого запроса к Telegram, а не после всех ответов
+    outbox.set_before_send(commit_current_update)
+    
+    # Создание приложения (одна сессия БД на обновление;
+    # разные пользователи обрабатываются параллельно, один пользователь - по очереди)
+    builder = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .application_class(UnitOfWorkApplication)
+        .concurrent_updates(KeyedUpdateProcessor(config.UPDATE_CONCURRENCY))
+        .rate_limiter(outbox)
+        .context_types(ContextTypes(context=UpdateContext))
+    )
+    if config.TELEGRAM_API_URL:
+        builder = builder.base_url(config.TELEGRAM_API_URL)
+    application = builder.build()
     
     # Обработчик /start
     application.add_handler(CommandHandler("start", start_command))
@@ -88,6 +136,7 @@ def main():
             REMINDER_TITLE: [MessageHandler(filters.TEXT & ~filters.COMMAND, reminder_title_input)],
             REMINDER_DESC: [MessageHandler(filters.TEXT & ~filters.COMMAND, reminder_description_input)],
             REMINDER_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, reminder_time_input)],
+            REMINDER_REPEAT: [MessageHandler(filters.TEXT & (~filters.COMMAND | filters.Regex("^/skip$")), reminder_repeat_input)],
         },
         fallbacks=[CommandHandler("cancel", cancel_command), MessageHandler(filters.Regex("^🔙 Отмена$"), cancel_command)],
     )
@@ -114,12 +163,14 @@ def main():
     # Обработчики команд
     application.add_handler(CommandHandler("my_tasks", my_tasks_command))
     application.add_handler(MessageHandler(filters.Regex("^📋 Мои задачи$"), my_tasks_command))
+    application.add_handler(CommandHandler("complete_tasks", complete_tasks_command))
     application.add_handler(CommandHandler("my_reminders", my_reminders_command))
     application.add_handler(MessageHandler(filters.Regex("^📋 Мои напоминания$"), my_reminders_command))
     application.add_handler(CommandHandler("calendar", calendar_command))
     application.add_handler(MessageHandler(filters.Regex("^📅 Календарь$"), calendar_command))
     application.add_handler(CommandHandler("today_events", today_events_command))
     application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("digest", digest_command))
     application.add_handler(MessageHandler(filters.Regex("^📊 Статистика$"), stats_command))
     
     # Админ команды
@@ -132,11 +183,16 @@ def main():
     application.add_handler(MessageHandler(filters.Regex("^📢 Рассылка$"), broadcast_command))
     application.add_handler(CommandHandler("users_stats", users_stats_command))
     application.add_handler(CommandHandler("system_info", system_info_command))
+    application.add_handler(CommandHandler("reminder_stats", reminder_stats_command))
     
     # Обработчик рассылки
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.User(user_id=config.ADMIN_ID), broadcast_message_handler))
     
     # Callback обработчики
+    application.add_handler(CallbackQueryHandler(tasks_page_callback, pattern="^tasks_page_"))
+    application.add_handler(CallbackQueryHandler(tasks_select_callback, pattern="^tasks_(select_|complete_selected)"))
+    application.add_handler(CallbackQueryHandler(reminders_page_callback, pattern="^reminders_page_"))
+    application.add_handler(CallbackQueryHandler(users_page_callback, pattern="^users_page_"))
     application.add_handler(CallbackQueryHandler(task_callback_handler, pattern="^task_"))
     application.add_handler(CallbackQueryHandler(reminder_callback_handler, pattern="^reminder_"))
     application.add_handler(CallbackQueryHandler(event_callback_handler, pattern="^event_"))
@@ -149,8 +205,11 @@ def main():
     application.post_shutdown = post_shutdown
     
     # Запуск бота
-    logger.info("🚀 Запуск бота...")
-    application.run_polling(allowed_updates=["message", "callback_query"])
+    logger.info(f"🚀 Запуск бота ({config.BOT_MODE})...")
+    if config.BOT_MODE == 'webhook':
+        asyncio.run(run_webhook(application, ALLOWED_UPDATES))
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == "__main__":
     main()
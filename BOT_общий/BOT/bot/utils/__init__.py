@@ -1,11 +1,20 @@
 from .helpers import (
     format_datetime, format_date, get_priority_emoji, get_status_emoji,
     format_task_info, format_reminder_info, format_event_info,
-    get_user_summary, parse_datetime_input, is_valid_datetime,
-    get_time_until, safe_get_user_info, paginate_list
+    get_user_summary, parse_datetime_input, is_valid_datetime, parse_bulk_lines,
+    RECURRENCE_PRESETS, parse_recurrence_input, format_recurrence, format_digest,
+    get_time_until, safe_get_user_info, paginate_list, parse_page_callback
 )
 from .scheduler import reminder_scheduler, ReminderScheduler
-from .google_cal import google_calendar, GoogleCalendarManager
+from .session import UnitOfWorkApplication, UpdateContext
+
+# Синхронизация с Google Calendar необязательна: без неё (или её зависимостей)
+# пакет импортируется, google_calendar - None
+try:
+    from .google_cal import google_calendar, GoogleCalendarManager
+except ImportError:
+    google_calendar = None
+    GoogleCalendarManager = None
 
 __all__ = [
     'format_datetime',
@@ -18,11 +27,19 @@ __all__ = [
     'get_user_summary',
     'parse_datetime_input',
     'is_valid_datetime',
+    'parse_bulk_lines',
+    'RECURRENCE_PRESETS',
+    'parse_recurrence_input',
+    'format_recurrence',
+    'format_digest',
     'get_time_until',
     'safe_get_user_info',
     'paginate_list',
+    'parse_page_callback',
     'reminder_scheduler',
     'ReminderScheduler',
+    'UnitOfWorkApplication',
+    'UpdateContext',
     'google_calendar',
     'GoogleCalendarManager',
 ]
@@ -0,0 +1,243 @@
+"""
+Рассылка всем пользователям как фоновое задание
+
+Рассылка хранится в таблице broadcasts. Получатели читаются порциями по users.id
+(keyset), после каждой порции в БД сохраняется контрольная точка - id последнего
+обработанного пользователя и счётчики. Поэтому рассылка переживает перезапуск:
+идущие рассылки подхватываются при старте и периодической проверкой, а рассылку
+упавшего воркера забирает другой, когда истечёт срок аренды.
+
+Сообщения уходят через очередь исходящих с низшим приоритетом, прогресс
+периодически обновляется в сообщении администратору. Пауза и отмена - смена статуса
+в БД, воркер видит её на следующей контрольной точке.
+"""
+
+import asyncio
+import time
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncBroadcastCRUD, AsyncUserCRUD
+from database.models import BroadcastStatus
+from bot.config import config
+from bot.utils.outbox import priority, PRIORITY_BROADCAST, PRIORITY_NOTIFICATION
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_LABELS = {
+    BroadcastStatus.RUNNING.value: "⏳ идёт",
+    BroadcastStatus.PAUSED.value: "⏸ на паузе",
+    BroadcastStatus.CANCELLED.value: "⏹ отменена",
+    BroadcastStatus.COMPLETED.value: "✅ завершена",
+}
+
+def format_broadcast_progress(broadcast) -> str:
+    """Текст сообщения с прогрессом рассылки"""
+    done = broadcast.sent + broadcast.failed
+    percent = min(done * 100 // broadcast.total, 100) if broadcast.total else 100
+    return (
+        f"📢 Рассылка #{broadcast.id}: {STATUS_LABELS.get(broadcast.status, broadcast.status)}\n"
+        f"Обработано: {done}/{broadcast.total} ({percent}%)\n"
+        f"Доставлено: {broadcast.sent}, ошибок: {broadcast.failed}"
+    )
+
+class Broadcaster:
+    """Фоновые рассылки с контрольными точками, паузой и отменой"""
+
+    def __init__(self):
+        self.bot = None
+        self.worker_id = config.WORKER_ID
+        # broadcast_id -> таск, который ведёт рассылку в этом процессе
+        self._tasks = {}
+
+    def start(self, bot, scheduler):
+        """Продолжить идущие рассылки сейчас и проверять ничьи рассылки каждые BROADCAST_LEASE_SECONDS"""
+        self.bot = bot
+        scheduler.add_job(
+            self.resume_running,
+            trigger='interval',
+            seconds=config.BROADCAST_LEASE_SECONDS,
+            id='broadcast_resume',
+            replace_existing=True
+        )
+        scheduler.add_job(self.resume_running, id='broadcast_resume_startup', replace_existing=True)
+
+    async def stop(self):
+        """Остановить рассылки этого процесса (после перезапуска они продолжатся с контрольной точки)"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def is_running(self, broadcast_id: int) -> bool:
+        task = self._tasks.get(broadcast_id)
+        return task is not None and not task.done()
+
+    def _launch(self, broadcast_id: int):
+        if self.is_running(broadcast_id):
+            return
+        task = asyncio.get_running_loop().create_task(self._run(broadcast_id))
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def resume_running(self):
+        """Взять в работу идущие рассылки, которые никто не ведёт"""
+        db = AsyncSessionLocal()
+        try:
+            broadcast_ids = await AsyncBroadcastCRUD.get_running_ids(db)
+        except Exception as e:
+            logger.error(f"❌ Ошибка при поиске идущих рассылок: {e}")
+            return
+        finally:
+            await db.close()
+        for broadcast_id in broadcast_ids:
+            self._launch(broadcast_id)
+
+    async def submit(self, created_by: int, text: str, chat_id: int):
+        """Создать рассылку и запустить её в фоне; вернуть рассылку"""
+        # Своя сессия: рассылка должна быть в БД до ответа, а не в конце обновления
+        db = AsyncSessionLocal()
+        try:
+            total = await AsyncUserCRUD.count(db)
+            broadcast = await AsyncBroadcastCRUD.create(db, created_by, text, total)
+            try:
+                message = await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=format_broadcast_progress(broadcast),
+                    rate_limit_args=priority(PRIORITY_NOTIFICATION)
+                )
+                await AsyncBroadcastCRUD.set_status_message(db, broadcast.id, chat_id, message.message_id)
+            except Exception as e:
+                # Рассылка всё равно идёт, просто без сообщения с прогрессом
+                logger.warning(f"⚠️ Не удалось отправить прогресс рассылки #{broadcast.id}: {e}")
+        finally:
+            await db.close()
+        logger.info(f"📢 Рассылка #{broadcast.id} запущена: {total} получателей")
+        self._launch(broadcast.id)
+        return broadcast
+
+    async def pause(self, broadcast_id: int) -> bool:
+        """Поставить рассылку на паузу"""
+        return await self._set_status(broadcast_id, BroadcastStatus.PAUSED, [BroadcastStatus.RUNNING])
+
+    async def resume(self, broadcast_id: int) -> bool:
+        """Продолжить рассылку с контрольной точки"""
+        changed = await self._set_status(broadcast_id, BroadcastStatus.RUNNING, [BroadcastStatus.PAUSED])
+        if changed:
+            self._launch(broadcast_id)
+        return changed
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        """Отменить рассылку"""
+        changed = await self._set_status(
+            broadcast_id, BroadcastStatus.CANCELLED, [BroadcastStatus.RUNNING, BroadcastStatus.PAUSED]
+        )
+        if changed and not self.is_running(broadcast_id):
+            # Рассылку никто не ведёт (была на паузе) - итог показываем сами
+            await self._report_by_id(broadcast_id)
+        return changed
+
+    async def _set_status(self, broadcast_id: int, status, expected: list) -> bool:
+        db = AsyncSessionLocal()
+        try:
+            return await AsyncBroadcastCRUD.set_status(
+                db, broadcast_id, status.value, [item.value for item in expected]
+            )
+        finally:
+            await db.close()
+
+    async def _send(self, telegram_id: int, text: str) -> bool:
+        try:
+            await self.bot.send_message(
+                chat_id=telegram_id,
+                text=text,
+                parse_mode=ParseMode.HTML,
+                rate_limit_args=priority(PRIORITY_BROADCAST)
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось отправить рассылку пользователю {telegram_id}: {e}")
+            return False
+
+    async def _report(self, broadcast):
+        """Обновить сообщение с прогрессом"""
+        if broadcast.status_chat_id is None or broadcast.status_message_id is None:
+            return
+        try:
+            await self.bot.edit_message_text(
+                chat_id=broadcast.status_chat_id,
+                message_id=broadcast.status_message_id,
+                text=format_broadcast_progress(broadcast),
+                rate_limit_args=priority(PRIORITY_NOTIFICATION)
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"⚠️ Не удалось обновить прогресс рассылки #{broadcast.id}: {e}")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось обновить прогресс рассылки #{broadcast.id}: {e}")
+
+    async def _report_by_id(self, broadcast_id: int):
+        db = AsyncSessionLocal()
+        try:
+            broadcast = await AsyncBroadcastCRUD.get_by_id(db, broadcast_id)
+        finally:
+            await db.close()
+        if broadcast is not None:
+            await self._report(broadcast)
+
+    async def _run(self, broadcast_id: int):
+        db = AsyncSessionLocal()
+        try:
+            broadcast = await AsyncBroadcastCRUD.claim(db, broadcast_id, self.worker_id, config.BROADCAST_LEASE_SECONDS)
+            if broadcast is None:
+                return
+            logger.info(f"📢 Рассылка #{broadcast_id}: продолжение после пользователя {broadcast.last_user_id}")
+            last_report = time.monotonic()
+
+            while True:
+                recipients = await AsyncUserCRUD.get_recipients_page(
+                    db, broadcast.last_user_id, config.BROADCAST_CHUNK_SIZE
+                )
+                # Не держать транзакцию чтения, пока порция отправляется
+                await db.commit()
+                if not recipients:
+                    if await AsyncBroadcastCRUD.set_status(
+                        db, broadcast_id, BroadcastStatus.COMPLETED.value, [BroadcastStatus.RUNNING.value]
+                    ):
+                        break
+                else:
+                    results = await asyncio.gather(*(self._send(row.telegram_id, broadcast.text) for row in recipients))
+                    sent = sum(results)
+                    status = await AsyncBroadcastCRUD.checkpoint(
+                        db, broadcast_id, self.worker_id, recipients[-1].id, sent, len(results) - sent
+                    )
+                    if status is None:
+                        logger.warning(f"⚠️ Рассылку #{broadcast_id} забрал другой воркер")
+                        return
+
+                await db.refresh(broadcast)
+                if broadcast.status != BroadcastStatus.RUNNING.value:
+                    # Пауза или отмена; если рассылку успели возобновить, продолжаем
+                    if await AsyncBroadcastCRUD.release(db, broadcast_id, self.worker_id):
+                        break
+                    await db.refresh(broadcast)
+                if time.monotonic() - last_report >= config.BROADCAST_PROGRESS_SECONDS:
+                    await self._report(broadcast)
+                    last_report = time.monotonic()
+
+            await db.refresh(broadcast)
+            await self._report(broadcast)
+            logger.info(
+                f"📢 Рассылка #{broadcast_id} ({broadcast.status}): "
+                f"доставлено {broadcast.sent}, ошибок {broadcast.failed}"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ошибка в рассылке #{broadcast_id}: {e}")
+        finally:
+            await db.close()
+
+# Глобальный экземпляр рассылок
+broadcaster = Broadcaster()
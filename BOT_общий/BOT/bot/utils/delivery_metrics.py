@@ -0,0 +1,102 @@
+"""
+Метрики доставки напоминаний
+
+Для каждой отправки учитывается задержка: фактическое время отправки минус
+scheduled_time. Накопительная гистограмма задержек (как в Prometheus) считается
+с запуска, перцентили - по последним RECENT_SIZE отправкам.
+"""
+
+import bisect
+import time
+from collections import deque
+
+# Границы корзин гистограммы задержки (секунды)
+LAG_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600)
+RECENT_SIZE = 10000
+
+class DeliveryMetrics:
+    """Счётчики доставки напоминаний"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.bucket_counts = [0] * (len(LAG_BUCKETS) + 1)
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.delivered = 0
+        self.delivered_late = 0
+        self.failed = 0
+        # (unix-время отправки, задержка) последних отправок
+        self.recent = deque(maxlen=RECENT_SIZE)
+        # Функция, возвращающая текущие очереди планировщика
+        self.queue_source = None
+
+    def record_delivery(self, lag: float, late: bool = False):
+        """Учесть доставленное напоминание с задержкой lag (секунды)"""
+        lag = max(lag, 0.0)
+        self.bucket_counts[bisect.bisect_left(LAG_BUCKETS, lag)] += 1
+        self.lag_sum += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.delivered += 1
+        if late:
+            self.delivered_late += 1
+        self.recent.append((time.time(), lag))
+
+    def record_failure(self):
+        """Учесть неудачную отправку"""
+        self.failed += 1
+
+    def queues(self) -> dict:
+        """Глубина очередей планировщика"""
+        return self.queue_source() if self.queue_source else {}
+
+    def percentiles(self, window_seconds: float = None) -> dict:
+        """p50/p95/p99/max задержки по последним отправкам (за window_seconds, если задано)"""
+        since = time.time() - window_seconds if window_seconds else 0
+        lags = sorted(lag for sent_at, lag in self.recent if sent_at >= since)
+        if not lags:
+            return {'count': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+        pick = lambda q: lags[min(len(lags) - 1, int(q * len(lags)))]
+        return {'count': len(lags), 'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': lags[-1]}
+
+    def snapshot(self) -> dict:
+        """Текущее состояние счётчиков"""
+        return {
+            'delivered': self.delivered,
+            'delivered_late': self.delivered_late,
+            'failed': self.failed,
+            'lag_avg': self.lag_sum / self.delivered if self.delivered else 0.0,
+            'lag_max': self.lag_max,
+            'buckets': list(zip(LAG_BUCKETS + (float('inf'),), self.bucket_counts)),
+            'recent': self.percentiles(),
+            'last_minute': self.percentiles(60),
+            'queues': self.queues(),
+        }
+
+    def prometheus_lines(self) -> list:
+        """Метрики в текстовом формате Prometheus"""
+        lines = [
+            "# HELP reminder_delivery_lag_seconds Задержка отправки напоминания относительно scheduled_time",
+            "# TYPE reminder_delivery_lag_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(LAG_BUCKETS + (float('inf'),), self.bucket_counts):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else f"{bound:g}"
+            lines.append(f'reminder_delivery_lag_seconds_bucket{{le="{le}"}} {cumulative}')
+        lines += [
+            f"reminder_delivery_lag_seconds_sum {self.lag_sum:.3f}",
+            f"reminder_delivery_lag_seconds_count {self.delivered}",
+            "# TYPE reminders_delivered_total counter",
+            f"reminders_delivered_total {self.delivered}",
+            "# TYPE reminders_delivered_late_total counter",
+            f"reminders_delivered_late_total {self.delivered_late}",
+            "# TYPE reminders_failed_total counter",
+            f"reminders_failed_total {self.failed}",
+            "# TYPE reminder_queue_depth gauge",
+        ]
+        for queue, depth in self.queues().items():
+            lines.append(f'reminder_queue_depth{{queue="{queue}"}} {depth}')
+        return lines
+
+# Глобальный экземпляр метрик доставки
+delivery_metrics = DeliveryMetrics()
@@ -0,0 +1,123 @@
+"""
+Ежедневная сводка: события на сегодня и задачи со сроком до конца дня
+
+Раз в час (и при запуске) подписчики, чей час сводки наступил, читаются из БД
+курсором порциями (yield_per). На каждую порцию - два запроса: события и задачи
+всех пользователей порции сразу. Порция отмечается отправленной одним UPDATE
+(сводка за день уходит один раз, в том числе при нескольких экземплярах бота),
+после чего сводки уходят через общий ограничитель скорости. Следующая порция
+читается, пока отправляется текущая, но не дальше, чем позволяет ограничитель.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, time
+from apscheduler.triggers.cron import CronTrigger
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncTaskCRUD, AsyncEventCRUD
+from bot.config import config
+from bot.utils.helpers import format_digest
+from bot.utils.rate_limit import RateLimiter
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DailyDigest:
+    """Рассылка ежедневной сводки в выбранный пользователем час"""
+
+    def __init__(self):
+        self.callback = None
+        self.now = datetime.utcnow
+        self._task = None
+
+    def set_callback(self, callback):
+        """Установить callback отправки: callback(telegram_id, text) -> bool"""
+        self.callback = callback
+
+    def start(self, scheduler, now=None):
+        """Запускать рассылку в начале каждого часа и сразу (сводки, пропущенные за простой)"""
+        if now is not None:
+            self.now = now
+        scheduler.add_job(
+            self.run,
+            trigger=CronTrigger(minute=0, timezone=scheduler.timezone),
+            id='daily_digest',
+            replace_existing=True
+        )
+        scheduler.add_job(self.run, id='daily_digest_startup', replace_existing=True)
+        logger.info("➕ Ежедневная сводка: проверка каждый час")
+
+    async def run(self):
+        """Разослать сводки всем, чей час наступил (повторный запуск во время рассылки пропускается)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self.send_due())
+        await self._task
+
+    async def send_due(self):
+        try:
+            now = self.now()
+            today = now.date()
+            day_start = datetime.combine(today, time.min)
+            day_end = day_start + timedelta(days=1)
+
+            limiter = RateLimiter(config.DIGEST_SEND_RATE)
+            in_flight = asyncio.Semaphore(config.REMINDER_SEND_CONCURRENCY)
+            sending = set()
+            sent = total = 0
+
+            async def send(telegram_id, text):
+                nonlocal sent
+                try:
+                    if await self.callback(telegram_id, text):
+                        sent += 1
+                except Exception as e:
+                    logger.error(f"❌ Ошибка при отправке сводки пользователю {telegram_id}: {e}")
+                finally:
+                    in_flight.release()
+
+            reader = AsyncSessionLocal()
+            db = AsyncSessionLocal()
+            try:
+                async for chunk in AsyncUserCRUD.stream_digest_recipients(
+                    reader, now.hour, today, config.DIGEST_CHUNK_SIZE
+                ):
+                    claimed = set(await AsyncUserCRUD.claim_digest(db, [row.id for row in chunk], today))
+                    if not claimed:
+                        continue
+                    events = await AsyncEventCRUD.get_for_users(db, list(claimed), day_start, day_end)
+                    tasks = await AsyncTaskCRUD.get_due_for_users(db, list(claimed), day_end)
+                    await db.commit()
+
+                    events_by_user, tasks_by_user = {}, {}
+                    for event in events:
+                        events_by_user.setdefault(event.user_id, []).append(event)
+                    for task in tasks:
+                        tasks_by_user.setdefault(task.user_id, []).append(task)
+
+                    for row in chunk:
+                        if row.id not in claimed:
+                            continue
+                        total += 1
+                        user_events = events_by_user.get(row.id, [])
+                        user_tasks = tasks_by_user.get(row.id, [])
+                        if not user_events and not user_tasks:
+                            continue
+                        text = format_digest(user_events, user_tasks, now)
+                        await limiter.acquire()
+                        await in_flight.acquire()
+                        task = asyncio.get_running_loop().create_task(send(row.telegram_id, text))
+                        sending.add(task)
+                        task.add_done_callback(sending.discard)
+            finally:
+                await reader.close()
+                await db.close()
+
+            if sending:
+                await asyncio.gather(*sending)
+            if total:
+                logger.info(f"📰 Ежедневная сводка: отправлено {sent}, подписчиков {total}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка при рассылке ежедневной сводки: {e}")
+
+# Глобальный экземпляр ежедневной сводки
+daily_digest = DailyDigest()
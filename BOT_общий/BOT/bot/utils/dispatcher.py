@@ -0,0 +1,157 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class APSchedulerDispatcher:
+    """Отдельная задача APScheduler (date trigger) на каждое напоминание"""
+
+    def __init__(self, scheduler, callback):
+        self.scheduler = scheduler
+        self.callback = callback
+
+    @staticmethod
+    def job_id(reminder_id: int) -> str:
+        return f"reminder_{reminder_id}"
+
+    def start(self):
+        """Задачи выполняет сам APScheduler"""
+
+    def stop(self):
+        """Задачи останавливаются вместе с APScheduler"""
+
+    def schedule(self, reminder_id: int, run_at: datetime):
+        """Запланировать (или перепланировать) напоминание"""
+        self.scheduler.add_job(
+            self.callback,
+            args=(reminder_id,),
+            trigger='date',
+            run_date=run_at,
+            id=self.job_id(reminder_id),
+            replace_existing=True,
+            # Уже наступившее (например, пока загружалось окно) срабатывает сразу, как в HeapDispatcher
+            misfire_grace_time=None
+        )
+
+    def cancel(self, reminder_id: int) -> bool:
+        """Убрать напоминание из расписания"""
+        job = self.scheduler.get_job(self.job_id(reminder_id))
+        if job is None:
+            return False
+        job.remove()
+        return True
+
+    def __contains__(self, reminder_id: int) -> bool:
+        return self.scheduler.get_job(self.job_id(reminder_id)) is not None
+
+    def __len__(self) -> int:
+        # Служебные задачи (reminder_window_sweep и т.п.) не считаются
+        return sum(1 for job in self.scheduler.get_jobs() if job.id.startswith("reminder_") and job.id[9:].isdigit())
+
+class HeapDispatcher:
+    """Напоминания в min-heap с одним asyncio-таском ожидания
+
+    Вставка - O(log n), отмена - O(1): отменённые и перепланированные записи
+    остаются в куче и пропускаются при извлечении (ленивое удаление).
+    Когда мусора в куче становится больше, чем живых записей, куча перестраивается.
+    """
+
+    # Максимальный сон: переводы системных часов подхватываются не позже чем через минуту
+    MAX_SLEEP = 60
+    # Меньшие кучи не перестраиваются
+    COMPACT_MIN_SIZE = 1024
+
+    def __init__(self, callback, now):
+        self.callback = callback
+        self.now = now
+        self._heap = []
+        # reminder_id -> (run_at, seq) актуальной записи в куче
+        self._entries = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # Выполняющиеся callback (ссылки, чтобы таски не собрал GC)
+        self._running = set()
+
+    def start(self):
+        """Запустить таск ожидания (вызывается из работающего event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Остановить таск ожидания"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def schedule(self, reminder_id: int, run_at: datetime):
+        """Запланировать (или перепланировать) напоминание"""
+        seq = next(self._counter)
+        self._entries[reminder_id] = (run_at, seq)
+        heapq.heappush(self._heap, (run_at, seq, reminder_id))
+        if self._heap[0][1] == seq:
+            # Новая запись раньше всех - разбудить таск, чтобы пересчитать сон
+            self._wakeup.set()
+        self._compact()
+
+    def cancel(self, reminder_id: int) -> bool:
+        """Убрать напоминание из расписания"""
+        if self._entries.pop(reminder_id, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def __contains__(self, reminder_id: int) -> bool:
+        return reminder_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def pop_due(self, now: datetime) -> list:
+        """Извлечь id напоминаний, время которых наступило"""
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            run_at, seq, reminder_id = heapq.heappop(heap)
+            entry = self._entries.get(reminder_id)
+            if entry is not None and entry[1] == seq:
+                del self._entries[reminder_id]
+                due.append(reminder_id)
+        return due
+
+    def _compact(self):
+        if len(self._heap) > self.COMPACT_MIN_SIZE and len(self._heap) > 2 * len(self._entries):
+            self._heap = [(run_at, seq, reminder_id) for reminder_id, (run_at, seq) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _fire(self, reminder_id: int):
+        task = asyncio.get_running_loop().create_task(self.callback(reminder_id))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self):
+        while True:
+            try:
+                now = self.now()
+                for reminder_id in self.pop_due(now):
+                    self._fire(reminder_id)
+
+                if self._heap:
+                    timeout = (self._heap[0][0] - now).total_seconds()
+                    timeout = min(max(timeout, 0), self.MAX_SLEEP)
+                else:
+                    timeout = self.MAX_SLEEP
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка в диспетчере напоминаний: {e}")
+                await asyncio.sleep(1)
@@ -0,0 +1,98 @@
+"""
+Оповещения о приближении сроков задач
+
+Раз в TASK_DUE_ALERT_INTERVAL секунд один запрос по диапазону due_date находит
+открытые задачи со сроком в ближайшие max(TASK_DUE_ALERT_OFFSETS) минут.
+Для каждой задачи берётся наименьшее смещение, в которое попал её срок; если за него
+оповещение ещё не отправлялось, задача попадает в сводное сообщение своему пользователю.
+Отметка ставится до отправки (не больше одного оповещения на смещение, в том числе
+при нескольких экземплярах бота).
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncTaskCRUD
+from bot.config import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DueDateAlerts:
+    """Поиск задач с приближающимся сроком и сводные оповещения пользователям"""
+
+    def __init__(self, offsets: list):
+        # Смещения в минутах по возрастанию
+        self.offsets = sorted(set(offsets))
+        self.callback = None
+        self.now = datetime.utcnow
+
+    def set_callback(self, callback):
+        """Установить callback отправки: callback(telegram_id, tasks, now) -> bool"""
+        self.callback = callback
+
+    def start(self, scheduler, now=None):
+        """Запустить периодический поиск в планировщике APScheduler"""
+        if not self.offsets:
+            return
+        if now is not None:
+            self.now = now
+        scheduler.add_job(
+            self.scan,
+            trigger='interval',
+            seconds=config.TASK_DUE_ALERT_INTERVAL,
+            id='task_due_alerts',
+            replace_existing=True
+        )
+        logger.info(f"➕ Оповещения о сроках задач за {', '.join(map(str, self.offsets))} мин.")
+
+    def offset_for(self, due_date: datetime, now: datetime):
+        """Наименьшее смещение, в которое попадает срок (None - срок дальше всех смещений)"""
+        minutes_left = (due_date - now).total_seconds() / 60
+        for offset in self.offsets:
+            if minutes_left <= offset:
+                return offset
+        return None
+
+    async def scan(self):
+        """Найти задачи с приближающимся сроком и отправить по одному оповещению на пользователя"""
+        try:
+            now = self.now()
+            db = AsyncSessionLocal()
+            try:
+                rows = await AsyncTaskCRUD.get_due_for_alert(
+                    db, now, now + timedelta(minutes=self.offsets[-1]), self.offsets[0]
+                )
+                offsets = {}
+                for row in rows:
+                    offset = self.offset_for(row.due_date, now)
+                    if row.due_alert_minutes is None or row.due_alert_minutes > offset:
+                        offsets[row.id] = offset
+                marked = set(await AsyncTaskCRUD.mark_due_alerts(db, offsets))
+            finally:
+                await db.close()
+
+            per_user = {}
+            for row in rows:
+                if row.id in marked:
+                    per_user.setdefault(row.telegram_id, []).append(row)
+            if not per_user or not self.callback:
+                return
+
+            send_limit = asyncio.Semaphore(config.REMINDER_SEND_CONCURRENCY)
+
+            async def send(telegram_id, tasks):
+                async with send_limit:
+                    try:
+                        return await self.callback(telegram_id, tasks, now)
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка при отправке оповещения о сроках пользователю {telegram_id}: {e}")
+                        return False
+
+            results = await asyncio.gather(*(send(telegram_id, tasks) for telegram_id, tasks in per_user.items()))
+            logger.info(f"⏳ Оповещения о сроках: {sum(results)} из {len(per_user)} пользователей, задач {len(marked)}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка при поиске задач с приближающимся сроком: {e}")
+
+# Глобальный экземпляр оповещений о сроках
+due_date_alerts = DueDateAlerts(config.TASK_DUE_ALERT_OFFSETS)
@@ -1,6 +1,8 @@
+import re
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from database.crud import UserCRUD, TaskCRUD, ReminderCRUD, EventCRUD, StatisticCRUD
+from dateutil.rrule import rrule, rrulestr
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.crud_async import AsyncTaskCRUD, AsyncReminderCRUD, AsyncEventCRUD
 from database.models import TaskStatus
 import logging
 
@@ -59,6 +61,9 @@ def format_reminder_info(reminder) -> str:
     text += f"Статус: {status}\n"
     text += f"Время: {format_datetime(reminder.scheduled_time)}\n"
     
+    if reminder.recurrence_rule:
+        text += f"Повтор: {format_recurrence(reminder.recurrence_rule)}\n"
+    
     if reminder.description:
         text += f"Описание: <i>{reminder.description}</i>\n"
     
@@ -79,11 +84,31 @@ def format_event_info(event) -> str:
     
     return text
 
-def get_user_summary(db: Session, user_id: int) -> str:
+def format_digest(events: list, tasks: list, now: datetime) -> str:
+    """Форматировать ежедневную сводку: события на сегодня и задачи со сроком до конца дня"""
+    text = f"🌅 <b>Сводка на {format_date(now)}</b>\n"
+    
+    if events:
+        text += "\n📅 <b>События сегодня:</b>\n"
+        for event in events:
+            text += f"  • {event.start_time.strftime('%H:%M')} {event.title}"
+            if event.location:
+                text += f" ({event.location})"
+            text += "\n"
+    
+    if tasks:
+        text += "\n📝 <b>Задачи к сроку:</b>\n"
+        for task in tasks:
+            due = "просрочено" if task.due_date < now else f"до {task.due_date.strftime('%H:%M')}"
+            text += f"  • {get_priority_emoji(task.priority)} {task.title} - {due}\n"
+    
+    return text
+
+async def get_user_summary(db: AsyncSession, user_id: int) -> str:
     """Получить краткую информацию о пользователе"""
-    tasks = TaskCRUD.get_user_tasks(db, user_id)
-    reminders = ReminderCRUD.get_user_reminders(db, user_id)
-    events = EventCRUD.get_user_events(db, user_id, days_ahead=7)
+    tasks = await AsyncTaskCRUD.get_user_tasks(db, user_id)
+    reminders = await AsyncReminderCRUD.get_user_reminders(db, user_id)
+    events = await AsyncEventCRUD.get_user_events(db, user_id, days_ahead=7)
     
     completed_tasks = sum(1 for t in tasks if t.status == TaskStatus.COMPLETED.value)
     active_reminders = sum(1 for r in reminders if r.is_active)
@@ -106,9 +131,70 @@ def is_valid_datetime(text: str) -> bool:
     """Проверить валидность формата даты и времени"""
     return parse_datetime_input(text) is not None
 
-def get_time_until(dt: datetime) -> str:
+# Готовые варианты повторения: название -> правило RRULE
+RECURRENCE_PRESETS = {
+    "ежедневно": "FREQ=DAILY",
+    "по будням": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "еженедельно": "FREQ=WEEKLY",
+    "ежемесячно": "FREQ=MONTHLY",
+}
+
+# Правила чаще раза в час не принимаются: FREQ=MINUTELY/SECONDLY или несколько значений
+# BYMINUTE/BYSECOND (с ними даже FREQ=HOURLY срабатывает несколько раз в час)
+TOO_FREQUENT_RECURRENCE = re.compile(r"FREQ=(MINUTELY|SECONDLY)|BY(MINUTE|SECOND)=[^;]*,")
+
+def parse_recurrence_input(text: str, dtstart: datetime):
+    """Парсить повторение: название из RECURRENCE_PRESETS или правило RRULE
+
+    Возвращает правило, '' - без повторения, None - если ввод не распознан
+    или правило срабатывает чаще раза в час.
+    """
+    text = text.strip()
+    if text.lower() in ("нет", "/skip"):
+        return ''
+    rule = RECURRENCE_PRESETS.get(text.lower())
+    if rule is None:
+        rule = text.upper()
+        if rule.startswith("RRULE:"):
+            rule = rule[len("RRULE:"):]
+    # Только одно правило в одной строке: без DTSTART, EXDATE и объединения нескольких RRULE
+    if "\n" in rule or TOO_FREQUENT_RECURRENCE.search(rule):
+        return None
+    try:
+        parsed = rrulestr(rule, dtstart=dtstart)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(parsed, rrule):
+        return None
+    return rule
+
+def format_recurrence(rule: str) -> str:
+    """Название повторения для правила RRULE"""
+    for name, preset in RECURRENCE_PRESETS.items():
+        if preset == rule:
+            return name
+    return rule
+
+def parse_bulk_lines(text: str) -> list:
+    """Разобрать многострочный ввод: по строке на элемент, срок через '|'
+
+    Пример строки: Курсовая работа | 30.11.2025 14:30
+    """
+    items = []
+    for line in text.splitlines():
+        line = line.strip().lstrip("•-*").strip()
+        if not line:
+            continue
+        title, _, date_text = line.partition("|")
+        items.append({
+            'title': title.strip()[:255],
+            'due_date': parse_datetime_input(date_text) if date_text else None,
+        })
+    return [item for item in items if item['title']]
+
+def get_time_until(dt: datetime, now: datetime = None) -> str:
     """Получить время до события"""
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
     diff = dt - now
     
     if diff.total_seconds() < 0:
@@ -133,6 +219,19 @@ def safe_get_user_info(user) -> dict:
         'created_at': format_datetime(user.created_at)
     }
 
+def parse_page_callback(data: str) -> tuple:
+    """Разобрать callback пагинации: {prefix}_page_{N}[_a{id}|_b{id}] -> (page, after_id, before_id)"""
+    parts = data.split("_")
+    page = int(parts[2])
+    after_id = before_id = None
+    if len(parts) > 3:
+        cursor = parts[3]
+        if cursor.startswith("a"):
+            after_id = int(cursor[1:])
+        elif cursor.startswith("b"):
+            before_id = int(cursor[1:])
+    return page, after_id, before_id
+
 def paginate_list(items: list, page: int = 1, items_per_page: int = 5) -> tuple:
     """Пагинировать список"""
     total_pages = (len(items) + items_per_page - 1) // items_per_page
@@ -0,0 +1,46 @@
+"""
+HTTP-эндпоинт метрик в формате Prometheus (aiohttp)
+
+GET /metrics - задержка и счётчики доставки напоминаний, очереди планировщика и исходящих сообщений, пулы БД
+"""
+
+from aiohttp import web
+from bot.config import config
+from bot.utils.delivery_metrics import delivery_metrics
+from bot.utils.outbox import outbox
+from database.pool_metrics import get_pool_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+def pool_lines() -> list:
+    """Метрики пулов соединений БД"""
+    lines = []
+    for metric, key, kind in (
+        ("db_pool_size", 'size', "gauge"),
+        ("db_pool_in_use", 'in_use', "gauge"),
+        ("db_pool_checkouts_total", 'checkouts', "counter"),
+        ("db_pool_timeouts_total", 'timeouts', "counter"),
+        ("db_pool_wait_max_ms", 'wait_max_ms', "gauge"),
+    ):
+        lines.append(f"# TYPE {metric} {kind}")
+        for pool in get_pool_stats():
+            lines.append(f'{metric}{{pool="{pool["name"]}"}} {pool[key]:g}')
+    return lines
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Отдать метрики"""
+    text = "\n".join(delivery_metrics.prometheus_lines() + outbox.prometheus_lines() + pool_lines()) + "\n"
+    return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+async def start_metrics_server():
+    """Запустить сервер метрик, если задан METRICS_PORT (возвращает runner для остановки)"""
+    if not config.METRICS_PORT:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, config.METRICS_HOST, config.METRICS_PORT).start()
+    logger.info(f"📈 Метрики доступны на http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics")
+    return runner
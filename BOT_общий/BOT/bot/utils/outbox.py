@@ -0,0 +1,262 @@
+"""
+Очередь исходящих сообщений (BaseRateLimiter для python-telegram-bot)
+
+Через process_request проходят все запросы бота, в том числе reply_text в обработчиках.
+Отправка и редактирование сообщений встают в очередь:
+- общий token bucket: OUTBOX_RATE сообщений в секунду, всплеск до OUTBOX_BURST
+- в один чат не чаще раза в OUTBOX_CHAT_INTERVAL с (в группу - OUTBOX_GROUP_INTERVAL с),
+  при этом сообщения других чатов не ждут; ответы пользователю (PRIORITY_INTERACTIVE)
+  интервал не ждут, чтобы ответ из нескольких сообщений не растягивался по секунде на сообщение
+- приоритеты: ответы пользователю, затем напоминания, оповещения, рассылки;
+  из очереди всегда уходит сообщение с наивысшим приоритетом
+- RetryAfter: отправка приостанавливается на retry_after, запрос повторяется
+  (до OUTBOX_MAX_RETRIES раз)
+Остальные запросы (getUpdates, answerCallbackQuery и т.п.) выполняются сразу.
+Перед любым запросом вызывается before_send (см. set_before_send): обработчик
+фиксирует транзакцию обновления, чтобы она не оставалась открытой на время отправки.
+
+Приоритет задаётся через rate_limit_args: bot.send_message(..., rate_limit_args=priority(PRIORITY_REMINDER)).
+"""
+
+import asyncio
+import heapq
+import itertools
+from datetime import timedelta
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from bot.config import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REMINDER = 1
+PRIORITY_NOTIFICATION = 2
+PRIORITY_BROADCAST = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_REMINDER: 'reminder',
+    PRIORITY_NOTIFICATION: 'notification',
+    PRIORITY_BROADCAST: 'broadcast',
+}
+
+# Методы, которые пишут в чат и попадают под лимиты Telegram
+QUEUED_PREFIXES = ('send', 'edit', 'copy', 'forward')
+
+def priority(value: int) -> dict:
+    """rate_limit_args для вызова метода бота с приоритетом value"""
+    return {'priority': value}
+
+class OutboundRequest:
+    """Запрос в очереди"""
+
+    __slots__ = ('priority', 'seq', 'chat_id', 'callback', 'args', 'kwargs', 'future', 'attempts')
+
+    def __init__(self, priority, seq, chat_id, callback, args, kwargs, future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.attempts = 0
+
+class Outbox(BaseRateLimiter):
+    """Очередь исходящих сообщений с приоритетами и ограничением скорости"""
+
+    def __init__(self, rate: float = None, burst: int = None, chat_interval: float = None,
+                 group_interval: float = None, concurrency: int = None, max_retries: int = None):
+        self.rate = rate or config.OUTBOX_RATE
+        self.burst = burst or config.OUTBOX_BURST
+        self.chat_interval = config.OUTBOX_CHAT_INTERVAL if chat_interval is None else chat_interval
+        self.group_interval = config.OUTBOX_GROUP_INTERVAL if group_interval is None else group_interval
+        self.concurrency = concurrency or config.OUTBOX_CONCURRENCY
+        self.max_retries = config.OUTBOX_MAX_RETRIES if max_retries is None else max_retries
+        self._counter = itertools.count()
+        # (priority, seq, запрос) - можно отправлять
+        self._ready = []
+        # (когда можно, priority, seq, запрос) - ждут своего чата или повтора
+        self._delayed = []
+        # chat_id -> когда в чат можно писать снова (loop.time())
+        self._chat_next = {}
+        self._paused_until = 0.0
+        self._tokens = float(self.burst)
+        self._refilled_at = None
+        self._wakeup = None
+        self._slots = None
+        self._task = None
+        self._sending = set()
+        self.before_send = None
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+
+    async def initialize(self) -> None:
+        """Запустить обработку очереди"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Остановить обработку очереди; неотправленные запросы завершаются отменой"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        for entry in self._ready + self._delayed:
+            future = entry[-1].future
+            if not future.done():
+                future.cancel()
+        self._ready.clear()
+        self._delayed.clear()
+
+    def set_before_send(self, callback):
+        """Установить действие перед каждым запросом: await callback()"""
+        self.before_send = callback
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def depths(self) -> dict:
+        """Число запросов в очереди по приоритетам"""
+        depths = {name: 0 for name in PRIORITY_NAMES.values()}
+        for entry in self._ready + self._delayed:
+            request = entry[-1]
+            depths[PRIORITY_NAMES.get(request.priority, str(request.priority))] += 1
+        return depths
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if self.before_send is not None:
+            await self.before_send()
+        chat_id = data.get('chat_id')
+        if chat_id is None or not endpoint.startswith(QUEUED_PREFIXES) or not self.running:
+            return await callback(*args, **kwargs)
+
+        request_priority = (rate_limit_args or {}).get('priority', PRIORITY_INTERACTIVE)
+        future = asyncio.get_running_loop().create_future()
+        request = OutboundRequest(request_priority, next(self._counter), chat_id, callback, args, kwargs, future)
+        heapq.heappush(self._ready, (request.priority, request.seq, request))
+        self._wakeup.set()
+        return await future
+
+    def _chat_interval(self, chat_id) -> float:
+        # У групп и каналов отрицательный chat_id (или @username канала)
+        if isinstance(chat_id, str) or chat_id < 0:
+            return self.group_interval
+        return self.chat_interval
+
+    def _token_wait(self, now: float) -> float:
+        """Взять токен из общего bucket; вернуть, сколько ждать, если токенов нет"""
+        if self._refilled_at is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                now = loop.time()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, request_priority, seq, request = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (request_priority, seq, request))
+
+                wait = None
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._ready:
+                    request = self._ready[0][-1]
+                    chat_ready = 0.0
+                    if request.priority != PRIORITY_INTERACTIVE:
+                        chat_ready = self._chat_next.get(request.chat_id, 0.0)
+                    if chat_ready > now:
+                        # Чат ещё занят - запрос ждёт, остальные чаты идут дальше
+                        heapq.heappop(self._ready)
+                        heapq.heappush(self._delayed, (chat_ready, request.priority, request.seq, request))
+                        continue
+                    token_wait = self._token_wait(now)
+                    if token_wait:
+                        wait = token_wait
+                    else:
+                        heapq.heappop(self._ready)
+                        self._chat_next[request.chat_id] = now + self._chat_interval(request.chat_id)
+                        await self._slots.acquire()
+                        task = loop.create_task(self._deliver(request))
+                        self._sending.add(task)
+                        task.add_done_callback(self._sending.discard)
+                        continue
+
+                if self._delayed:
+                    delayed_wait = max(self._delayed[0][0] - now, 0.0)
+                    wait = delayed_wait if wait is None else min(wait, delayed_wait)
+                if len(self._chat_next) > 10000:
+                    self._chat_next = {chat: ready for chat, ready in self._chat_next.items() if ready > now}
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка в очереди исходящих сообщений: {e}")
+                await asyncio.sleep(1)
+
+    async def _deliver(self, request: OutboundRequest):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await request.callback(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            request.attempts += 1
+            if request.attempts > self.max_retries:
+                self.failed += 1
+                if not request.future.done():
+                    request.future.set_exception(e)
+                return
+            self.retries += 1
+            # Флуд-лимит общий для бота: пауза для всех чатов
+            resume_at = loop.time() + retry_after
+            self._paused_until = max(self._paused_until, resume_at)
+            heapq.heappush(self._delayed, (resume_at, request.priority, request.seq, request))
+            logger.warning(f"⏳ RetryAfter {retry_after} с для чата {request.chat_id}, повтор {request.attempts}")
+        except Exception as e:
+            self.failed += 1
+            if not request.future.done():
+                request.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not request.future.done():
+                request.future.set_result(result)
+        finally:
+            self._slots.release()
+            self._wakeup.set()
+
+    def prometheus_lines(self) -> list:
+        """Метрики очереди в текстовом формате Prometheus"""
+        lines = [
+            "# TYPE outbox_sent_total counter",
+            f"outbox_sent_total {self.sent}",
+            "# TYPE outbox_retries_total counter",
+            f"outbox_retries_total {self.retries}",
+            "# TYPE outbox_failed_total counter",
+            f"outbox_failed_total {self.failed}",
+            "# TYPE outbox_queue_depth gauge",
+        ]
+        for name, depth in self.depths().items():
+            lines.append(f'outbox_queue_depth{{priority="{name}"}} {depth}')
+        return lines
+
+# Глобальная очередь исходящих сообщений (подключается в Application.builder().rate_limiter)
+outbox = Outbox()
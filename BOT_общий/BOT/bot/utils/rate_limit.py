@@ -0,0 +1,17 @@
+import asyncio
+
+class RateLimiter:
+    """Не больше rate операций в секунду, равномерно (без всплесков)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self):
+        """Дождаться своей очереди"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -1,30 +1,67 @@
+import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from database.database import SessionLocal
-from database.crud import ReminderCRUD
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncReminderCRUD, AsyncStatisticCRUD
 from bot.config import config
+from bot.utils.dispatcher import APSchedulerDispatcher, HeapDispatcher
+from bot.utils.delivery_metrics import delivery_metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ReminderScheduler:
-    """Класс для управления расписанием напоминаний"""
+    """Класс для управления расписанием напоминаний
+    
+    Источник истины - таблица reminders. В памяти держатся только напоминания
+    до self.horizon; следующее окно периодически подгружается одним запросом
+    по индексу (is_active, scheduled_time), поэтому перезапуск ничего не теряет.
+    """
     
     def __init__(self):
         self.scheduler = AsyncIOScheduler(timezone=config.TIMEZONE)
         self.callback = None
+        if config.REMINDER_DISPATCHER == 'heap':
+            self.dispatcher = HeapDispatcher(self._trigger_reminder, self.now)
+        else:
+            self.dispatcher = APSchedulerDispatcher(self.scheduler, self._trigger_reminder)
+        if config.REMINDER_WINDOW_MINUTES > 0:
+            self.window = timedelta(minutes=config.REMINDER_WINDOW_MINUTES)
+        else:
+            self.window = None
+        # Граница загруженного окна (None - окно ещё не загружено)
+        self.horizon = None
+        # Начало первого окна: досылка берёт пропущенные строго раньше, окно - с этого момента
+        self.started_at = None
+        # Наступившие напоминания, ожидающие отправки пачкой
+        self._pending = []
+        self._flush_task = None
+        self._send_limit = asyncio.Semaphore(config.REMINDER_SEND_CONCURRENCY)
+        # Отправки, ожидающие или выполняющие callback
+        self._in_flight = 0
+        # Режим 'lease': каждое напоминание отправляет тот воркер, который его арендовал
+        self.leased = config.REMINDER_DELIVERY == 'lease'
+        self.worker_id = config.WORKER_ID
+        # Досылка пропущенных за время простоя
+        self._catchup_task = None
+        self._catchup_queue = None
+        delivery_metrics.queue_source = self.queue_depths
     
     def start(self):
         """Запустить планировщик"""
         if not self.scheduler.running:
             self.scheduler.start()
+            self.dispatcher.start()
             logger.info("✅ Scheduler запущен")
     
     def stop(self):
         """Остановить планировщик"""
         if self.scheduler.running:
+            if self._catchup_task is not None:
+                self._catchup_task.cancel()
+                self._catchup_task = None
+            self.dispatcher.stop()
             self.scheduler.shutdown()
             logger.info("⏹️ Scheduler остановлен")
     
@@ -32,66 +69,334 @@ class ReminderScheduler:
         """Установить callback для напоминаний"""
         self.callback = callback
     
+    def now(self) -> datetime:
+        """Текущее время в часовом поясе планировщика (в нём хранится scheduled_time)"""
+        return datetime.now(self.scheduler.timezone).replace(tzinfo=None)
+    
     def add_reminder_job(self, reminder_id: int, scheduled_time: datetime):
         """Добавить задачу для напоминания"""
-        job_id = f"reminder_{reminder_id}"
-        
-        # Удалить старую задачу если существует
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
+        if self.window is not None and (self.horizon is None or scheduled_time > self.horizon):
+            logger.info(f"🕒 Напоминание {reminder_id} на {scheduled_time} будет запланировано с загрузкой окна")
+            return
         
-        # Добавить новую задачу
-        self.scheduler.add_job(
-            self._trigger_reminder,
-            args=(reminder_id,),
-            trigger='date',
-            run_date=scheduled_time,
-            id=job_id,
-            replace_existing=True
-        )
+        self.dispatcher.schedule(reminder_id, scheduled_time)
         logger.info(f"➕ Напоминание {reminder_id} запланировано на {scheduled_time}")
     
     def remove_reminder_job(self, reminder_id: int):
         """Удалить задачу напоминания"""
-        job_id = f"reminder_{reminder_id}"
-        job = self.scheduler.get_job(job_id)
-        if job:
-            job.remove()
+        if self.dispatcher.cancel(reminder_id):
             logger.info(f"➖ Напоминание {reminder_id} удалено из расписания")
     
     async def _trigger_reminder(self, reminder_id: int):
-        """Триггер напоминания"""
+        """Триггер напоминания: поставить в пачку на отправку"""
+        self._pending.append(reminder_id)
+        if len(self._pending) >= config.REMINDER_BATCH_SIZE:
+            await self._flush_pending()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        """Собрать напоминания, наступившие почти одновременно, и отправить их"""
+        await asyncio.sleep(config.REMINDER_BATCH_DELAY)
+        self._flush_task = None
+        await self._flush_pending()
+    
+    async def _flush_pending(self):
+        while self._pending:
+            batch = self._pending[:config.REMINDER_BATCH_SIZE]
+            del self._pending[:config.REMINDER_BATCH_SIZE]
+            await self.fire_batch(batch)
+    
+    async def _claim(self, reminder_ids: list = None, limit: int = None, lookback_minutes: int = None) -> list:
+        """Арендовать наступившие напоминания (все воркеры видят одно окно, отправляет один)"""
+        now = self.now()
+        if lookback_minutes is None:
+            lookback_minutes = config.REMINDER_LEASE_LOOKBACK_MINUTES
+        db = AsyncSessionLocal()
         try:
-            db = SessionLocal()
-            reminder = ReminderCRUD.get_by_id(db, reminder_id)
+            return await AsyncReminderCRUD.claim_due(
+                db, self.worker_id, config.REMINDER_LEASE_SECONDS, now,
+                due_after=now - timedelta(minutes=lookback_minutes),
+                reminder_ids=reminder_ids, limit=limit
+            )
+        finally:
+            await db.close()
+    
+    async def poll_leases(self):
+        """Отправить наступившие напоминания, которые никто не отправил (в т.ч. из-за падения воркера)"""
+        if self.catching_up:
+            # Пропущенные за простой досылаются с ограничением скорости
+            return
+        try:
+            while True:
+                claimed = await self._claim(limit=config.REMINDER_BATCH_SIZE)
+                if claimed:
+                    await self.fire_batch(claimed, claimed=True)
+                if len(claimed) < config.REMINDER_BATCH_SIZE:
+                    break
+        except Exception as e:
+            logger.error(f"❌ Ошибка при поиске неотправленных напоминаний: {e}")
+    
+    async def fire_batch(self, reminder_ids: list, claimed: bool = False, late: bool = False):
+        """Отправить пачку напоминаний: один запрос на загрузку, один UPDATE после отправки"""
+        try:
+            if self.leased and not claimed:
+                lookback = config.REMINDER_CATCHUP_GRACE_MINUTES if late else None
+                reminder_ids = await self._claim(reminder_ids=reminder_ids, lookback_minutes=lookback)
+                if not reminder_ids:
+                    return
+            
+            now = self.now()
+            db = AsyncSessionLocal()
+            try:
+                reminders = await AsyncReminderCRUD.get_due_batch(db, reminder_ids, due_before=now)
+            finally:
+                await db.close()
+            
+            if not reminders or not self.callback:
+                return
+            
+            # Напоминания одного чата уходят одним сообщением
+            per_chat = {}
+            for reminder in reminders:
+                per_chat.setdefault(reminder.user.telegram_id, []).append(reminder)
+            size = max(config.REMINDER_COALESCE_MAX, 1)
+            messages = [group[i:i + size] for group in per_chat.values() for i in range(0, len(group), size)]
+            
+            results = await asyncio.gather(*(self._send(message, late) for message in messages))
+            delivered = [reminder.id for message, sent in zip(messages, results) if sent for reminder in message]
             
-            if reminder and self.callback:
-                await self.callback(reminder)
-                logger.info(f"🔔 Напоминание {reminder_id} отправлено")
+            # Следующие срабатывания повторяющихся (пропущенные за время простоя не догоняются)
+            next_times = {}
+            for reminder in reminders:
+                next_time = reminder.next_occurrence(max(reminder.scheduled_time, now))
+                if next_time is not None:
+                    next_times[reminder.id] = next_time
             
-            db.close()
+            db = AsyncSessionLocal()
+            try:
+                await AsyncReminderCRUD.mark_triggered(
+                    db, delivered, owner=self.worker_id if self.leased else None,
+                    next_times={reminder_id: next_times[reminder_id] for reminder_id in delivered if reminder_id in next_times},
+                    late=late
+                )
+                if not self.leased:
+                    # Без аренды неудачная отправка не повторяется - повторяющееся переходит к следующему разу
+                    await AsyncReminderCRUD.reschedule_occurrences(
+                        db, {reminder_id: time for reminder_id, time in next_times.items() if reminder_id not in delivered}
+                    )
+            finally:
+                await db.close()
+            
+            for reminder_id, next_time in next_times.items():
+                self.add_reminder_job(reminder_id, next_time)
+            logger.info(f"🔔 Отправлено напоминаний: {len(delivered)} из {len(reminders)}, сообщений: {len(messages)}")
         except Exception as e:
-            logger.error(f"❌ Ошибка при запуске напоминания {reminder_id}: {e}")
+            logger.error(f"❌ Ошибка при отправке пачки напоминаний {reminder_ids}: {e}")
     
-    def reschedule_all_reminders(self):
-        """Переспланировать все активные напоминания"""
+    async def _send(self, reminders: list, late: bool = False) -> bool:
+        """Отправить напоминания одного чата одним сообщением, не более REMINDER_SEND_CONCURRENCY одновременно"""
+        self._in_flight += len(reminders)
         try:
-            db = SessionLocal()
-            now = datetime.utcnow()
+            async with self._send_limit:
+                try:
+                    sent = await self.callback(reminders, late=late)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка при отправке напоминаний {[reminder.id for reminder in reminders]}: {e}")
+                    sent = False
+        finally:
+            self._in_flight -= len(reminders)
+        
+        now = self.now()
+        for reminder in reminders:
+            if sent:
+                delivery_metrics.record_delivery((now - reminder.scheduled_time).total_seconds(), late)
+            else:
+                delivery_metrics.record_failure()
+        return sent
+    
+    def queue_depths(self) -> dict:
+        """Глубина очередей: в расписании, ждут пачки, отправляются, ждут досылки"""
+        return {
+            'scheduled': len(self.dispatcher),
+            'pending': len(self._pending),
+            'in_flight': self._in_flight,
+            'catch_up': self._catchup_queue.qsize() if self.catching_up else 0,
+        }
+    
+    @property
+    def catching_up(self) -> bool:
+        """Идёт ли досылка пропущенных напоминаний"""
+        return self._catchup_task is not None and not self._catchup_task.done()
+    
+    def start_catch_up(self):
+        """Запустить досылку пропущенных за простой напоминаний в фоне (вызывается из post_init)"""
+        if config.REMINDER_CATCHUP_GRACE_MINUTES <= 0 or self.catching_up:
+            return
+        # Та же граница, с которой загружено первое окно: [since, until) и [until, horizon]
+        # не пересекаются, и напоминание не уходит дважды
+        until = self.started_at if self.started_at is not None else self.now()
+        self._catchup_task = asyncio.get_running_loop().create_task(self.catch_up(until))
+    
+    async def catch_up(self, until: datetime):
+        """Дослать активные напоминания, пропущенные в [until - grace, until)
+        
+        Пропущенные читаются из БД порциями по курсору id и проходят через очередь,
+        из которой уходит не больше REMINDER_CATCHUP_RATE сообщений в секунду.
+        Очередь ограничена, поэтому чтение из БД не обгоняет отправку.
+        Напоминания позже until обслуживает обычное окно расписания.
+        """
+        since = until - timedelta(minutes=config.REMINDER_CATCHUP_GRACE_MINUTES)
+        await self._advance_stale_recurring(since)
+        
+        rate = max(config.REMINDER_CATCHUP_RATE, 1)
+        queue = self._catchup_queue = asyncio.Queue(maxsize=max(config.REMINDER_CATCHUP_CHUNK, rate))
+        sender = asyncio.get_running_loop().create_task(self._drain_catch_up(queue, rate))
+        total = 0
+        try:
+            after_id = 0
+            while True:
+                db = AsyncSessionLocal()
+                try:
+                    chunk = await AsyncReminderCRUD.get_overdue_page(
+                        db, since, until, after_id=after_id, limit=config.REMINDER_CATCHUP_CHUNK
+                    )
+                finally:
+                    await db.close()
+                if not chunk:
+                    break
+                if not total:
+                    logger.info(f"⏪ Досылка пропущенных напоминаний с {since} ({rate}/с)")
+                for reminder_id in chunk:
+                    await queue.put(reminder_id)
+                total += len(chunk)
+                after_id = chunk[-1]
+            await queue.put(None)
+            await sender
+            if total:
+                logger.info(f"⏪ Досылка завершена: {total} пропущенных напоминаний")
+        except asyncio.CancelledError:
+            sender.cancel()
+            raise
+        except Exception as e:
+            sender.cancel()
+            logger.error(f"❌ Ошибка при досылке пропущенных напоминаний: {e}")
+    
+    async def _drain_catch_up(self, queue: asyncio.Queue, rate: int):
+        """Отправлять пропущенные из очереди пачками по rate штук не чаще раза в секунду"""
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            while len(batch) < rate and not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch[-1] is None:
+                # None - конец очереди
+                batch.pop()
+                finished = True
+            if batch:
+                started = loop.time()
+                await self.fire_batch(batch, late=True)
+                await asyncio.sleep(max(0.0, 1.0 - (loop.time() - started)))
+    
+    async def _advance_stale_recurring(self, before: datetime):
+        """Перенести повторяющиеся напоминания, пропущенные дольше окна досылки, на следующий раз"""
+        try:
+            now = self.now()
+            db = AsyncSessionLocal()
+            try:
+                stale = await AsyncReminderCRUD.get_stale_recurring(db, before)
+                next_times = {}
+                for reminder in stale:
+                    next_time = reminder.next_occurrence(now)
+                    if next_time is not None:
+                        next_times[reminder.id] = next_time
+                await AsyncReminderCRUD.reschedule_occurrences(db, next_times)
+            finally:
+                await db.close()
+            for reminder_id, next_time in next_times.items():
+                self.add_reminder_job(reminder_id, next_time)
+            if next_times:
+                logger.info(f"⏭️ Перенесено пропущенных повторяющихся напоминаний: {len(next_times)}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка при переносе пропущенных повторяющихся напоминаний: {e}")
+    
+    def schedule_stats_reconciliation(self, interval_minutes: int):
+        """Периодически исправлять расхождения счётчиков статистики"""
+        self.scheduler.add_job(
+            self._reconcile_stats,
+            trigger='interval',
+            minutes=interval_minutes,
+            id='stats_reconciliation',
+            replace_existing=True
+        )
+        logger.info(f"➕ Сверка статистики каждые {interval_minutes} мин.")
+    
+    async def _reconcile_stats(self):
+        """Сверка счётчиков статистики с таблицами"""
+        try:
+            db = AsyncSessionLocal()
+            try:
+                updated = await AsyncStatisticCRUD.reconcile_all(db)
+            finally:
+                await db.close()
+            logger.info(f"🔄 Статистика сверена для {updated} пользователей")
+        except Exception as e:
+            logger.error(f"❌ Ошибка при сверке статистики: {e}")
+    
+    async def load_window(self, now: datetime = None):
+        """Запланировать активные напоминания из следующего окна (начиная с now)"""
+        try:
+            if now is None:
+                now = self.now()
+            horizon = now + self.window if self.window is not None else None
+            
+            db = AsyncSessionLocal()
+            try:
+                upcoming = await AsyncReminderCRUD.get_schedule_window(db, now, horizon)
+            finally:
+                await db.close()
             
-            # Получить все активные напоминания на будущее
-            upcoming = db.query(ReminderCRUD.__class__.__bases__[0]).filter(
-                ReminderCRUD.scheduled_time >= now,
-                ReminderCRUD.is_active == True
-            ).all()
+            self.horizon = horizon
             
-            for reminder in upcoming:
-                self.add_reminder_job(reminder.id, reminder.scheduled_time)
+            # Окна перекрываются: уже запланированные напоминания пропускаются
+            added = 0
+            for reminder_id, scheduled_time in upcoming:
+                if reminder_id not in self.dispatcher:
+                    self.add_reminder_job(reminder_id, scheduled_time)
+                    added += 1
             
-            logger.info(f"🔄 Переспланировано {len(upcoming)} напоминаний")
-            db.close()
+            if added:
+                logger.info(f"🔄 Загружено {added} напоминаний до {horizon or 'конца'}")
         except Exception as e:
-            logger.error(f"❌ Ошибка при перепланировании напоминаний: {e}")
+            logger.error(f"❌ Ошибка при загрузке окна напоминаний: {e}")
+    
+    async def reschedule_all_reminders(self):
+        """Восстановить расписание из БД и запустить подгрузку окон"""
+        self.started_at = self.now()
+        await self.load_window(self.started_at)
+        
+        if self.window is not None:
+            # Окно должно подгружаться чаще, чем истекает, иначе между окнами будут пропуски
+            interval = min(config.REMINDER_SWEEP_SECONDS, self.window.total_seconds() / 2)
+            self.scheduler.add_job(
+                self.load_window,
+                trigger='interval',
+                seconds=interval,
+                id='reminder_window_sweep',
+                replace_existing=True
+            )
+            logger.info(f"➕ Окно напоминаний {config.REMINDER_WINDOW_MINUTES} мин., подгрузка каждые {interval:.0f} с.")
+        
+        if self.leased:
+            self.scheduler.add_job(
+                self.poll_leases,
+                trigger='interval',
+                seconds=config.REMINDER_POLL_SECONDS,
+                id='reminder_lease_poll',
+                replace_existing=True
+            )
+            logger.info(f"➕ Доставка с арендой (воркер {self.worker_id}), проверка каждые {config.REMINDER_POLL_SECONDS} с.")
 
 # Глобальный экземпляр планировщика
 reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+from telegram import Update
+from telegram.ext import Application, CallbackContext, ExtBot
+from database.database import AsyncSessionLocal, AsyncReplicaSessionLocal, HAS_REPLICAS
+from database.cache import user_cache, recent_writers
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Сессия обновления, которое обрабатывается в текущей задаче asyncio
+_update_session = contextvars.ContextVar('update_session', default=None)
+
+class UpdateSession:
+    """Единица работы обновления: сессия открывается лениво и фиксируется один раз.
+
+    Перед первым запросом к Telegram сделанное фиксируется досрочно (commit), чтобы
+    транзакция и блокировки не держались, пока ответ ждёт очереди исходящих и сети.
+    """
+
+    def __init__(self, telegram_id: int = None):
+        self.telegram_id = telegram_id
+        self.session = None
+        self.read_session = None
+        self.failed = False
+        # Задача, которая обрабатывает обновление (другие задачи сессию не фиксируют)
+        self.task = asyncio.current_task()
+        # Действия после успешной фиксации (например, постановка напоминания в расписание)
+        self._after_commit = []
+
+    def get(self):
+        """Получить (открыть) сессию обновления"""
+        if self.session is None:
+            self.session = AsyncSessionLocal()
+            # CRUD внутри единицы работы делает flush вместо commit
+            self.session.info['unit_of_work'] = True
+        return self.session
+
+    def get_read(self):
+        """Сессия для чтения: реплика, если пользователь недавно ничего не записывал"""
+        if not HAS_REPLICAS or self.session is not None:
+            return self.get()
+        if self.telegram_id is not None and recent_writers.get(self.telegram_id):
+            return self.get()
+        if self.read_session is None:
+            self.read_session = AsyncReplicaSessionLocal()
+        return self.read_session
+
+    def after_commit(self, callback):
+        """Выполнить callback() после фиксации изменений (при откате - не выполнять)"""
+        self._after_commit.append(callback)
+
+    async def commit(self):
+        """Зафиксировать сделанное к этому моменту; сессия остаётся открытой для дальнейшей работы"""
+        if self.failed or self.session is None or not self.session.in_transaction():
+            self._committed()
+            return
+        try:
+            await self.session.commit()
+        except Exception:
+            self.failed = True
+            raise
+        self._committed()
+
+    def _committed(self):
+        if self.failed:
+            return
+        if self.session is not None and self.session.info.get('wrote') and self.telegram_id is not None:
+            # Пока реплики догоняют, пользователь читает свои записи с основной БД
+            recent_writers.set(self.telegram_id, True)
+        callbacks, self._after_commit = self._after_commit, []
+        if self.session is not None:
+            # Действия, зарегистрированные CRUD (см. _after_commit в database/crud_async.py)
+            callbacks = self.session.info.pop('after_commit', []) + callbacks
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"❌ Ошибка в действии после фиксации: {e}")
+
+    async def finish(self):
+        """Зафиксировать или откатить изменения и закрыть сессии"""
+        if self.read_session is not None:
+            await self.read_session.close()
+            self.read_session = None
+
+        if self.session is None:
+            self._committed()
+            return
+
+        try:
+            if self.failed:
+                await self.session.rollback()
+            else:
+                await self.session.commit()
+                self._committed()
+        except Exception as e:
+            logger.error(f"❌ Ошибка при фиксации изменений обновления: {e}")
+            self.failed = True
+            await self.session.rollback()
+        finally:
+            if self.failed:
+                # В кеше могли остаться записи о пользователях из откаченной транзакции
+                user_cache.clear()
+                self._after_commit.clear()
+                self.session.info.pop('after_commit', None)
+            await self.session.close()
+            self.session = None
+
+async def commit_current_update():
+    """Зафиксировать единицу работы обновления перед сетевым вызовом (для очереди исходящих)"""
+    holder = _update_session.get()
+    if holder is not None and holder.task is asyncio.current_task():
+        await holder.commit()
+
+class UpdateContext(CallbackContext[ExtBot, dict, dict, dict]):
+    """Контекст обработчиков с сессией БД текущего обновления (context.db)"""
+
+    @property
+    def db(self):
+        holder = _update_session.get()
+        if holder is None:
+            raise RuntimeError("Сессия БД доступна только при обработке обновления")
+        return holder.get()
+
+    @property
+    def db_read(self):
+        """Сессия для обработчиков, которые только читают (может указывать на реплику)"""
+        holder = _update_session.get()
+        if holder is None:
+            raise RuntimeError("Сессия БД доступна только при обработке обновления")
+        return holder.get_read()
+
+    async def commit(self):
+        """Зафиксировать изменения обновления сейчас, не дожидаясь конца обработки"""
+        holder = _update_session.get()
+        if holder is not None:
+            await holder.commit()
+
+    def after_commit(self, callback):
+        """Выполнить callback() после фиксации изменений обновления (при откате - не выполнять)"""
+        holder = _update_session.get()
+        if holder is None:
+            raise RuntimeError("Сессия БД доступна только при обработке обновления")
+        holder.after_commit(callback)
+
+    def rollback_db(self):
+        """Откатить изменения обновления вместо фиксации"""
+        holder = _update_session.get()
+        if holder is not None:
+            holder.failed = True
+
+class UnitOfWorkApplication(Application):
+    """Application, открывающий одну сессию БД на обновление и фиксирующий её в конце"""
+
+    async def process_update(self, update: object) -> None:
+        user = update.effective_user if isinstance(update, Update) else None
+        holder = UpdateSession(user.id if user else None)
+        token = _update_session.set(holder)
+        try:
+            await super().process_update(update)
+        finally:
+            await holder.finish()
+            _update_session.reset(token)
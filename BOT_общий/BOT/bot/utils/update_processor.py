@@ -0,0 +1,71 @@
+"""
+Параллельная обработка обновлений с сохранением порядка для каждого пользователя
+
+Обновления разных пользователей обрабатываются одновременно (не больше UPDATE_CONCURRENCY),
+обновления одного пользователя - строго по очереди, в порядке поступления: иначе
+ConversationHandler и context.user_data увидели бы шаги диалога вперемешку.
+
+Сначала берётся блокировка пользователя, потом слот общего лимита: обновления,
+ждущие своего пользователя, не занимают слоты и не тормозят остальных.
+"""
+
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Лимит базового класса считает и ждущие обновления, поэтому он не ограничивает;
+# одновременно выполняющиеся обновления ограничивает собственный семафор
+MAX_PENDING_UPDATES = 2 ** 31 - 1
+
+class KeyedUpdateProcessor(BaseUpdateProcessor):
+    """Обработчик обновлений: параллельно между пользователями, последовательно внутри пользователя"""
+
+    def __init__(self, concurrency: int):
+        super().__init__(MAX_PENDING_UPDATES)
+        self.concurrency = concurrency
+        self._running = asyncio.BoundedSemaphore(concurrency)
+        # Ключ -> [блокировка, число обновлений, которые её держат или ждут]
+        self._locks = {}
+
+    @staticmethod
+    def key(update: object):
+        """Ключ очереди: пользователь, иначе чат; None - обновление без порядка"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    def pending(self) -> int:
+        """Сколько пользователей сейчас обрабатывается или ждёт очереди"""
+        return len(self._locks)
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        key = self.key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        # Блокировка берётся до первого await: asyncio.Lock будит ждущих по очереди,
+        # поэтому обновления пользователя выполняются в порядке поступления
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._running:
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        """Ресурсов для инициализации нет"""
+
+    async def shutdown(self) -> None:
+        """Ресурсов для освобождения нет"""
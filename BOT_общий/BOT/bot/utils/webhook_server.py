@@ -0,0 +1,89 @@
+"""
+Приём обновлений через webhook (aiohttp)
+
+POST WEBHOOK_PATH - Telegram присылает обновление. Запрос проверяется по секретному
+токену (заголовок X-Telegram-Bot-Api-Secret-Token), обновление кладётся в очередь
+приложения, и сразу возвращается 200: обработка идёт уже после ответа, тем же
+Application и теми же обработчиками, что и при long polling.
+
+Несколько воркеров за балансировщиком принимают обновления независимо; состояние
+ConversationHandler хранится в памяти процесса, поэтому балансировщик должен
+направлять обновления одного пользователя в один воркер.
+"""
+
+import asyncio
+import hmac
+import signal
+from aiohttp import web
+from telegram import Update
+from bot.config import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+async def webhook_handler(request: web.Request) -> web.Response:
+    """Принять обновление от Telegram"""
+    secret = request.headers.get(SECRET_HEADER, "")
+    if not hmac.compare_digest(secret, config.WEBHOOK_SECRET):
+        return web.Response(status=403)
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+
+    application = request.app['application']
+    try:
+        update = Update.de_json(data, application.bot)
+    except Exception as e:
+        logger.warning(f"⚠️ Некорректное обновление в webhook: {e}")
+        return web.Response(status=400)
+    application.update_queue.put_nowait(update)
+    return web.Response()
+
+async def start_webhook_server(application):
+    """Запустить HTTP-сервер webhook (возвращает runner для остановки)"""
+    app = web.Application()
+    app['application'] = application
+    app.router.add_post(config.WEBHOOK_PATH, webhook_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT).start()
+    logger.info(f"🌐 Webhook слушает http://{config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+    return runner
+
+async def run_webhook(application, allowed_updates: list):
+    """Жизненный цикл приложения в режиме webhook (как Application.run_polling)"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    runner = None
+    try:
+        # Ошибка в initialize или post_init тоже должна закрыть то, что успело открыться
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        # Сервер поднимается до setWebhook: первые обновления не должны получить отказ
+        runner = await start_webhook_server(application)
+        await application.start()
+        await application.bot.set_webhook(
+            url=config.WEBHOOK_URL.rstrip('/') + config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS
+        )
+        logger.info("✅ Webhook установлен")
+        await stop_event.wait()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
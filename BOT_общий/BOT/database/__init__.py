@@ -1,11 +1,15 @@
-from .database import init_db, get_db, SessionLocal
+from .database import init_db, get_db, get_db_async, SessionLocal, AsyncSessionLocal
 from .models import Base, User, Reminder, Task, Event, Statistic, TaskStatus
 from .crud import UserCRUD, ReminderCRUD, TaskCRUD, EventCRUD, StatisticCRUD
+from .cache import UserIdentity, user_cache
+from .crud_async import AsyncUserCRUD, AsyncReminderCRUD, AsyncTaskCRUD, AsyncEventCRUD, AsyncStatisticCRUD
 
 __all__ = [
     'init_db',
     'get_db',
+    'get_db_async',
     'SessionLocal',
+    'AsyncSessionLocal',
     'Base',
     'User',
     'Reminder',
@@ -18,4 +22,11 @@ __all__ = [
     'TaskCRUD',
     'EventCRUD',
     'StatisticCRUD',
+    'UserIdentity',
+    'user_cache',
+    'AsyncUserCRUD',
+    'AsyncReminderCRUD',
+    'AsyncTaskCRUD',
+    'AsyncEventCRUD',
+    'AsyncStatisticCRUD',
 ]
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from bot.config import config
+
+
+class UserIdentity(NamedTuple):
+    """Лёгкая запись о пользователе для проверок в обработчиках"""
+    id: int
+    telegram_id: int
+    role: str
+    full_name: Optional[str] = None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role in ['ADMIN', 'SUPERADMIN']
+
+
+class TTLCache:
+    """Ограниченный LRU-кеш с временем жизни записей"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Получить значение или None, если записи нет или она устарела"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Сохранить значение"""
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Удалить запись"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Очистить кеш"""
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# telegram_id -> UserIdentity
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+# telegram_id пользователей, недавно записавших в БД (читают с основной БД, а не с реплики)
+recent_writers = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.REPLICA_STICKY_SECONDS)
@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import desc, and_, update, insert
 from datetime import datetime, timedelta
 from database.models import User, Reminder, Task, Event, Statistic, TaskStatus
+from database.cache import user_cache
+# Счётчики статистики меняются так же, как в асинхронном CRUD
+from database.crud_async import AsyncStatisticCRUD
 
 # ============= USER OPERATIONS =============
 
@@ -45,6 +48,7 @@ class UserCRUD:
             user.role = role
             db.commit()
             db.refresh(user)
+        user_cache.invalidate(telegram_id)
         return user
     
     @staticmethod
@@ -64,6 +68,7 @@ class UserCRUD:
                 user.full_name = full_name
             db.commit()
             db.refresh(user)
+        user_cache.invalidate(telegram_id)
         return user
 
 
@@ -71,15 +76,20 @@ class UserCRUD:
 
 class ReminderCRUD:
     @staticmethod
-    def create(db: Session, user_id: int, title: str, description: str = None, scheduled_time: datetime = None):
-        """Создать напоминание"""
+    def create(db: Session, user_id: int, title: str, description: str = None, scheduled_time: datetime = None,
+               recurrence_rule: str = None):
+        """Создать напоминание (recurrence_rule - правило RRULE для повторения)"""
+        scheduled_time = scheduled_time or datetime.utcnow()
         reminder = Reminder(
             user_id=user_id,
             title=title,
             description=description,
-            scheduled_time=scheduled_time or datetime.utcnow()
+            scheduled_time=scheduled_time,
+            recurrence_rule=recurrence_rule,
+            recurrence_start=scheduled_time if recurrence_rule else None
         )
         db.add(reminder)
+        StatisticCRUD.increment(db, user_id, total_reminders=1)
         db.commit()
         db.refresh(reminder)
         return reminder
@@ -116,6 +126,7 @@ class ReminderCRUD:
         reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
         if reminder:
             db.delete(reminder)
+            StatisticCRUD.increment(db, reminder.user_id, total_reminders=-1)
             db.commit()
             return True
         return False
@@ -147,6 +158,7 @@ class TaskCRUD:
             status=TaskStatus.TODO.value
         )
         db.add(task)
+        StatisticCRUD.increment(db, user_id, total_tasks=1)
         db.commit()
         db.refresh(task)
         return task
@@ -169,9 +181,12 @@ class TaskCRUD:
         """Обновить статус задачи"""
         task = db.query(Task).filter(Task.id == task_id).first()
         if task:
+            deltas = AsyncStatisticCRUD.status_deltas(task.status, status)
             task.status = status
             if status == TaskStatus.COMPLETED.value:
                 task.completed_at = datetime.utcnow()
+            if deltas:
+                StatisticCRUD.increment(db, task.user_id, **deltas)
             db.commit()
             db.refresh(task)
         return task
@@ -182,6 +197,8 @@ class TaskCRUD:
         task = db.query(Task).filter(Task.id == task_id).first()
         if task:
             db.delete(task)
+            deltas = AsyncStatisticCRUD.status_deltas(task.status, None)
+            StatisticCRUD.increment(db, task.user_id, total_tasks=-1, **deltas)
             db.commit()
             return True
         return False
@@ -200,6 +217,7 @@ class TaskCRUD:
                 task.priority = priority
             if due_date:
                 task.due_date = due_date
+                task.due_alert_minutes = None
             db.commit()
             db.refresh(task)
         return task
@@ -222,6 +240,7 @@ class EventCRUD:
             event_type=event_type
         )
         db.add(event)
+        StatisticCRUD.increment(db, user_id, total_events=1)
         db.commit()
         db.refresh(event)
         return event
@@ -250,6 +269,7 @@ class EventCRUD:
         event = db.query(Event).filter(Event.id == event_id).first()
         if event:
             db.delete(event)
+            StatisticCRUD.increment(db, event.user_id, total_events=-1)
             db.commit()
             return True
         return False
@@ -273,35 +293,42 @@ class EventCRUD:
 class StatisticCRUD:
     @staticmethod
     def get_or_create(db: Session, user_id: int):
-        """Получить или создать статистику"""
+        """Получить или создать статистику (новая строка заполняется пересчётом)"""
         stat = db.query(Statistic).filter(Statistic.user_id == user_id).first()
         if not stat:
-            stat = Statistic(user_id=user_id)
-            db.add(stat)
+            StatisticCRUD.increment(db, user_id)
             db.commit()
-            db.refresh(stat)
+            stat = db.query(Statistic).filter(Statistic.user_id == user_id).first()
         return stat
     
+    @staticmethod
+    def increment(db: Session, user_id: int, **deltas):
+        """Атомарно изменить счётчики: UPDATE statistics SET x = x + delta.
+
+        Не коммитит - выполняется в транзакции изменения, к которому относится.
+        Если строки статистики ещё нет, она создаётся полным пересчётом.
+        """
+        values = {name: getattr(Statistic, name) + delta for name, delta in deltas.items()}
+        values['last_activity'] = datetime.utcnow()
+        result = db.execute(
+            update(Statistic).where(Statistic.user_id == user_id).values(**values)
+        )
+        if result.rowcount == 0:
+            db.flush()
+            db.execute(insert(Statistic).values(
+                user_id=user_id, last_activity=datetime.utcnow(),
+                **AsyncStatisticCRUD._recount_columns(user_id)
+            ))
+    
     @staticmethod
     def update_stats(db: Session, user_id: int):
-        """Обновить статистику пользователя"""
+        """Пересчитать статистику пользователя по таблицам"""
         stat = StatisticCRUD.get_or_create(db, user_id)
-        
-        # Подсчёт завершённых задач
-        completed_tasks = db.query(Task).filter(
-            and_(Task.user_id == user_id, Task.status == TaskStatus.COMPLETED.value)
-        ).count()
-        
-        total_tasks = db.query(Task).filter(Task.user_id == user_id).count()
-        total_reminders = db.query(Reminder).filter(Reminder.user_id == user_id).count()
-        total_events = db.query(Event).filter(Event.user_id == user_id).count()
-        
-        stat.completed_tasks = completed_tasks
-        stat.total_tasks = total_tasks
-        stat.total_reminders = total_reminders
-        stat.total_events = total_events
-        stat.last_activity = datetime.utcnow()
-        
+        db.execute(
+            update(Statistic)
+            .where(Statistic.user_id == user_id)
+            .values(last_activity=datetime.utcnow(), **AsyncStatisticCRUD._recount_columns(user_id))
+        )
         db.commit()
         db.refresh(stat)
         return stat
@@ -0,0 +1,1193 @@
+from sqlalchemy import select, update, insert, delete, func, desc, and_, or_, case, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta, date
+from database.models import (
+    User, Reminder, Task, Event, Statistic, Broadcast, TaskStatus, BroadcastStatus, OPEN_TASKS_CONDITION
+)
+from database.cache import UserIdentity, user_cache
+
+# Асинхронные версии CRUD из database/crud.py.
+# Принимают AsyncSession или ThreadedSession (см. database/database.py).
+
+
+def _keyset(query, model, order_by, after_id: int = None, before_id: int = None, limit: int = None):
+    """Keyset-пагинация: строки после (after_id) или до (before_id) указанной строки.
+
+    order_by - список пар (колонка, по убыванию); последним ключом должен идти уникальный id.
+    Значения ключей якорной строки берутся подзапросом по первичному ключу, поэтому
+    курсором служит только id. При before_id строки возвращаются в обратном порядке.
+    """
+    anchor_id = after_id if after_id is not None else before_id
+    backward = after_id is None and before_id is not None
+
+    if anchor_id is not None:
+        conditions = []
+        equal = []
+        for column, descending in order_by:
+            anchor = select(column).where(model.id == anchor_id).scalar_subquery()
+            if descending != backward:
+                conditions.append(and_(*equal, column < anchor))
+            else:
+                conditions.append(and_(*equal, column > anchor))
+            equal.append(column == anchor)
+        query = query.where(or_(*conditions))
+
+    query = query.order_by(*[
+        column.desc() if descending != backward else column.asc()
+        for column, descending in order_by
+    ])
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+async def _commit(db: AsyncSession, *refresh):
+    """Зафиксировать изменения.
+
+    Внутри единицы работы обновления (db.info['unit_of_work']) выполняется только flush:
+    коммит один на всё обновление, и повторное чтение объектов не требуется.
+    """
+    if db.info.get('unit_of_work'):
+        await db.flush()
+        return
+    await db.commit()
+    for instance in refresh:
+        await db.refresh(instance)
+
+
+def _after_commit(db: AsyncSession, callback):
+    """Выполнить callback() после фиксации: внутри единицы работы - когда она зафиксируется"""
+    if db.info.get('unit_of_work'):
+        db.info.setdefault('after_commit', []).append(callback)
+    else:
+        callback()
+
+
+def _invalidate_user(db: AsyncSession, telegram_id: int):
+    """Сбросить пользователя в кеше сейчас и ещё раз после фиксации.
+
+    До фиксации единицы работы параллельное обновление может прочитать старую строку
+    и снова положить её в кеш - повторный сброс после фиксации это исправляет.
+    """
+    user_cache.invalidate(telegram_id)
+    _after_commit(db, lambda: user_cache.invalidate(telegram_id))
+
+
+async def _fetch_page(db: AsyncSession, query, model, order_by, limit: int,
+                      after_id: int = None, before_id: int = None):
+    """Выполнить keyset-запрос и вернуть страницу в прямом порядке"""
+    result = await db.scalars(_keyset(query, model, order_by, after_id, before_id, limit))
+    items = result.all()
+    if after_id is None and before_id is not None:
+        items = list(reversed(items))
+    return items
+
+# ============= USER OPERATIONS =============
+
+class AsyncUserCRUD:
+    @staticmethod
+    async def get_or_create(db: AsyncSession, telegram_id: int, username: str = None, full_name: str = None):
+        """Получить или создать пользователя"""
+        user = await db.scalar(select(User).where(User.telegram_id == telegram_id))
+        if not user:
+            user = User(
+                telegram_id=telegram_id,
+                username=username,
+                full_name=full_name,
+                role='STUDENT'
+            )
+            db.add(user)
+            await db.flush()
+            db.add(Statistic(user_id=user.id))
+            await _commit(db, user)
+        AsyncUserCRUD._cache_user(user)
+        return user
+
+    @staticmethod
+    def _cache_user(user: User) -> UserIdentity:
+        identity = UserIdentity(user.id, user.telegram_id, user.role, user.full_name)
+        user_cache.set(user.telegram_id, identity)
+        return identity
+
+    @staticmethod
+    async def get_identity(db: AsyncSession, telegram_id: int):
+        """Получить (id, роль) пользователя по telegram_id, с кешированием"""
+        identity = user_cache.get(telegram_id)
+        if identity is None:
+            result = await db.execute(
+                select(User.id, User.telegram_id, User.role, User.full_name).where(User.telegram_id == telegram_id)
+            )
+            row = result.first()
+            if row is None:
+                return None
+            identity = UserIdentity(*row)
+            user_cache.set(telegram_id, identity)
+        return identity
+
+    @staticmethod
+    async def ensure_identity(db: AsyncSession, telegram_id: int, username: str = None, full_name: str = None):
+        """Получить запись пользователя из кеша или создать пользователя"""
+        identity = await AsyncUserCRUD.get_identity(db, telegram_id)
+        if identity is None:
+            user = await AsyncUserCRUD.get_or_create(db, telegram_id, username, full_name)
+            identity = AsyncUserCRUD._cache_user(user)
+        return identity
+
+    @staticmethod
+    async def get_by_telegram_id(db: AsyncSession, telegram_id: int):
+        """Получить пользователя по telegram_id"""
+        return await db.scalar(select(User).where(User.telegram_id == telegram_id))
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, user_id: int):
+        """Получить пользователя по ID"""
+        return await db.get(User, user_id)
+
+    @staticmethod
+    async def get_all(db: AsyncSession):
+        """Получить всех пользователей"""
+        result = await db.scalars(select(User).order_by(User.id))
+        return result.all()
+
+    @staticmethod
+    async def get_page(db: AsyncSession, limit: int = 10, after_id: int = None, before_id: int = None):
+        """Страница пользователей (keyset по id)"""
+        return await _fetch_page(db, select(User), User, [(User.id, False)], limit, after_id, before_id)
+
+    @staticmethod
+    async def get_recipients_page(db: AsyncSession, after_id: int = 0, limit: int = 100):
+        """Получить (id, telegram_id) пользователей после after_id (keyset по первичному ключу)"""
+        result = await db.execute(
+            select(User.id, User.telegram_id).where(User.id > after_id).order_by(User.id).limit(limit)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_all_admins(db: AsyncSession):
+        """Получить всех администраторов"""
+        result = await db.scalars(select(User).where(User.role.in_(['ADMIN', 'SUPERADMIN'])))
+        return result.all()
+
+    @staticmethod
+    async def count(db: AsyncSession, admins_only: bool = False):
+        """Количество пользователей"""
+        query = select(func.count(User.id))
+        if admins_only:
+            query = query.where(User.role.in_(['ADMIN', 'SUPERADMIN']))
+        return await db.scalar(query)
+
+    @staticmethod
+    async def set_admin(db: AsyncSession, telegram_id: int, role: str = 'ADMIN'):
+        """Назначить администратора"""
+        user = await db.scalar(select(User).where(User.telegram_id == telegram_id))
+        if user:
+            user.role = role
+            await _commit(db, user)
+        _invalidate_user(db, telegram_id)
+        return user
+
+    @staticmethod
+    async def is_admin(db: AsyncSession, telegram_id: int):
+        """Проверить, является ли пользователь администратором"""
+        identity = await AsyncUserCRUD.get_identity(db, telegram_id)
+        return identity is not None and identity.is_admin
+
+    @staticmethod
+    async def update_profile(db: AsyncSession, telegram_id: int, username: str = None, full_name: str = None):
+        """Обновить профиль пользователя"""
+        user = await db.scalar(select(User).where(User.telegram_id == telegram_id))
+        if user:
+            if username:
+                user.username = username
+            if full_name:
+                user.full_name = full_name
+            await _commit(db, user)
+        _invalidate_user(db, telegram_id)
+        return user
+
+    @staticmethod
+    async def set_digest_hour(db: AsyncSession, telegram_id: int, hour: int = None):
+        """Подписать на ежедневную сводку в указанный час (None - отписать)"""
+        result = await db.execute(
+            update(User)
+            .where(User.telegram_id == telegram_id)
+            .values(digest_hour=hour)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = result.first() is not None
+        await _commit(db)
+        return updated
+
+    @staticmethod
+    async def get_digest_hour(db: AsyncSession, telegram_id: int):
+        """Час ежедневной сводки пользователя (None - не подписан)"""
+        return await db.scalar(select(User.digest_hour).where(User.telegram_id == telegram_id))
+
+    @staticmethod
+    async def stream_digest_recipients(db: AsyncSession, hour: int, today: date, chunk_size: int = 1000):
+        """Потоково выбрать (id, telegram_id) подписчиков, чей час сводки наступил, а сводка за today
+        не отправлена. Строки читаются курсором порциями по chunk_size (yield_per).
+        """
+        result = await db.stream(
+            select(User.id, User.telegram_id)
+            .where(
+                User.digest_hour <= hour,
+                or_(User.digest_sent_on == None, User.digest_sent_on < today)
+            )
+            .order_by(User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    @staticmethod
+    async def claim_digest(db: AsyncSession, user_ids: list, today: date):
+        """Отметить сводку за today отправленной одним UPDATE, вернуть id отмеченных пользователей.
+
+        Пользователи, кому сводку уже отметил другой экземпляр бота, не возвращаются.
+        """
+        if not user_ids:
+            return []
+        result = await db.execute(
+            update(User)
+            .where(User.id.in_(user_ids), or_(User.digest_sent_on == None, User.digest_sent_on < today))
+            # updated_at не трогается: отправка сводки не меняет профиль
+            .values(digest_sent_on=today, updated_at=User.updated_at)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.scalars().all()
+        await _commit(db)
+        return claimed
+
+
+# ============= REMINDER OPERATIONS =============
+
+class AsyncReminderCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, user_id: int, title: str, description: str = None, scheduled_time: datetime = None,
+                     recurrence_rule: str = None):
+        """Создать напоминание (recurrence_rule - правило RRULE для повторения)"""
+        scheduled_time = scheduled_time or datetime.utcnow()
+        reminder = Reminder(
+            user_id=user_id,
+            title=title,
+            description=description,
+            scheduled_time=scheduled_time,
+            recurrence_rule=recurrence_rule,
+            recurrence_start=scheduled_time if recurrence_rule else None
+        )
+        db.add(reminder)
+        await AsyncStatisticCRUD.increment(db, user_id, total_reminders=1)
+        await _commit(db, reminder)
+        return reminder
+
+    @staticmethod
+    async def bulk_create(db: AsyncSession, user_id: int, items: list):
+        """Создать несколько напоминаний одним INSERT ... RETURNING.
+
+        items - список словарей с ключами title, description, scheduled_time.
+        """
+        if not items:
+            return []
+        now = datetime.utcnow()
+        rows = [
+            {
+                'user_id': user_id,
+                'title': item['title'],
+                'description': item.get('description'),
+                'scheduled_time': item.get('scheduled_time') or now,
+            }
+            for item in items
+        ]
+        result = await db.scalars(insert(Reminder).returning(Reminder), rows)
+        reminders = result.all()
+        await AsyncStatisticCRUD.increment(db, user_id, total_reminders=len(reminders))
+        await _commit(db)
+        return reminders
+
+    @staticmethod
+    async def bulk_set_active(db: AsyncSession, user_id: int, reminder_ids: list, is_active: bool):
+        """Включить/отключить несколько напоминаний пользователя, вернуть их id"""
+        if not reminder_ids:
+            return []
+        result = await db.execute(
+            update(Reminder)
+            .where(Reminder.user_id == user_id, Reminder.id.in_(reminder_ids), Reminder.is_active != is_active)
+            .values(is_active=is_active, updated_at=datetime.utcnow())
+            .returning(Reminder.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated_ids = result.scalars().all()
+        await _commit(db)
+        return updated_ids
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, user_id: int, reminder_ids: list):
+        """Удалить несколько напоминаний пользователя, вернуть id удалённых"""
+        if not reminder_ids:
+            return []
+        result = await db.execute(
+            delete(Reminder)
+            .where(Reminder.user_id == user_id, Reminder.id.in_(reminder_ids))
+            .returning(Reminder.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted_ids = result.scalars().all()
+        if deleted_ids:
+            await AsyncStatisticCRUD.increment(db, user_id, total_reminders=-len(deleted_ids))
+        await _commit(db)
+        return deleted_ids
+
+    @staticmethod
+    async def get_user_reminders(db: AsyncSession, user_id: int, active_only: bool = True):
+        """Получить напоминания пользователя"""
+        query = select(Reminder).where(Reminder.user_id == user_id)
+        if active_only:
+            query = query.where(Reminder.is_active == True)
+        result = await db.scalars(query.order_by(desc(Reminder.scheduled_time)))
+        return result.all()
+
+    @staticmethod
+    async def get_user_reminders_page(db: AsyncSession, user_id: int, limit: int = 3, after_id: int = None,
+                                      before_id: int = None, active_only: bool = False):
+        """Страница напоминаний пользователя (keyset по (scheduled_time, id))"""
+        query = select(Reminder).where(Reminder.user_id == user_id)
+        if active_only:
+            query = query.where(Reminder.is_active == True)
+        order_by = [(Reminder.scheduled_time, True), (Reminder.id, True)]
+        return await _fetch_page(db, query, Reminder, order_by, limit, after_id, before_id)
+
+    @staticmethod
+    async def count_user_reminders(db: AsyncSession, user_id: int, active_only: bool = False):
+        """Количество напоминаний пользователя"""
+        query = select(func.count(Reminder.id)).where(Reminder.user_id == user_id)
+        if active_only:
+            query = query.where(Reminder.is_active == True)
+        return await db.scalar(query)
+
+    @staticmethod
+    async def get_upcoming_reminders(db: AsyncSession, minutes: int = 5):
+        """Получить напоминания на ближайшие N минут"""
+        now = datetime.utcnow()
+        soon = now + timedelta(minutes=minutes)
+        result = await db.scalars(select(Reminder).where(
+            and_(
+                Reminder.scheduled_time >= now,
+                Reminder.scheduled_time <= soon,
+                Reminder.is_active == True
+            )
+        ))
+        return result.all()
+
+    @staticmethod
+    async def get_schedule_window(db: AsyncSession, start: datetime, end: datetime = None):
+        """Получить (id, scheduled_time) активных напоминаний в диапазоне [start, end] для расписания"""
+        query = select(Reminder.id, Reminder.scheduled_time).where(
+            Reminder.is_active == True,
+            Reminder.scheduled_time >= start
+        )
+        if end is not None:
+            query = query.where(Reminder.scheduled_time <= end)
+        result = await db.execute(query.order_by(Reminder.scheduled_time))
+        return result.all()
+
+    @staticmethod
+    async def get_overdue_page(db: AsyncSession, start: datetime, end: datetime, after_id: int = 0, limit: int = 500):
+        """Получить id пропущенных активных напоминаний в [start, end) порцией по курсору id"""
+        result = await db.scalars(
+            select(Reminder.id)
+            .where(
+                Reminder.is_active == True,
+                Reminder.scheduled_time >= start,
+                Reminder.scheduled_time < end,
+                Reminder.id > after_id
+            )
+            .order_by(Reminder.id)
+            .limit(limit)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_stale_recurring(db: AsyncSession, before: datetime):
+        """Получить активные повторяющиеся напоминания, срабатывание которых давно прошло"""
+        result = await db.scalars(
+            select(Reminder).where(
+                Reminder.is_active == True,
+                Reminder.recurrence_rule.is_not(None),
+                Reminder.scheduled_time < before
+            )
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, reminder_id: int):
+        """Получить напоминание по ID"""
+        return await db.get(Reminder, reminder_id)
+
+    @staticmethod
+    async def get_with_user(db: AsyncSession, reminder_id: int):
+        """Получить напоминание вместе с пользователем (без ленивой загрузки)"""
+        return await db.scalar(
+            select(Reminder).options(joinedload(Reminder.user)).where(Reminder.id == reminder_id)
+        )
+
+    @staticmethod
+    async def get_due_batch(db: AsyncSession, reminder_ids: list, due_before: datetime = None):
+        """Загрузить пачку активных напоминаний вместе с пользователями одним запросом"""
+        if not reminder_ids:
+            return []
+        query = (
+            select(Reminder)
+            .options(joinedload(Reminder.user))
+            .where(Reminder.id.in_(reminder_ids), Reminder.is_active == True)
+        )
+        if due_before is not None:
+            # Повторяющееся напоминание могли уже перенести на следующее срабатывание
+            query = query.where(Reminder.scheduled_time <= due_before)
+        result = await db.scalars(query)
+        return result.all()
+
+    @staticmethod
+    async def claim_due(db: AsyncSession, owner: str, lease_seconds: int, due_before: datetime,
+                        due_after: datetime = None, reminder_ids: list = None, limit: int = None):
+        """Арендовать наступившие напоминания для отправки воркером owner, вернуть их id.
+
+        Свободны напоминания без аренды или с истёкшей арендой (воркер упал).
+        На Postgres кандидаты блокируются FOR UPDATE SKIP LOCKED, и параллельные воркеры
+        их пропускают. SQLite выполняет UPDATE с подзапросом атомарно под единственной
+        блокировкой записи (FOR UPDATE там не генерируется).
+        """
+        now = datetime.utcnow()
+        candidates = select(Reminder.id).where(
+            Reminder.is_active == True,
+            Reminder.scheduled_time <= due_before,
+            or_(Reminder.lease_expires_at == None, Reminder.lease_expires_at < now)
+        )
+        if due_after is not None:
+            candidates = candidates.where(Reminder.scheduled_time >= due_after)
+        if reminder_ids is not None:
+            candidates = candidates.where(Reminder.id.in_(reminder_ids))
+        candidates = candidates.order_by(Reminder.scheduled_time)
+        if limit is not None:
+            candidates = candidates.limit(limit)
+        candidates = candidates.with_for_update(skip_locked=True)
+
+        result = await db.execute(
+            update(Reminder)
+            .where(Reminder.id.in_(candidates))
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .returning(Reminder.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.scalars().all()
+        await _commit(db)
+        return claimed
+
+    @staticmethod
+    async def mark_triggered(db: AsyncSession, reminder_ids: list, owner: str = None, next_times: dict = None,
+                             late: bool = False):
+        """Отметить напоминания отправленными одним UPDATE и учесть их в статистике.
+
+        Разовые напоминания отключаются. Повторяющиеся из next_times (id -> следующее
+        срабатывание) остаются активными и переносятся на следующее срабатывание.
+        С owner отмечаются только напоминания, аренда которых всё ещё у этого воркера.
+        late - напоминания досланы после простоя.
+        """
+        if not reminder_ids:
+            return []
+        now = datetime.utcnow()
+        conditions = [Reminder.id.in_(reminder_ids), Reminder.is_active == True]
+        if owner is not None:
+            conditions.append(Reminder.lease_owner == owner)
+        values = dict(
+            is_active=False, triggered_at=now, updated_at=now, lease_owner=None, lease_expires_at=None,
+            delivered_late=late
+        )
+        if next_times:
+            values['is_active'] = Reminder.id.in_(list(next_times))
+            values['scheduled_time'] = case(next_times, value=Reminder.id, else_=Reminder.scheduled_time)
+        result = await db.execute(
+            update(Reminder)
+            .where(*conditions)
+            .values(**values)
+            .returning(Reminder.id, Reminder.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        per_user = {}
+        for _, user_id in rows:
+            per_user[user_id] = per_user.get(user_id, 0) + 1
+        await AsyncStatisticCRUD.increment_many(db, 'triggered_reminders', per_user)
+        await _commit(db)
+        return [reminder_id for reminder_id, _ in rows]
+
+    @staticmethod
+    async def reschedule_occurrences(db: AsyncSession, next_times: dict):
+        """Перенести повторяющиеся напоминания на следующие срабатывания одним UPDATE"""
+        if not next_times:
+            return
+        await db.execute(
+            update(Reminder)
+            .where(Reminder.id.in_(list(next_times)))
+            .values(scheduled_time=case(next_times, value=Reminder.id), updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await _commit(db)
+
+    @staticmethod
+    async def delete(db: AsyncSession, reminder_id: int):
+        """Удалить напоминание"""
+        reminder = await db.get(Reminder, reminder_id)
+        if reminder:
+            await db.delete(reminder)
+            await AsyncStatisticCRUD.increment(db, reminder.user_id, total_reminders=-1)
+            await _commit(db)
+            return True
+        return False
+
+    @staticmethod
+    async def toggle_active(db: AsyncSession, reminder_id: int):
+        """Переключить статус напоминания"""
+        reminder = await db.get(Reminder, reminder_id)
+        if reminder:
+            reminder.is_active = not reminder.is_active
+            await _commit(db, reminder)
+        return reminder
+
+
+# ============= TASK OPERATIONS =============
+
+class AsyncTaskCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, user_id: int, title: str, description: str = None,
+                     priority: int = 3, due_date: datetime = None):
+        """Создать задачу"""
+        task = Task(
+            user_id=user_id,
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=due_date,
+            status=TaskStatus.TODO.value
+        )
+        db.add(task)
+        await AsyncStatisticCRUD.increment(db, user_id, total_tasks=1)
+        await _commit(db, task)
+        return task
+
+    @staticmethod
+    async def bulk_create(db: AsyncSession, user_id: int, items: list):
+        """Создать несколько задач одним INSERT ... RETURNING.
+
+        items - список словарей с ключами title, description, priority, due_date.
+        """
+        if not items:
+            return []
+        rows = [
+            {
+                'user_id': user_id,
+                'title': item['title'],
+                'description': item.get('description'),
+                'priority': item.get('priority') or 3,
+                'due_date': item.get('due_date'),
+                'status': TaskStatus.TODO.value,
+            }
+            for item in items
+        ]
+        result = await db.scalars(insert(Task).returning(Task), rows)
+        tasks = result.all()
+        await AsyncStatisticCRUD.increment(db, user_id, total_tasks=len(tasks))
+        await _commit(db)
+        return tasks
+
+    @staticmethod
+    async def bulk_update_status(db: AsyncSession, user_id: int, task_ids: list, status: str):
+        """Обновить статус нескольких задач пользователя, вернуть id изменённых"""
+        if not task_ids:
+            return []
+        condition = and_(Task.user_id == user_id, Task.id.in_(task_ids), Task.status != status)
+
+        # Старые статусы нужны для счётчиков статистики
+        result = await db.execute(
+            select(Task.status, func.count(Task.id)).where(condition).group_by(Task.status)
+        )
+        deltas = {}
+        for old_status, count in result.all():
+            for counter, delta in AsyncStatisticCRUD.status_deltas(old_status, status).items():
+                deltas[counter] = deltas.get(counter, 0) + delta * count
+
+        values = {'status': status, 'updated_at': datetime.utcnow()}
+        if status == TaskStatus.COMPLETED.value:
+            values['completed_at'] = datetime.utcnow()
+        result = await db.execute(
+            update(Task).where(condition).values(**values)
+            .returning(Task.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated_ids = result.scalars().all()
+        deltas = {counter: delta for counter, delta in deltas.items() if delta}
+        if deltas:
+            await AsyncStatisticCRUD.increment(db, user_id, **deltas)
+        await _commit(db)
+        return updated_ids
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, user_id: int, task_ids: list):
+        """Удалить несколько задач пользователя, вернуть id удалённых"""
+        if not task_ids:
+            return []
+        result = await db.execute(
+            delete(Task)
+            .where(Task.user_id == user_id, Task.id.in_(task_ids))
+            .returning(Task.id, Task.status)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        if rows:
+            deltas = {'total_tasks': -len(rows)}
+            for _, old_status in rows:
+                for counter, delta in AsyncStatisticCRUD.status_deltas(old_status, None).items():
+                    deltas[counter] = deltas.get(counter, 0) + delta
+            await AsyncStatisticCRUD.increment(db, user_id, **deltas)
+        await _commit(db)
+        return [task_id for task_id, _ in rows]
+
+    @staticmethod
+    async def get_open_tasks(db: AsyncSession, user_id: int, limit: int = 20):
+        """Незавершённые задачи пользователя (TODO и в процессе)"""
+        result = await db.scalars(
+            select(Task)
+            .where(Task.user_id == user_id,
+                   Task.status.in_([TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value]))
+            .order_by(Task.priority, desc(Task.created_at))
+            .limit(limit)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_user_tasks(db: AsyncSession, user_id: int, status: str = None):
+        """Получить задачи пользователя"""
+        query = select(Task).where(Task.user_id == user_id)
+        if status:
+            query = query.where(Task.status == status)
+        result = await db.scalars(query.order_by(Task.priority, desc(Task.created_at)))
+        return result.all()
+
+    @staticmethod
+    async def get_user_tasks_page(db: AsyncSession, user_id: int, limit: int = 3, after_id: int = None,
+                                  before_id: int = None, status: str = None):
+        """Страница задач пользователя (keyset по (priority, created_at, id))"""
+        query = select(Task).where(Task.user_id == user_id)
+        if status:
+            query = query.where(Task.status == status)
+        order_by = [(Task.priority, False), (Task.created_at, True), (Task.id, True)]
+        return await _fetch_page(db, query, Task, order_by, limit, after_id, before_id)
+
+    @staticmethod
+    async def count_user_tasks(db: AsyncSession, user_id: int, status: str = None):
+        """Количество задач пользователя"""
+        query = select(func.count(Task.id)).where(Task.user_id == user_id)
+        if status:
+            query = query.where(Task.status == status)
+        return await db.scalar(query)
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, task_id: int):
+        """Получить задачу по ID"""
+        return await db.get(Task, task_id)
+
+    @staticmethod
+    async def update_status(db: AsyncSession, task_id: int, status: str):
+        """Обновить статус задачи"""
+        task = await db.get(Task, task_id)
+        if task:
+            deltas = AsyncStatisticCRUD.status_deltas(task.status, status)
+            task.status = status
+            if status == TaskStatus.COMPLETED.value:
+                task.completed_at = datetime.utcnow()
+            if deltas:
+                await AsyncStatisticCRUD.increment(db, task.user_id, **deltas)
+            await _commit(db, task)
+        return task
+
+    @staticmethod
+    async def delete(db: AsyncSession, task_id: int):
+        """Удалить задачу"""
+        task = await db.get(Task, task_id)
+        if task:
+            await db.delete(task)
+            deltas = AsyncStatisticCRUD.status_deltas(task.status, None)
+            await AsyncStatisticCRUD.increment(db, task.user_id, total_tasks=-1, **deltas)
+            await _commit(db)
+            return True
+        return False
+
+    @staticmethod
+    async def update(db: AsyncSession, task_id: int, title: str = None, description: str = None,
+                     priority: int = None, due_date: datetime = None):
+        """Обновить задачу"""
+        task = await db.get(Task, task_id)
+        if task:
+            if title:
+                task.title = title
+            if description is not None:
+                task.description = description
+            if priority:
+                task.priority = priority
+            if due_date:
+                task.due_date = due_date
+                # Новый срок - оповещения о нём ещё не отправлялись
+                task.due_alert_minutes = None
+            await _commit(db, task)
+        return task
+
+    @staticmethod
+    async def get_due_for_alert(db: AsyncSession, start: datetime, end: datetime, min_offset: int):
+        """Получить открытые задачи со сроком в (start, end] одним проходом по индексу ix_tasks_due_open.
+
+        Задачи, по которым уже отправлено оповещение за min_offset минут (последнее), пропускаются.
+        Возвращает строки (id, user_id, telegram_id, title, priority, due_date, due_alert_minutes).
+        """
+        result = await db.execute(
+            select(
+                Task.id, Task.user_id, User.telegram_id, Task.title, Task.priority,
+                Task.due_date, Task.due_alert_minutes
+            )
+            .join(User, User.id == Task.user_id)
+            .where(
+                text(OPEN_TASKS_CONDITION),
+                Task.due_date > start,
+                Task.due_date <= end,
+                or_(Task.due_alert_minutes == None, Task.due_alert_minutes > min_offset)
+            )
+            .order_by(Task.due_date)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_due_for_users(db: AsyncSession, user_ids: list, end: datetime):
+        """Получить открытые задачи пользователей со сроком до end (включая просроченные) одним запросом"""
+        if not user_ids:
+            return []
+        result = await db.scalars(
+            select(Task)
+            .where(text(OPEN_TASKS_CONDITION), Task.due_date < end, Task.user_id.in_(user_ids))
+            .order_by(Task.due_date)
+        )
+        return result.all()
+
+    @staticmethod
+    async def mark_due_alerts(db: AsyncSession, offsets: dict):
+        """Отметить оповещения о сроке (id задачи -> смещение в минутах) одним UPDATE, вернуть отмеченные id.
+
+        Отмечаются только задачи, по которым оповещение за это смещение ещё не отправлено,
+        поэтому при нескольких экземплярах бота оповещение отправит тот, кто отметил первым.
+        """
+        if not offsets:
+            return []
+        offset = case(offsets, value=Task.id)
+        result = await db.execute(
+            update(Task)
+            .where(
+                Task.id.in_(list(offsets)),
+                or_(Task.due_alert_minutes == None, Task.due_alert_minutes > offset)
+            )
+            # updated_at не трогается: оповещение не меняет задачу
+            .values(due_alert_minutes=offset, updated_at=Task.updated_at)
+            .returning(Task.id)
+            .execution_options(synchronize_session=False)
+        )
+        marked = result.scalars().all()
+        await _commit(db)
+        return marked
+
+
+# ============= EVENT OPERATIONS =============
+
+class AsyncEventCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, user_id: int, title: str, start_time: datetime, end_time: datetime,
+                     description: str = None, location: str = None, event_type: str = 'FACULTY'):
+        """Создать событие"""
+        event = Event(
+            user_id=user_id,
+            title=title,
+            start_time=start_time,
+            end_time=end_time,
+            description=description,
+            location=location,
+            event_type=event_type
+        )
+        db.add(event)
+        await AsyncStatisticCRUD.increment(db, user_id, total_events=1)
+        await _commit(db, event)
+        return event
+
+    @staticmethod
+    async def bulk_create(db: AsyncSession, user_id: int, items: list):
+        """Создать несколько событий одним INSERT ... RETURNING.
+
+        items - список словарей с ключами title, start_time, end_time, description, location, event_type.
+        """
+        if not items:
+            return []
+        rows = [
+            {
+                'user_id': user_id,
+                'title': item['title'],
+                'start_time': item['start_time'],
+                'end_time': item['end_time'],
+                'description': item.get('description'),
+                'location': item.get('location'),
+                'event_type': item.get('event_type') or 'FACULTY',
+            }
+            for item in items
+        ]
+        result = await db.scalars(insert(Event).returning(Event), rows)
+        events = result.all()
+        await AsyncStatisticCRUD.increment(db, user_id, total_events=len(events))
+        await _commit(db)
+        return events
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, user_id: int, event_ids: list):
+        """Удалить несколько событий пользователя, вернуть id удалённых"""
+        if not event_ids:
+            return []
+        result = await db.execute(
+            delete(Event)
+            .where(Event.user_id == user_id, Event.id.in_(event_ids))
+            .returning(Event.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted_ids = result.scalars().all()
+        if deleted_ids:
+            await AsyncStatisticCRUD.increment(db, user_id, total_events=-len(deleted_ids))
+        await _commit(db)
+        return deleted_ids
+
+    @staticmethod
+    async def get_user_events(db: AsyncSession, user_id: int, days_ahead: int = 7):
+        """Получить события пользователя на N дней вперед"""
+        now = datetime.utcnow()
+        future = now + timedelta(days=days_ahead)
+        result = await db.scalars(select(Event).where(
+            and_(
+                Event.user_id == user_id,
+                Event.start_time >= now,
+                Event.start_time <= future
+            )
+        ).order_by(Event.start_time))
+        return result.all()
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, event_id: int):
+        """Получить событие по ID"""
+        return await db.get(Event, event_id)
+
+    @staticmethod
+    async def set_google_event_id(db: AsyncSession, event, google_event_id: str):
+        """Сохранить ID события в Google Calendar"""
+        event.google_event_id = google_event_id
+        await _commit(db)
+        return event
+
+    @staticmethod
+    async def delete(db: AsyncSession, event_id: int):
+        """Удалить событие"""
+        event = await db.get(Event, event_id)
+        if event:
+            await db.delete(event)
+            await AsyncStatisticCRUD.increment(db, event.user_id, total_events=-1)
+            await _commit(db)
+            return True
+        return False
+
+    @staticmethod
+    async def get_for_users(db: AsyncSession, user_ids: list, start: datetime, end: datetime):
+        """Получить события пользователей, начинающиеся в [start, end), одним запросом"""
+        if not user_ids:
+            return []
+        result = await db.scalars(
+            select(Event)
+            .where(Event.user_id.in_(user_ids), Event.start_time >= start, Event.start_time < end)
+            .order_by(Event.start_time)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_today_events(db: AsyncSession, user_id: int):
+        """Получить события на сегодня"""
+        now = datetime.utcnow()
+        today_end = now.replace(hour=23, minute=59, second=59)
+        result = await db.scalars(select(Event).where(
+            and_(
+                Event.user_id == user_id,
+                Event.start_time >= now,
+                Event.start_time <= today_end
+            )
+        ).order_by(Event.start_time))
+        return result.all()
+
+
+# ============= BROADCAST OPERATIONS =============
+
+class AsyncBroadcastCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, created_by: int, text: str, total: int):
+        """Создать рассылку"""
+        broadcast = Broadcast(created_by=created_by, text=text, total=total)
+        db.add(broadcast)
+        await _commit(db, broadcast)
+        return broadcast
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, broadcast_id: int):
+        """Получить рассылку по ID"""
+        return await db.get(Broadcast, broadcast_id)
+
+    @staticmethod
+    async def get_current(db: AsyncSession):
+        """Последняя незавершённая рассылка (идёт или на паузе)"""
+        return await db.scalar(
+            select(Broadcast)
+            .where(Broadcast.status.in_([BroadcastStatus.RUNNING.value, BroadcastStatus.PAUSED.value]))
+            .order_by(Broadcast.id.desc())
+            .limit(1)
+        )
+
+    @staticmethod
+    async def get_running_ids(db: AsyncSession):
+        """ID идущих рассылок (для продолжения после перезапуска)"""
+        result = await db.scalars(
+            select(Broadcast.id).where(Broadcast.status == BroadcastStatus.RUNNING.value).order_by(Broadcast.id)
+        )
+        return result.all()
+
+    @staticmethod
+    async def set_status_message(db: AsyncSession, broadcast_id: int, chat_id: int, message_id: int):
+        """Запомнить сообщение с прогрессом рассылки"""
+        await db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(status_chat_id=chat_id, status_message_id=message_id)
+        )
+        await _commit(db)
+
+    @staticmethod
+    async def set_status(db: AsyncSession, broadcast_id: int, status: str, expected: list = None):
+        """Сменить статус рассылки (expected - только из этих статусов), вернуть True при успехе"""
+        values = dict(status=status)
+        if status in (BroadcastStatus.CANCELLED.value, BroadcastStatus.COMPLETED.value):
+            values['finished_at'] = datetime.utcnow()
+        query = update(Broadcast).where(Broadcast.id == broadcast_id)
+        if expected is not None:
+            query = query.where(Broadcast.status.in_(expected))
+        result = await db.execute(query.values(**values).returning(Broadcast.id))
+        changed = result.first() is not None
+        await _commit(db)
+        return changed
+
+    @staticmethod
+    async def claim(db: AsyncSession, broadcast_id: int, worker_id: str, lease_seconds: int):
+        """Взять идущую рассылку в работу, если её не ведёт живой воркер; вернуть рассылку или None"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(Broadcast)
+            .where(
+                Broadcast.id == broadcast_id,
+                Broadcast.status == BroadcastStatus.RUNNING.value,
+                or_(
+                    Broadcast.worker_id == None,
+                    Broadcast.worker_id == worker_id,
+                    Broadcast.heartbeat_at < now - timedelta(seconds=lease_seconds)
+                )
+            )
+            .values(worker_id=worker_id, heartbeat_at=now)
+            .returning(Broadcast.id)
+        )
+        claimed = result.first() is not None
+        await _commit(db)
+        if not claimed:
+            return None
+        return await db.scalar(
+            select(Broadcast).where(Broadcast.id == broadcast_id).execution_options(populate_existing=True)
+        )
+
+    @staticmethod
+    async def checkpoint(db: AsyncSession, broadcast_id: int, worker_id: str, last_user_id: int, sent: int, failed: int):
+        """Сохранить контрольную точку; вернуть статус рассылки (None - рассылку ведёт другой воркер)"""
+        result = await db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.worker_id == worker_id)
+            .values(
+                last_user_id=last_user_id,
+                sent=Broadcast.sent + sent,
+                failed=Broadcast.failed + failed,
+                heartbeat_at=datetime.utcnow()
+            )
+            .returning(Broadcast.status)
+        )
+        row = result.first()
+        await _commit(db)
+        return row[0] if row else None
+
+    @staticmethod
+    async def release(db: AsyncSession, broadcast_id: int, worker_id: str):
+        """Отпустить остановленную (не идущую) рассылку, вернуть False, если её уже возобновили"""
+        result = await db.execute(
+            update(Broadcast)
+            .where(
+                Broadcast.id == broadcast_id,
+                Broadcast.worker_id == worker_id,
+                Broadcast.status != BroadcastStatus.RUNNING.value
+            )
+            .values(worker_id=None)
+            .returning(Broadcast.id)
+        )
+        released = result.first() is not None
+        await _commit(db)
+        return released
+
+
+# ============= STATISTIC OPERATIONS =============
+
+class AsyncStatisticCRUD:
+    @staticmethod
+    async def get_or_create(db: AsyncSession, user_id: int):
+        """Получить или создать статистику (новая строка заполняется пересчётом)"""
+        stat = await db.scalar(select(Statistic).where(Statistic.user_id == user_id))
+        if not stat:
+            await AsyncStatisticCRUD.increment(db, user_id)
+            await _commit(db)
+            stat = await db.scalar(select(Statistic).where(Statistic.user_id == user_id))
+        return stat
+
+    @staticmethod
+    def status_deltas(old_status: str, new_status: str) -> dict:
+        """Изменения счётчиков при смене статуса задачи (new_status=None - удаление)"""
+        deltas = {}
+        for status, counter in ((TaskStatus.COMPLETED.value, 'completed_tasks'),
+                                (TaskStatus.IN_PROGRESS.value, 'in_progress_tasks')):
+            delta = (new_status == status) - (old_status == status)
+            if delta:
+                deltas[counter] = delta
+        return deltas
+
+    @staticmethod
+    def _recount_columns(user_id_column):
+        """Коррелированные подзапросы для пересчёта счётчиков"""
+        def count(model, *conditions):
+            return (
+                select(func.count(model.id))
+                .where(model.user_id == user_id_column, *conditions)
+                .scalar_subquery()
+            )
+
+        return {
+            'total_tasks': count(Task),
+            'completed_tasks': count(Task, Task.status == TaskStatus.COMPLETED.value),
+            'in_progress_tasks': count(Task, Task.status == TaskStatus.IN_PROGRESS.value),
+            'total_reminders': count(Reminder),
+            'total_events': count(Event),
+        }
+
+    @staticmethod
+    async def increment(db: AsyncSession, user_id: int, **deltas):
+        """Атомарно изменить счётчики: UPDATE statistics SET x = x + delta.
+
+        Не коммитит - выполняется в транзакции изменения, к которому относится.
+        Если строки статистики ещё нет, она создаётся полным пересчётом.
+        """
+        values = {name: getattr(Statistic, name) + delta for name, delta in deltas.items()}
+        values['last_activity'] = datetime.utcnow()
+        result = await db.execute(
+            update(Statistic).where(Statistic.user_id == user_id).values(**values)
+        )
+        if result.rowcount == 0:
+            await db.flush()
+            await db.execute(insert(Statistic).values(
+                user_id=user_id, last_activity=datetime.utcnow(),
+                **AsyncStatisticCRUD._recount_columns(user_id)
+            ))
+
+    @staticmethod
+    async def increment_many(db: AsyncSession, counter: str, deltas: dict):
+        """Изменить один счётчик у многих пользователей одним UPDATE ... CASE user_id.
+
+        Не коммитит. Недостающие строки статистики создаст сверка (reconcile_all).
+        """
+        if not deltas:
+            return
+        column = getattr(Statistic, counter)
+        await db.execute(
+            update(Statistic)
+            .where(Statistic.user_id.in_(list(deltas)))
+            .values({
+                column: column + case(deltas, value=Statistic.user_id, else_=0),
+                Statistic.last_activity: datetime.utcnow(),
+            })
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def update_stats(db: AsyncSession, user_id: int):
+        """Пересчитать статистику пользователя по таблицам"""
+        stat = await AsyncStatisticCRUD.get_or_create(db, user_id)
+        await db.execute(
+            update(Statistic)
+            .where(Statistic.user_id == user_id)
+            .values(**AsyncStatisticCRUD._recount_columns(user_id))
+        )
+        await _commit(db)
+        await db.refresh(stat)
+        return stat
+
+    @staticmethod
+    async def reconcile_all(db: AsyncSession):
+        """Исправить расхождения счётчиков у всех пользователей (два set-based запроса)"""
+        # Строки статистики для пользователей, у которых их нет
+        missing = select(User.id).where(
+            ~select(Statistic.id).where(Statistic.user_id == User.id).exists()
+        )
+        await db.execute(insert(Statistic).from_select(['user_id'], missing))
+
+        # triggered_reminders не пересчитывается: история отправок не хранится
+        result = await db.execute(
+            update(Statistic)
+            .values(**AsyncStatisticCRUD._recount_columns(Statistic.user_id))
+            .execution_options(synchronize_session=False)
+        )
+        await _commit(db)
+        return result.rowcount
+
+    @staticmethod
+    async def mark_reminder_triggered(db: AsyncSession, user_id: int):
+        """Учесть отправленное напоминание"""
+        await AsyncStatisticCRUD.increment(db, user_id, triggered_reminders=1)
+        await _commit(db)
+
+    @staticmethod
+    async def get_stats(db: AsyncSession, user_id: int):
+        """Получить статистику"""
+        return await AsyncStatisticCRUD.get_or_create(db, user_id)
+
+    @staticmethod
+    async def get_totals(db: AsyncSession):
+        """Суммарная статистика по всем пользователям"""
+        result = await db.execute(select(
+            func.coalesce(func.sum(Statistic.total_tasks), 0),
+            func.coalesce(func.sum(Statistic.completed_tasks), 0),
+            func.coalesce(func.sum(Statistic.total_reminders), 0),
+            func.coalesce(func.sum(Statistic.total_events), 0),
+        ))
+        total_tasks, completed_tasks, total_reminders, total_events = result.one()
+        return {
+            'total_tasks': total_tasks,
+            'completed_tasks': completed_tasks,
+            'total_reminders': total_reminders,
+            'total_events': total_events,
+        }
@@ -1,24 +1,317 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import os
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.sql import Select
 from bot.config import config
-from database.models import Base
+from database import sqlite
+from database.pool_metrics import metered_pool_class
 
-# Создание engine
-if config.DATABASE_URL.startswith('sqlite'):
+def pool_options(name: str, is_async: bool = False) -> dict:
+    """Параметры пула из конфигурации (Postgres и другие серверные БД)"""
+    return {
+        "poolclass": metered_pool_class(name, AsyncAdaptedQueuePool if is_async else QueuePool),
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+
+# Профиль SQLite: писатель с одним соединением и пул читателей
+SQLITE_SPLIT = config.DATABASE_URL.startswith('sqlite') and sqlite.is_file_database(config.DATABASE_URL)
+
+# Создание engine (для SQLite - engine писателя)
+if SQLITE_SPLIT:
+    engine = create_engine(
+        config.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        echo=config.DEBUG,
+        **sqlite.engine_options()
+    )
+    read_engine = create_engine(
+        config.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        echo=config.DEBUG,
+        **sqlite.engine_options(read_only=True)
+    )
+    sqlite.apply_pragmas(engine)
+    sqlite.apply_pragmas(read_engine, read_only=True)
+elif config.DATABASE_URL.startswith('sqlite'):
     engine = create_engine(
         config.DATABASE_URL,
         connect_args={"check_same_thread": False},
         echo=config.DEBUG
     )
+    read_engine = engine
 else:
     engine = create_engine(
         config.DATABASE_URL,
         echo=config.DEBUG,
-        pool_pre_ping=True
+        **pool_options("main")
     )
+    read_engine = engine
 
 # Создание SessionLocal
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if SQLITE_SPLIT:
+    SessionLocal = sessionmaker(
+        class_=sqlite.RoutingSession, autocommit=False, autoflush=False,
+        bind=engine, writer=engine, reader=read_engine
+    )
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_async_database_url(url: str) -> str:
+    """Получить URL с асинхронным драйвером (asyncpg / aiosqlite)"""
+    if config.ASYNC_DATABASE_URL and url == config.DATABASE_URL:
+        return config.ASYNC_DATABASE_URL
+
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == 'sqlite':
+        url = url.set(drivername='sqlite+aiosqlite')
+    elif backend == 'postgresql':
+        url = url.set(drivername='postgresql+asyncpg')
+    return url.render_as_string(hide_password=False)
+
+
+class ThreadedSession:
+    """Асинхронная обёртка над синхронной сессией: запросы выполняются в пуле потоков.
+
+    Повторяет интерфейс AsyncSession, чтобы CRUD и обработчики не зависели от режима.
+    С writer_lock сессия встаёт в очередь писателя SQLite в event loop: если ждать
+    соединение писателя в потоке, ожидающие могут занять все потоки пула.
+    """
+
+    def __init__(self, sync_session: Session, writer_lock: asyncio.Lock = None):
+        self.sync_session = sync_session
+        self.writer_lock = writer_lock
+        self.holds_writer = False
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _acquire_writer(self):
+        """Дождаться очереди писателя (до конца транзакции)"""
+        if self.writer_lock is not None and not self.holds_writer:
+            await self.writer_lock.acquire()
+            self.holds_writer = True
+
+    def _release_writer(self):
+        if self.holds_writer:
+            self.holds_writer = False
+            self.writer_lock.release()
+
+    def _has_changes(self) -> bool:
+        session = self.sync_session
+        return bool(session.new or session.dirty or session.deleted)
+
+    def _execute_buffered(self, statement, params=None, execution_options=None, **kwargs):
+        # Результат вычитывается целиком в потоке, как это делает AsyncSession
+        execution_options = {**(execution_options or {}), "prebuffer_rows": True}
+        return self.sync_session.execute(statement, params, execution_options=execution_options, **kwargs)
+
+    async def execute(self, statement, params=None, **kwargs):
+        if not isinstance(statement, Select):
+            await self._acquire_writer()
+        return await asyncio.to_thread(self._execute_buffered, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        if not isinstance(statement, Select):
+            await self._acquire_writer()
+        return await asyncio.to_thread(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await asyncio.to_thread(self.sync_session.get, entity, ident, **kwargs)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def delete(self, instance):
+        await asyncio.to_thread(self.sync_session.delete, instance)
+
+    async def refresh(self, instance, attribute_names=None):
+        await asyncio.to_thread(self.sync_session.refresh, instance, attribute_names)
+
+    async def flush(self, objects=None):
+        if self._has_changes():
+            await self._acquire_writer()
+        await asyncio.to_thread(self.sync_session.flush, objects)
+
+    async def commit(self):
+        if self._has_changes():
+            await self._acquire_writer()
+        try:
+            await asyncio.to_thread(self.sync_session.commit)
+        finally:
+            self._release_writer()
+
+    def in_transaction(self) -> bool:
+        return self.sync_session.in_transaction()
+
+    async def rollback(self):
+        try:
+            await asyncio.to_thread(self.sync_session.rollback)
+        finally:
+            self._release_writer()
+
+    async def close(self):
+        try:
+            await asyncio.to_thread(self.sync_session.close)
+        finally:
+            self._release_writer()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        await self._acquire_writer()
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+
+    async def stream(self, statement, params=None, **kwargs):
+        """Потоковое чтение (как AsyncSession.stream): порции курсора читаются в потоках"""
+        result = await asyncio.to_thread(self.sync_session.execute, statement, params, **kwargs)
+        return ThreadedStreamResult(result)
+
+
+class ThreadedStreamResult:
+    """Асинхронная обёртка над потоковым Result синхронной сессии"""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size: int = None):
+        partitions = self.result.partitions(size)
+        while True:
+            partition = await asyncio.to_thread(next, partitions, None)
+            if partition is None:
+                break
+            yield partition
+
+
+# Асинхронный engine и фабрика сессий
+if config.DB_ASYNC and SQLITE_SPLIT:
+    async_engine = create_async_engine(
+        get_async_database_url(config.DATABASE_URL),
+        echo=config.DEBUG,
+        **sqlite.engine_options(is_async=True)
+    )
+    async_read_engine = create_async_engine(
+        get_async_database_url(config.DATABASE_URL),
+        echo=config.DEBUG,
+        **sqlite.engine_options(read_only=True, is_async=True)
+    )
+    sqlite.apply_pragmas(async_engine.sync_engine)
+    sqlite.apply_pragmas(async_read_engine.sync_engine, read_only=True)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False,
+        sync_session_class=sqlite.RoutingSession,
+        writer=async_engine.sync_engine, reader=async_read_engine.sync_engine
+    )
+elif config.DB_ASYNC and config.DATABASE_URL.startswith('sqlite'):
+    async_engine = create_async_engine(
+        get_async_database_url(config.DATABASE_URL),
+        echo=config.DEBUG
+    )
+    async_read_engine = async_engine
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+elif config.DB_ASYNC:
+    async_engine = create_async_engine(
+        get_async_database_url(config.DATABASE_URL),
+        echo=config.DEBUG,
+        **pool_options("main (async)", is_async=True)
+    )
+    async_read_engine = async_engine
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    async_read_engine = None
+    # Очередь писателя SQLite (FIFO asyncio.Lock поверх единственного соединения)
+    writer_lock = asyncio.Lock() if SQLITE_SPLIT else None
+
+    def AsyncSessionLocal() -> ThreadedSession:
+        """Сессия на синхронном драйвере, не блокирующая event loop"""
+        return ThreadedSession(SessionLocal(expire_on_commit=False), writer_lock)
+
+# Реплики для чтения
+HAS_REPLICAS = bool(config.DATABASE_REPLICA_URLS)
+
+def create_replica_engine(url: str, name: str, is_async: bool = False):
+    """Engine реплики со своим пулом; для SQLite - соединения только на чтение"""
+    if is_async:
+        replica_url = get_async_database_url(url)
+        create = create_async_engine
+    else:
+        replica_url = url
+        create = create_engine
+
+    if not url.startswith('sqlite'):
+        return create(replica_url, echo=config.DEBUG, **pool_options(name, is_async=is_async))
+
+    connect_args = {} if is_async else {"check_same_thread": False}
+    replica = create(
+        replica_url,
+        connect_args=connect_args,
+        echo=config.DEBUG,
+        **sqlite.engine_options(read_only=True, is_async=is_async, name=name)
+    )
+    sqlite.apply_pragmas(replica.sync_engine if is_async else replica, read_only=True)
+    return replica
+
+def threaded_session_factory(factory):
+    """Фабрика ThreadedSession поверх синхронной фабрики сессий"""
+    return lambda: ThreadedSession(factory())
+
+if config.DB_ASYNC:
+    replica_engines = [
+        create_replica_engine(url, f"replica {number} (async)", is_async=True)
+        for number, url in enumerate(config.DATABASE_REPLICA_URLS, 1)
+    ]
+    replica_factories = [
+        async_sessionmaker(replica, autoflush=False, expire_on_commit=False)
+        for replica in replica_engines
+    ]
+else:
+    replica_engines = [
+        create_replica_engine(url, f"replica {number}")
+        for number, url in enumerate(config.DATABASE_REPLICA_URLS, 1)
+    ]
+    replica_factories = [
+        threaded_session_factory(sessionmaker(autoflush=False, expire_on_commit=False, bind=replica))
+        for replica in replica_engines
+    ]
+_next_replica = itertools.cycle(replica_factories)
+
+def AsyncReplicaSessionLocal():
+    """Сессия на следующей реплике по кругу (без реплик - на основной БД)"""
+    if not HAS_REPLICAS:
+        return AsyncSessionLocal()
+    return next(_next_replica)()
+
+@event.listens_for(Session, "after_flush")
+def mark_written_on_flush(session, flush_context):
+    """Отметить сессию, которая что-то записала (её пользователь читает с основной БД)"""
+    session.info['wrote'] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def mark_written_on_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
 
 def get_db() -> Session:
     """Dependency для получения сессии БД"""
@@ -28,15 +321,43 @@ def get_db() -> Session:
     finally:
         db.close()
 
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'alembic.ini')
+
+# Ревизия, соответствующая схеме, созданной через Base.metadata.create_all до появления миграций
+BASELINE_REVISION = '0001'
+
 def init_db():
-    """Инициализация базы данных"""
-    Base.metadata.create_all(bind=engine)
+    """Инициализация базы данных (применение миграций Alembic)"""
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
+
+    alembic_config = AlembicConfig(ALEMBIC_INI)
+
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        alembic_config.attributes['connection'] = connection
+        if inspector.has_table('users') and not inspector.has_table('alembic_version'):
+            # БД создана create_all до появления миграций
+            command.stamp(alembic_config, BASELINE_REVISION)
+        command.upgrade(alembic_config, 'head')
     print("✅ База данных инициализирована")
 
-async def get_db_async() -> Session:
+async def dispose_engines():
+    """Закрыть соединения пулов (соединения aiosqlite держат свои потоки)"""
+    for bind in {async_engine, async_read_engine} - {None}:
+        await bind.dispose()
+    for bind in {engine, read_engine}:
+        bind.dispose()
+    for replica in replica_engines:
+        if config.DB_ASYNC:
+            await replica.dispose()
+        else:
+            replica.dispose()
+
+async def get_db_async() -> AsyncSession:
     """Асинхронное получение сессии"""
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
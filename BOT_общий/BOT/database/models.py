@@ -1,7 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Date, Boolean, ForeignKey, Enum, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from dateutil.rrule import rrulestr
 import enum
 
 Base = declarative_base()
@@ -15,6 +16,9 @@ class User(Base):
     username = Column(String(100), nullable=True)
     full_name = Column(String(255), nullable=True)
     role = Column(String(20), default='STUDENT')  # STUDENT, ADMIN, SUPERADMIN
+    # Ежедневная сводка: час отправки (None - не подписан) и дата последней отправки
+    digest_hour = Column(Integer, nullable=True)
+    digest_sent_on = Column(Date, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -24,6 +28,11 @@ class User(Base):
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
     events = relationship("Event", back_populates="user", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Ежедневная сводка: подписчики, чей час наступил, а сводка за сегодня не отправлена
+        Index('ix_users_digest', 'digest_hour', 'digest_sent_on'),
+    )
+    
     def __repr__(self):
         return f"<User(id={self.id}, telegram_id={self.telegram_id}, username={self.username}, role={self.role})>"
 
@@ -38,6 +47,17 @@ class Reminder(Base):
     description = Column(Text, nullable=True)
     scheduled_time = Column(DateTime, nullable=False, index=True)
     is_active = Column(Boolean, default=True)
+    # Когда напоминание отправлено (после отправки оно становится неактивным)
+    triggered_at = Column(DateTime, nullable=True)
+    # Отправлено с опозданием (досылка после простоя бота)
+    delivered_late = Column(Boolean, default=False)
+    # Аренда воркером на время отправки (режим доставки 'lease')
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    # Повторение: правило RRULE и время первого срабатывания (DTSTART);
+    # в scheduled_time хранится только ближайшее срабатывание
+    recurrence_rule = Column(String(255), nullable=True)
+    recurrence_start = Column(DateTime, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -45,6 +65,24 @@ class Reminder(Base):
     # Связи
     user = relationship("User", back_populates="reminders")
     
+    __table_args__ = (
+        # get_upcoming_reminders: диапазон по времени среди активных
+        Index('ix_reminders_active_scheduled', 'is_active', 'scheduled_time'),
+        Index(
+            'ix_reminders_scheduled_active_only', 'scheduled_time',
+            postgresql_where=text('is_active'), sqlite_where=text('is_active = 1')
+        ),
+        # Список напоминаний пользователя (keyset по scheduled_time, id)
+        Index('ix_reminders_user_scheduled', 'user_id', 'scheduled_time', 'id'),
+    )
+    
+    def next_occurrence(self, after: datetime):
+        """Следующее срабатывание строго после after (None - разовое или повторы закончились)"""
+        if not self.recurrence_rule:
+            return None
+        rule = rrulestr(self.recurrence_rule, dtstart=self.recurrence_start or self.scheduled_time)
+        return rule.after(after)
+    
     def __repr__(self):
         return f"<Reminder(id={self.id}, user_id={self.user_id}, title={self.title}, scheduled_time={self.scheduled_time})>"
 
@@ -57,6 +95,10 @@ class TaskStatus(str, enum.Enum):
     CANCELLED = "CANCELLED"
 
 
+# Условие частичного индекса ix_tasks_due_open (запрос должен повторять его дословно)
+OPEN_TASKS_CONDITION = "due_date IS NOT NULL AND status NOT IN ('COMPLETED', 'CANCELLED')"
+
+
 class Task(Base):
     """Модель задачи"""
     __tablename__ = "tasks"
@@ -68,6 +110,8 @@ class Task(Base):
     priority = Column(Integer, default=3)  # 1 - высокий, 3 - низкий
     status = Column(String(20), default=TaskStatus.TODO.value)
     due_date = Column(DateTime, nullable=True, index=True)
+    # Наименьшее смещение (мин. до срока), за которое уже отправлено оповещение о сроке
+    due_alert_minutes = Column(Integer, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -76,6 +120,18 @@ class Task(Base):
     # Связи
     user = relationship("User", back_populates="tasks")
     
+    __table_args__ = (
+        # get_user_tasks: фильтр (user_id, status), сортировка (priority, created_at DESC)
+        Index('ix_tasks_user_status_priority_created', user_id, status, priority, created_at.desc(), id.desc()),
+        # Список задач без фильтра по статусу (keyset по priority, created_at, id)
+        Index('ix_tasks_user_priority_created', user_id, priority, created_at.desc(), id.desc()),
+        # Оповещения о сроках: диапазон по due_date среди открытых задач
+        Index(
+            'ix_tasks_due_open', 'due_date',
+            postgresql_where=text(OPEN_TASKS_CONDITION), sqlite_where=text(OPEN_TASKS_CONDITION)
+        ),
+    )
+    
     def __repr__(self):
         return f"<Task(id={self.id}, user_id={self.user_id}, title={self.title}, status={self.status})>"
 
@@ -100,6 +156,11 @@ class Event(Base):
     # Связи
     user = relationship("User", back_populates="events")
     
+    __table_args__ = (
+        # get_user_events / get_today_events
+        Index('ix_events_user_start', 'user_id', 'start_time'),
+    )
+    
     def __repr__(self):
         return f"<Event(id={self.id}, user_id={self.user_id}, title={self.title}, start_time={self.start_time})>"
 
@@ -112,6 +173,7 @@ class Statistic(Base):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, unique=True, index=True)
     total_tasks = Column(Integer, default=0)
     completed_tasks = Column(Integer, default=0)
+    in_progress_tasks = Column(Integer, default=0)
     total_reminders = Column(Integer, default=0)
     triggered_reminders = Column(Integer, default=0)
     total_events = Column(Integer, default=0)
@@ -122,3 +184,40 @@ class Statistic(Base):
     
     def __repr__(self):
         return f"<Statistic(user_id={self.user_id}, completed_tasks={self.completed_tasks}/{self.total_tasks})>"
+
+
+class BroadcastStatus(str, enum.Enum):
+    """Статусы рассылки"""
+    RUNNING = "RUNNING"
+    PAUSED = "PAUSED"
+    CANCELLED = "CANCELLED"
+    COMPLETED = "COMPLETED"
+
+
+class Broadcast(Base):
+    """Модель рассылки: фоновое задание с контрольной точкой по users.id"""
+    __tablename__ = "broadcasts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Идентификаторы Telegram (супергруппы -100..., новые пользователи) не помещаются в int4
+    created_by = Column(BigInteger, nullable=False)  # telegram_id администратора
+    text = Column(Text, nullable=False)
+    status = Column(String(20), default=BroadcastStatus.RUNNING.value, index=True)
+    # Контрольная точка: получатели с id <= last_user_id уже обработаны
+    last_user_id = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    # Сообщение администратору, в котором обновляется прогресс
+    status_chat_id = Column(BigInteger, nullable=True)
+    status_message_id = Column(Integer, nullable=True)
+    # Воркер, который ведёт рассылку, и его последний отклик
+    worker_id = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<Broadcast(id={self.id}, status={self.status}, sent={self.sent}/{self.total})>"
@@ -0,0 +1,82 @@
+"""
+Метрики пулов соединений
+
+Время ожидания соединения, занятость и переполнение пула снимаются
+в подклассе пула, поэтому видны для любого engine, созданного с metered_pool_class.
+"""
+
+import time
+from sqlalchemy import exc
+
+# Имя пула -> метрики
+pools = {}
+
+class PoolMetrics:
+    """Счётчики пула соединений"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+
+    def record_checkout(self, pool, wait: float):
+        """Учесть выдачу соединения"""
+        self.pool = pool
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        in_use = pool.checkedout()
+        self.peak_in_use = max(self.peak_in_use, in_use)
+        if in_use > pool.size():
+            self.overflow_checkouts += 1
+
+    def record_timeout(self, pool, wait: float):
+        """Учесть истечение pool_timeout"""
+        self.pool = pool
+        self.timeouts += 1
+        self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        """Текущее состояние пула и накопленные счётчики"""
+        pool = self.pool
+        return {
+            'name': self.name,
+            'size': pool.size() if pool else 0,
+            'in_use': pool.checkedout() if pool else 0,
+            'overflow': max(pool.overflow(), 0) if pool else 0,
+            'peak_in_use': self.peak_in_use,
+            'checkouts': self.checkouts,
+            'wait_avg_ms': self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            'wait_max_ms': self.wait_max * 1000,
+            'overflow_checkouts': self.overflow_checkouts,
+            'timeouts': self.timeouts,
+        }
+
+class MeteredPoolMixin:
+    """Замер ожидания в _do_get (включает открытие нового соединения)"""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(self, time.perf_counter() - start)
+            raise
+        self.metrics.record_checkout(self, time.perf_counter() - start)
+        return connection
+
+def metered_pool_class(name: str, base):
+    """Класс пула с метриками; метрики переживают пересоздание пула (dispose)"""
+    metrics = pools.setdefault(name, PoolMetrics(name))
+    return type(f"Metered{base.__name__}", (MeteredPoolMixin, base), {'metrics': metrics})
+
+def get_pool_stats() -> list:
+    """Состояние всех пулов с метриками"""
+    return [metrics.snapshot() for metrics in pools.values() if metrics.pool is not None]
@@ -0,0 +1,99 @@
+"""
+Профиль SQLite для продакшена
+
+- прагмы (WAL, synchronous, mmap_size, cache_size, busy_timeout) на каждом соединении
+- запись идёт через единственное соединение писателя: транзакции ждут его в очереди пула,
+  а не упираются в "database is locked"
+- чтение идёт через пул соединений читателей (в режиме WAL читатели не блокируют писателя)
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.sql import Select
+from bot.config import config
+from database.pool_metrics import metered_pool_class
+
+def is_file_database(url: str) -> bool:
+    """Файловая ли это БД SQLite (у базы в памяти у каждого соединения свои данные)"""
+    database = make_url(url).database
+    return bool(database) and database != ':memory:' and not database.startswith('file::memory:')
+
+def sqlite_pragmas() -> list:
+    """Прагмы, применяемые к каждому новому соединению"""
+    return [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT}",
+    ]
+
+def apply_pragmas(sync_engine, read_only: bool = False):
+    """Подписать engine на установку прагм при открытии соединения"""
+    pragmas = sqlite_pragmas()
+    if read_only:
+        # Защита от записи мимо очереди писателя
+        pragmas.append("PRAGMA query_only=ON")
+
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def engine_options(read_only: bool = False, is_async: bool = False, name: str = None) -> dict:
+    """Параметры пула для писателя (одно соединение) или читателей"""
+    if name is None:
+        name = "sqlite reader" if read_only else "sqlite writer"
+        if is_async:
+            name += " (async)"
+    poolclass = metered_pool_class(name, AsyncAdaptedQueuePool if is_async else QueuePool)
+
+    if read_only:
+        # Сессия держит соединение читателя до конца транзакции, поэтому читатели
+        # не ждут друг друга: сверх пула открываются временные соединения
+        return {
+            "poolclass": poolclass,
+            "pool_size": config.SQLITE_READ_POOL_SIZE,
+            "max_overflow": -1,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+        }
+    return {
+        "poolclass": poolclass,
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": config.SQLITE_WRITE_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+
+class RoutingSession(Session):
+    """Сессия SQLite: SELECT идут к читателям, запись - к единственному писателю.
+
+    После первой записи и до конца транзакции все запросы идут к писателю,
+    чтобы видеть собственные незафиксированные изменения.
+    """
+
+    def __init__(self, *args, writer=None, reader=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer = writer
+        self.reader = reader
+        self.writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.writer is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.writing or self._flushing or not isinstance(clause, Select):
+            self.writing = True
+            return self.writer
+        return self.reader
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def release_writer(session, transaction):
+    """Следующая транзакция снова читает через пул читателей"""
+    if transaction.parent is None:
+        session.writing = False
@@ -0,0 +1,97 @@
+"""
+Скрипт для вывода планов выполнения запросов CRUD
+Используется: python explain_queries.py
+
+Запросы перехватываются при вызове настоящих методов CRUD,
+поэтому изменения в database/crud_async.py сразу видны в планах.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from bot.config import config
+from database.database import engine, read_engine, SessionLocal, ThreadedSession, init_db
+from database.crud_async import AsyncUserCRUD, AsyncReminderCRUD, AsyncTaskCRUD, AsyncEventCRUD
+from database.models import TaskStatus
+
+# Значения параметров не важны для плана - важна форма запроса
+USER_ID = 1
+TELEGRAM_ID = 1
+ROW_ID = 1
+
+QUERIES = [
+    ("UserCRUD.get_by_telegram_id", lambda db: AsyncUserCRUD.get_by_telegram_id(db, TELEGRAM_ID)),
+    ("UserCRUD.is_admin", lambda db: AsyncUserCRUD.is_admin(db, TELEGRAM_ID)),
+    ("UserCRUD.get_page", lambda db: AsyncUserCRUD.get_page(db, after_id=ROW_ID)),
+    ("TaskCRUD.get_user_tasks", lambda db: AsyncTaskCRUD.get_user_tasks(db, USER_ID)),
+    ("TaskCRUD.get_user_tasks(status)", lambda db: AsyncTaskCRUD.get_user_tasks(db, USER_ID, TaskStatus.TODO.value)),
+    ("TaskCRUD.get_user_tasks_page", lambda db: AsyncTaskCRUD.get_user_tasks_page(db, USER_ID, after_id=ROW_ID)),
+    ("TaskCRUD.get_due_for_alert", lambda db: AsyncTaskCRUD.get_due_for_alert(db, datetime.utcnow(), datetime.utcnow() + timedelta(days=1), 60)),
+    ("TaskCRUD.count_user_tasks", lambda db: AsyncTaskCRUD.count_user_tasks(db, USER_ID)),
+    ("ReminderCRUD.get_user_reminders", lambda db: AsyncReminderCRUD.get_user_reminders(db, USER_ID)),
+    ("ReminderCRUD.get_user_reminders_page", lambda db: AsyncReminderCRUD.get_user_reminders_page(db, USER_ID, after_id=ROW_ID)),
+    ("ReminderCRUD.get_upcoming_reminders", lambda db: AsyncReminderCRUD.get_upcoming_reminders(db)),
+    ("ReminderCRUD.get_due_batch", lambda db: AsyncReminderCRUD.get_due_batch(db, [ROW_ID, ROW_ID + 1])),
+    ("ReminderCRUD.get_schedule_window", lambda db: AsyncReminderCRUD.get_schedule_window(db, datetime.utcnow(), datetime.utcnow())),
+    ("EventCRUD.get_user_events", lambda db: AsyncEventCRUD.get_user_events(db, USER_ID)),
+    ("EventCRUD.get_today_events", lambda db: AsyncEventCRUD.get_today_events(db, USER_ID)),
+]
+
+def explain_prefix() -> str:
+    """Префикс EXPLAIN для текущего диалекта"""
+    if engine.dialect.name == 'sqlite':
+        return "EXPLAIN QUERY PLAN "
+    if engine.dialect.name == 'postgresql':
+        return "EXPLAIN (ANALYZE false, COSTS true) "
+    return "EXPLAIN "
+
+async def capture(name, call) -> list:
+    """Выполнить метод CRUD и вернуть выполненные им SELECT-запросы"""
+    captured = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    # Для SQLite чтение идёт через отдельный engine читателей
+    engines = {engine, read_engine}
+    for bind in engines:
+        event.listen(bind, "before_cursor_execute", listener)
+    db = ThreadedSession(SessionLocal())
+    try:
+        await call(db)
+    finally:
+        for bind in engines:
+            event.remove(bind, "before_cursor_execute", listener)
+        await db.rollback()
+        await db.close()
+    return captured
+
+def print_plan(statement, parameters):
+    """Вывести план запроса"""
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(explain_prefix() + statement, parameters).fetchall()
+    for row in rows:
+        print("    " + " | ".join(str(value) for value in row))
+
+async def run():
+    for name, call in QUERIES:
+        print(f"\n=== {name} ===")
+        for statement, parameters in await capture(name, call):
+            print("  " + " ".join(statement.split()))
+            print_plan(statement, parameters)
+
+def main():
+    print(f"📍 Используется база: {config.DATABASE_URL}")
+    print(f"🕐 {datetime.utcnow().strftime('%d.%m.%Y %H:%M:%S')} UTC")
+
+    init_db()
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
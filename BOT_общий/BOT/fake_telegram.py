@@ -0,0 +1,369 @@
+"""
+Локальный заменитель Telegram Bot API для нагрузочных и интеграционных проверок
+Используется: python fake_telegram.py [порт] [пользователей]
+По умолчанию: 8081 1000
+
+Бот подключается к нему через TELEGRAM_API_URL=http://127.0.0.1:8081/bot
+(токен - любой). Реализованы getMe, getUpdates, setWebhook, deleteWebhook,
+getWebhookInfo, sendMessage, editMessageText, answerCallbackQuery.
+
+Сервер:
+- хранит синтетических пользователей и от их имени создаёт обновления
+  (inject_message, inject_callback): они отдаются через getUpdates или,
+  если установлен webhook, отправляются на него с секретным токеном
+- отвечает как Telegram: 400 на неизвестный чат и неизменённый текст,
+  403 для пользователей, заблокировавших бота
+- ограничивает частоту отправки (общий лимит в секунду и интервал для одного чата)
+  и возвращает 429 с retry_after; flood(n) заставляет следующие n отправок получить 429
+- записывает все вызовы методов (calls) для проверок и замеров
+
+В коде:
+    server = FakeTelegramServer(rate=30)
+    await server.start()
+    users = server.add_users(100)
+    await server.inject_message(users[0], "/start")
+    ...
+    await server.stop()
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import sys
+import time
+from aiohttp import web, ClientSession
+
+BOT_USER = {
+    'id': 1000000,
+    'is_bot': True,
+    'first_name': "Fake bot",
+    'username': "fake_bot",
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False,
+}
+
+# Параметры-строки PTB передаёт как есть, остальные - в JSON
+STRING_PARAMS = {'text', 'url', 'secret_token', 'callback_query_id', 'parse_mode', 'inline_message_id'}
+
+# Методы отправки, на которые действуют ограничения частоты
+FLOOD_METHODS = {'sendMessage', 'editMessageText'}
+
+class ApiError(Exception):
+    """Ошибка метода в формате Bot API"""
+
+    def __init__(self, code: int, description: str, retry_after: int = None):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+        self.retry_after = retry_after
+
+    def payload(self) -> dict:
+        data = {'ok': False, 'error_code': self.code, 'description': self.description}
+        if self.retry_after is not None:
+            data['parameters'] = {'retry_after': self.retry_after}
+        return data
+
+class Call:
+    """Записанный вызов метода"""
+
+    __slots__ = ('time', 'method', 'params', 'error')
+
+    def __init__(self, method: str, params: dict):
+        self.time = time.monotonic()
+        self.method = method
+        self.params = params
+        self.error = None
+
+    def __repr__(self):
+        return f"<Call({self.method}, {self.params}, error={self.error})>"
+
+class FakeTelegramServer:
+    """Заменитель Bot API: синтетические пользователи, очередь обновлений, лимиты и запись вызовов"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8081, rate: float = 30, chat_interval: float = 0):
+        self.host = host
+        self.port = port
+        # Общий лимит отправки (сообщений/с, 0 - без лимита) и минимальный интервал для одного чата
+        self.rate = rate
+        self.chat_interval = chat_interval
+        self.users = {}
+        self.blocked = set()
+        self.calls = []
+        self.webhook_url = None
+        self.webhook_secret = None
+        self._updates = []
+        self._update_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+        # (chat_id, message_id) -> сообщение бота
+        self._messages = {}
+        self._message_ids = {}
+        self._tokens = rate
+        self._refilled = time.monotonic()
+        self._chat_sent = {}
+        self._forced_floods = []
+        self._runner = None
+        self._client = None
+
+    @property
+    def base_url(self) -> str:
+        """Значение для TELEGRAM_API_URL / Application.builder().base_url()"""
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        app.router.add_get('/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._client = ClientSession()
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # ============= ПОЛЬЗОВАТЕЛИ И ОБНОВЛЕНИЯ =============
+
+    def add_users(self, count: int, start_id: int = 100000) -> list:
+        """Добавить синтетических пользователей, вернуть их id"""
+        ids = list(range(start_id + len(self.users), start_id + len(self.users) + count))
+        for user_id in ids:
+            self.users[user_id] = {'id': user_id, 'is_bot': False, 'first_name': f"User {user_id}",
+                                   'username': f"user{user_id}", 'language_code': 'ru'}
+        return ids
+
+    def block(self, user_id: int):
+        """Пользователь заблокировал бота: отправка ему вернёт 403"""
+        self.blocked.add(user_id)
+
+    def flood(self, count: int = 1, retry_after: int = 1):
+        """Следующие count отправок получат 429 независимо от лимитов"""
+        self._forced_floods.extend([retry_after] * count)
+
+    async def inject_message(self, user_id: int, text: str) -> int:
+        """Сообщение пользователя боту, вернуть update_id"""
+        message = {
+            'message_id': self._next_message_id(user_id),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': self.users[user_id]['first_name']},
+            'from': self.users[user_id],
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return await self._push({'message': message})
+
+    async def inject_callback(self, user_id: int, data: str, message_id: int = None) -> int:
+        """Нажатие inline-кнопки под сообщением бота, вернуть update_id"""
+        if message_id is None:
+            message_id = self._message_ids.get(user_id, 0)
+        message = self._messages.get((user_id, message_id)) or {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': "",
+        }
+        callback = {
+            'id': str(next(self._update_ids)),
+            'from': self.users[user_id],
+            'chat_instance': str(user_id),
+            'message': message,
+            'data': data,
+        }
+        return await self._push({'callback_query': callback})
+
+    async def _push(self, payload: dict) -> int:
+        update = {'update_id': next(self._update_ids), **payload}
+        if self.webhook_url:
+            headers = {'X-Telegram-Bot-Api-Secret-Token': self.webhook_secret} if self.webhook_secret else {}
+            async with self._client.post(self.webhook_url, json=update, headers=headers) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"Webhook ответил {response.status} на обновление {update['update_id']}")
+        else:
+            self._updates.append(update)
+            self._new_updates.set()
+        return update['update_id']
+
+    def _next_message_id(self, chat_id: int) -> int:
+        message_id = self._message_ids.get(chat_id, 0) + 1
+        self._message_ids[chat_id] = message_id
+        return message_id
+
+    # ============= ЗАПИСАННЫЕ ВЫЗОВЫ =============
+
+    def calls_of(self, method: str) -> list:
+        """Вызовы одного метода"""
+        return [call for call in self.calls if call.method == method]
+
+    def sent_to(self, chat_id: int) -> list:
+        """Тексты, успешно отправленные в чат"""
+        return [call.params.get('text') for call in self.calls
+                if call.method == 'sendMessage' and call.error is None and call.params.get('chat_id') == chat_id]
+
+    # ============= ОБРАБОТКА ЗАПРОСОВ =============
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = await self._read_params(request)
+        call = Call(method, params)
+        self.calls.append(call)
+        handler = getattr(self, f"_api_{method}", None)
+        try:
+            if handler is None:
+                raise ApiError(404, "Not Found: method not found")
+            if method in FLOOD_METHODS:
+                self._check_flood(params.get('chat_id'))
+            result = await handler(params)
+        except ApiError as e:
+            call.error = e.code
+            return web.json_response(e.payload(), status=e.code)
+        return web.json_response({'ok': True, 'result': result})
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> dict:
+        if request.content_type == 'application/json':
+            return await request.json()
+        params = {}
+        data = await request.post()
+        for name, value in {**request.query, **data}.items():
+            if name in STRING_PARAMS:
+                params[name] = value
+                continue
+            try:
+                params[name] = json.loads(value)
+            except (TypeError, ValueError):
+                params[name] = value
+        return params
+
+    def _check_flood(self, chat_id):
+        """429, если отправка превышает лимиты"""
+        if self._forced_floods:
+            raise ApiError(429, "Too Many Requests: retry after", self._forced_floods.pop(0))
+
+        now = time.monotonic()
+        if self.chat_interval and chat_id is not None:
+            wait = self._chat_sent.get(chat_id, 0) + self.chat_interval - now
+            if wait > 0:
+                raise ApiError(429, f"Too Many Requests: retry after {math.ceil(wait)}", math.ceil(wait))
+        if self.rate:
+            self._tokens = min(self.rate, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                raise ApiError(429, f"Too Many Requests: retry after {math.ceil(wait)}", math.ceil(wait))
+            self._tokens -= 1
+        if chat_id is not None:
+            self._chat_sent[chat_id] = now
+
+    def _chat(self, chat_id) -> dict:
+        if chat_id in self.blocked:
+            raise ApiError(403, "Forbidden: bot was blocked by the user")
+        user = self.users.get(chat_id)
+        if user is None:
+            raise ApiError(400, "Bad Request: chat not found")
+        return {'id': chat_id, 'type': 'private', 'first_name': user['first_name']}
+
+    async def _api_getMe(self, params: dict):
+        return BOT_USER
+
+    async def _api_getUpdates(self, params: dict):
+        if self.webhook_url:
+            raise ApiError(409, "Conflict: can't use getUpdates method while webhook is active")
+        offset = params.get('offset') or 0
+        limit = params.get('limit') or 100
+        timeout = params.get('timeout') or 0
+        # Подтверждённые (update_id < offset) обновления удаляются, как в Telegram
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    async def _api_setWebhook(self, params: dict):
+        self.webhook_url = params.get('url') or None
+        self.webhook_secret = params.get('secret_token')
+        if params.get('drop_pending_updates'):
+            self._updates.clear()
+        # Накопленные обновления уходят на новый webhook
+        pending, self._updates = self._updates, []
+        for update in pending:
+            payload = {key: value for key, value in update.items() if key != 'update_id'}
+            await self._push(payload)
+        return True
+
+    async def _api_deleteWebhook(self, params: dict):
+        self.webhook_url = None
+        self.webhook_secret = None
+        if params.get('drop_pending_updates'):
+            self._updates.clear()
+        return True
+
+    async def _api_getWebhookInfo(self, params: dict):
+        return {'url': self.webhook_url or "", 'has_custom_certificate': False,
+                'pending_update_count': len(self._updates)}
+
+    async def _api_sendMessage(self, params: dict):
+        chat_id = params.get('chat_id')
+        chat = self._chat(chat_id)
+        message = {
+            'message_id': self._next_message_id(chat_id),
+            'date': int(time.time()),
+            'chat': chat,
+            'from': BOT_USER,
+            'text': params.get('text', ""),
+        }
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        self._messages[(chat_id, message['message_id'])] = message
+        return message
+
+    async def _api_editMessageText(self, params: dict):
+        chat_id = params.get('chat_id')
+        self._chat(chat_id)
+        message = self._messages.get((chat_id, params.get('message_id')))
+        if message is None:
+            raise ApiError(400, "Bad Request: message to edit not found")
+        text = params.get('text', "")
+        reply_markup = params.get('reply_markup')
+        if message['text'] == text and message.get('reply_markup') == reply_markup:
+            raise ApiError(400, "Bad Request: message is not modified: specified new message content "
+                                "and reply markup are exactly the same as a current content and reply markup of the message")
+        message['text'] = text
+        if reply_markup:
+            message['reply_markup'] = reply_markup
+        else:
+            message.pop('reply_markup', None)
+        message['edit_date'] = int(time.time())
+        return message
+
+    async def _api_answerCallbackQuery(self, params: dict):
+        return True
+
+async def serve(port: int, users: int):
+    server = FakeTelegramServer(port=port)
+    await server.start()
+    server.add_users(users)
+    print(f"Fake Bot API: {server.base_url} ({users} пользователей, id с 100000)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    try:
+        asyncio.run(serve(port, users))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
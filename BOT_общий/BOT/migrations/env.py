@@ -0,0 +1,75 @@
+"""
+Окружение Alembic: URL и метаданные берутся из настроек бота
+"""
+
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+# Добавить директорию проекта в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.config import config as bot_config
+from database.models import Base
+
+alembic_config = context.config
+
+# При вызове из init_db() логирование уже настроено ботом
+if alembic_config.config_file_name is not None and "connection" not in alembic_config.attributes:
+    fileConfig(alembic_config.config_file_name, disable_existing_loggers=False)
+
+if not alembic_config.get_main_option("sqlalchemy.url"):
+    alembic_config.set_main_option("sqlalchemy.url", bot_config.DATABASE_URL)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Генерация SQL без подключения к БД (alembic upgrade head --sql)"""
+    url = alembic_config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=url.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Применение миграций к БД"""
+    connectable = alembic_config.attributes.get("connection")
+
+    if connectable is None:
+        connectable = engine_from_config(
+            alembic_config.get_section(alembic_config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        )
+        with connectable.connect() as connection:
+            _run_with_connection(connection)
+    else:
+        _run_with_connection(connectable)
+
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,114 @@
+"""Исходная схема (как создавалась Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-30 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=True),
+        sa.Column('full_name', sa.String(length=255), nullable=True),
+        sa.Column('role', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_telegram_id', 'users', ['telegram_id'], unique=True)
+
+    op.create_table(
+        'reminders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('scheduled_time', sa.DateTime(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_reminders_id', 'reminders', ['id'])
+    op.create_index('ix_reminders_user_id', 'reminders', ['user_id'])
+    op.create_index('ix_reminders_scheduled_time', 'reminders', ['scheduled_time'])
+
+    op.create_table(
+        'tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tasks_id', 'tasks', ['id'])
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id'])
+    op.create_index('ix_tasks_due_date', 'tasks', ['due_date'])
+
+    op.create_table(
+        'events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=False),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('event_type', sa.String(length=50), nullable=True),
+        sa.Column('google_event_id', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_events_id', 'events', ['id'])
+    op.create_index('ix_events_user_id', 'events', ['user_id'])
+    op.create_index('ix_events_start_time', 'events', ['start_time'])
+
+    op.create_table(
+        'statistics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_tasks', sa.Integer(), nullable=True),
+        sa.Column('completed_tasks', sa.Integer(), nullable=True),
+        sa.Column('total_reminders', sa.Integer(), nullable=True),
+        sa.Column('triggered_reminders', sa.Integer(), nullable=True),
+        sa.Column('total_events', sa.Integer(), nullable=True),
+        sa.Column('last_activity', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_statistics_id', 'statistics', ['id'])
+    op.create_index('ix_statistics_user_id', 'statistics', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table('statistics')
+    op.drop_table('events')
+    op.drop_table('tasks')
+    op.drop_table('reminders')
+    op.drop_table('users')
@@ -0,0 +1,53 @@
+"""Составные и частичные индексы под основные запросы, счётчик задач в процессе
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Счётчик задач в процессе (Statistic.in_progress_tasks)
+    op.add_column('statistics', sa.Column('in_progress_tasks', sa.Integer(), nullable=True, server_default='0'))
+
+    # TaskCRUD.get_user_tasks: WHERE user_id [AND status] ORDER BY priority, created_at DESC
+    op.create_index(
+        'ix_tasks_user_status_priority_created', 'tasks',
+        ['user_id', 'status', 'priority', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+    op.create_index(
+        'ix_tasks_user_priority_created', 'tasks',
+        ['user_id', 'priority', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+
+    # ReminderCRUD.get_upcoming_reminders: WHERE is_active AND scheduled_time BETWEEN ...
+    op.create_index('ix_reminders_active_scheduled', 'reminders', ['is_active', 'scheduled_time'])
+    op.create_index(
+        'ix_reminders_scheduled_active_only', 'reminders', ['scheduled_time'],
+        postgresql_where=sa.text('is_active'), sqlite_where=sa.text('is_active = 1')
+    )
+    op.create_index('ix_reminders_user_scheduled', 'reminders', ['user_id', 'scheduled_time', 'id'])
+
+    # EventCRUD.get_user_events / get_today_events: WHERE user_id AND start_time BETWEEN ...
+    op.create_index('ix_events_user_start', 'events', ['user_id', 'start_time'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_user_start', table_name='events')
+    op.drop_index('ix_reminders_user_scheduled', table_name='reminders')
+    op.drop_index('ix_reminders_scheduled_active_only', table_name='reminders')
+    op.drop_index('ix_reminders_active_scheduled', table_name='reminders')
+    op.drop_index('ix_tasks_user_priority_created', table_name='tasks')
+    op.drop_index('ix_tasks_user_status_priority_created', table_name='tasks')
+    with op.batch_alter_table('statistics') as batch_op:
+        batch_op.drop_column('in_progress_tasks')
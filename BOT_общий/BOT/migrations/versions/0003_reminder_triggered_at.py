@@ -0,0 +1,25 @@
+"""Время отправки напоминания
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('reminders', sa.Column('triggered_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reminders') as batch_op:
+        batch_op.drop_column('triggered_at')
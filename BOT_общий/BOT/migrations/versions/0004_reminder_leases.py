@@ -0,0 +1,27 @@
+"""Аренда напоминаний воркерами (доставка из нескольких процессов)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('reminders', sa.Column('lease_owner', sa.String(length=64), nullable=True))
+    op.add_column('reminders', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reminders') as batch_op:
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('lease_owner')
@@ -0,0 +1,27 @@
+"""Повторяющиеся напоминания (правило RRULE)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 22:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('reminders', sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+    op.add_column('reminders', sa.Column('recurrence_start', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reminders') as batch_op:
+        batch_op.drop_column('recurrence_start')
+        batch_op.drop_column('recurrence_rule')
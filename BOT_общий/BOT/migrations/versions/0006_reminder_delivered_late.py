@@ -0,0 +1,25 @@
+"""Отметка об опоздавшей доставке напоминания
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 23:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('reminders', sa.Column('delivered_late', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reminders') as batch_op:
+        batch_op.drop_column('delivered_late')
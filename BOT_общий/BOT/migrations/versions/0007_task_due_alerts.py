@@ -0,0 +1,34 @@
+"""Оповещения о сроках задач: отметка отправленного оповещения и индекс по сроку открытых задач
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+OPEN_TASKS = "due_date IS NOT NULL AND status NOT IN ('COMPLETED', 'CANCELLED')"
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('due_alert_minutes', sa.Integer(), nullable=True))
+
+    # AsyncTaskCRUD.get_due_for_alert: диапазон по due_date среди открытых задач
+    op.create_index(
+        'ix_tasks_due_open', 'tasks', ['due_date'],
+        postgresql_where=sa.text(OPEN_TASKS), sqlite_where=sa.text(OPEN_TASKS)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_due_open', table_name='tasks')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('due_alert_minutes')
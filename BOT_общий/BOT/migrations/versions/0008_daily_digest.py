@@ -0,0 +1,31 @@
+"""Ежедневная сводка: выбранный пользователем час и дата последней отправки
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 01:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('digest_hour', sa.Integer(), nullable=True))
+    op.add_column('users', sa.Column('digest_sent_on', sa.Date(), nullable=True))
+
+    # AsyncUserCRUD.stream_digest_recipients: подписчики, чей час уже наступил
+    op.create_index('ix_users_digest', 'users', ['digest_hour', 'digest_sent_on'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_digest', table_name='users')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('digest_sent_on')
+        batch_op.drop_column('digest_hour')
@@ -0,0 +1,46 @@
+"""Рассылки как фоновые задания с контрольной точкой
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 02:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'broadcasts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_by', sa.BigInteger(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('last_user_id', sa.Integer(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('sent', sa.Integer(), nullable=True),
+        sa.Column('failed', sa.Integer(), nullable=True),
+        sa.Column('status_chat_id', sa.BigInteger(), nullable=True),
+        sa.Column('status_message_id', sa.Integer(), nullable=True),
+        sa.Column('worker_id', sa.String(length=64), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_broadcasts_id', 'broadcasts', ['id'])
+    op.create_index('ix_broadcasts_status', 'broadcasts', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_broadcasts_status', table_name='broadcasts')
+    op.drop_index('ix_broadcasts_id', table_name='broadcasts')
+    op.drop_table('broadcasts')
@@ -0,0 +1,41 @@
+"""
+Общие фикстуры тестов: временная SQLite-база и запуск корутин
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import pytest
+
+# Настройки читаются при импорте bot.config, поэтому задаются до импорта модулей бота;
+# DATABASE_URL перезаписывается всегда, чтобы тесты не тронули рабочую БД из .env
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bot-tests-'), 'test.db')
+os.environ.setdefault('DEBUG', 'False')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def run():
+    """Выполнить корутину в новом event loop, после неё закрыть пулы соединений"""
+    from database.database import dispose_engines
+
+    def runner(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await dispose_engines()
+        return asyncio.run(main())
+    return runner
+
+@pytest.fixture
+def db_schema():
+    """Пустые таблицы на время теста"""
+    from database.database import engine
+    from database.models import Base
+
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+    engine.dispose()
@@ -0,0 +1,70 @@
+"""
+Склейка напоминаний: одно сообщение на чат, не больше REMINDER_COALESCE_MAX напоминаний в нём
+"""
+
+from datetime import timedelta
+import pytest
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncReminderCRUD
+from bot.config import config
+from bot.utils.scheduler import ReminderScheduler
+
+pytestmark = pytest.mark.usefixtures('db_schema')
+
+async def create_due_reminders(scheduler: ReminderScheduler, counts: dict) -> list:
+    """telegram_id -> число наступивших напоминаний; вернуть id напоминаний"""
+    scheduled_time = scheduler.now() - timedelta(minutes=1)
+    reminder_ids = []
+    db = AsyncSessionLocal()
+    try:
+        for telegram_id, count in counts.items():
+            user = await AsyncUserCRUD.get_or_create(db, telegram_id=telegram_id)
+            for i in range(count):
+                reminder = await AsyncReminderCRUD.create(db, user.id, f"{telegram_id}-{i}", scheduled_time=scheduled_time)
+                reminder_ids.append(reminder.id)
+    finally:
+        await db.close()
+    return reminder_ids
+
+async def active_ids(reminder_ids: list) -> list:
+    db = AsyncSessionLocal()
+    try:
+        return sorted(reminder.id for reminder in await AsyncReminderCRUD.get_due_batch(db, reminder_ids))
+    finally:
+        await db.close()
+
+def test_one_message_per_chat(run, monkeypatch):
+    monkeypatch.setattr(config, 'REMINDER_COALESCE_MAX', 2)
+    scheduler = ReminderScheduler()
+    messages = []
+
+    async def send(reminders: list, late: bool = False) -> bool:
+        messages.append(sorted(reminder.title for reminder in reminders))
+        return True
+
+    scheduler.set_callback(send)
+
+    async def scenario():
+        reminder_ids = await create_due_reminders(scheduler, {501: 5, 502: 1})
+        await scheduler.fire_batch(reminder_ids)
+        return await active_ids(reminder_ids)
+
+    assert run(scenario()) == []
+    assert sorted(messages) == [['501-0', '501-1'], ['501-2', '501-3'], ['501-4'], ['502-0']]
+
+def test_failed_chat_stays_active(run):
+    scheduler = ReminderScheduler()
+
+    async def send(reminders: list, late: bool = False) -> bool:
+        return reminders[0].user.telegram_id != 602
+
+    scheduler.set_callback(send)
+
+    async def scenario():
+        reminder_ids = await create_due_reminders(scheduler, {601: 2, 602: 2})
+        await scheduler.fire_batch(reminder_ids)
+        return reminder_ids, await active_ids(reminder_ids)
+
+    reminder_ids, active = run(scenario())
+    # Чат 601 получил оба напоминания одним сообщением, неудачная отправка в 602 ничего не отметила
+    assert active == reminder_ids[2:]
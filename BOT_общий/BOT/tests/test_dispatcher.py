@@ -0,0 +1,78 @@
+"""
+HeapDispatcher: порядок срабатывания и ленивое удаление отменённых записей;
+APSchedulerDispatcher: уже наступившее напоминание срабатывает, а не пропускается
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from bot.utils.dispatcher import APSchedulerDispatcher, HeapDispatcher
+
+START = datetime(2024, 1, 1, 12, 0)
+
+async def noop(reminder_id: int):
+    pass
+
+def make_dispatcher() -> HeapDispatcher:
+    return HeapDispatcher(noop, lambda: START)
+
+def test_pop_due_in_time_order():
+    dispatcher = make_dispatcher()
+    for reminder_id, minutes in ((1, 30), (2, 10), (3, 20), (4, 10), (5, 90)):
+        dispatcher.schedule(reminder_id, START + timedelta(minutes=minutes))
+
+    # Одинаковое время - в порядке планирования
+    assert dispatcher.pop_due(START + timedelta(minutes=30)) == [2, 4, 3, 1]
+    assert dispatcher.pop_due(START + timedelta(minutes=60)) == []
+    assert list(dispatcher._entries) == [5]
+
+def test_reschedule_and_cancel():
+    dispatcher = make_dispatcher()
+    dispatcher.schedule(1, START + timedelta(minutes=5))
+    dispatcher.schedule(2, START + timedelta(minutes=10))
+    dispatcher.schedule(1, START + timedelta(minutes=20))
+    assert dispatcher.cancel(2)
+    assert not dispatcher.cancel(2)
+
+    # Старые записи остаются в куче, но не срабатывают
+    assert len(dispatcher) == 1 and len(dispatcher._heap) == 3
+    assert dispatcher.pop_due(START + timedelta(minutes=15)) == []
+    assert 1 in dispatcher and 2 not in dispatcher
+    assert dispatcher.pop_due(START + timedelta(minutes=20)) == [1]
+    assert len(dispatcher) == 0
+
+def test_compaction_drops_cancelled_entries():
+    dispatcher = make_dispatcher()
+    size = HeapDispatcher.COMPACT_MIN_SIZE * 2
+    for reminder_id in range(size):
+        dispatcher.schedule(reminder_id, START + timedelta(seconds=reminder_id))
+    for reminder_id in range(0, size, 4):
+        dispatcher.schedule(reminder_id, START - timedelta(seconds=1))
+    for reminder_id in range(size):
+        if reminder_id % 4:
+            dispatcher.cancel(reminder_id)
+
+    # Мусора стало больше, чем живых записей, - куча перестроена
+    assert len(dispatcher) == size // 4
+    assert len(dispatcher._heap) <= 2 * len(dispatcher)
+    assert dispatcher.pop_due(START) == list(range(0, size, 4))
+
+def test_apscheduler_fires_overdue():
+    async def scenario():
+        fired = []
+
+        async def callback(reminder_id: int):
+            fired.append(reminder_id)
+
+        scheduler = AsyncIOScheduler()
+        scheduler.start()
+        try:
+            dispatcher = APSchedulerDispatcher(scheduler, callback)
+            # Наступило, пока загружалось окно: дольше стандартного misfire_grace_time (1 с)
+            dispatcher.schedule(1, datetime.now() - timedelta(seconds=30))
+            await asyncio.sleep(0.5)
+        finally:
+            scheduler.shutdown()
+        return fired
+
+    assert asyncio.run(scenario()) == [1]
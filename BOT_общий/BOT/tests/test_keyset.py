@@ -0,0 +1,91 @@
+"""
+Keyset-пагинация (_keyset / _fetch_page): границы страниц вперёд и назад
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncUserCRUD, AsyncTaskCRUD
+from database.models import Task
+
+pytestmark = pytest.mark.usefixtures('db_schema')
+
+async def create_users(count: int) -> list:
+    db = AsyncSessionLocal()
+    try:
+        users = [await AsyncUserCRUD.get_or_create(db, telegram_id=1000 + i) for i in range(count)]
+        return [user.id for user in users]
+    finally:
+        await db.close()
+
+async def user_pages(**kwargs) -> list:
+    db = AsyncSessionLocal()
+    try:
+        return [user.id for user in await AsyncUserCRUD.get_page(db, **kwargs)]
+    finally:
+        await db.close()
+
+def test_user_pages_forward(run):
+    ids = run(create_users(7))
+    assert run(user_pages(limit=3)) == ids[0:3]
+    assert run(user_pages(limit=3, after_id=ids[2])) == ids[3:6]
+    # Последняя неполная страница и пустая страница за ней
+    assert run(user_pages(limit=3, after_id=ids[5])) == ids[6:7]
+    assert run(user_pages(limit=3, after_id=ids[6])) == []
+
+def test_user_pages_backward(run):
+    ids = run(create_users(7))
+    # Назад страница возвращается в прямом порядке
+    assert run(user_pages(limit=3, before_id=ids[6])) == ids[3:6]
+    assert run(user_pages(limit=3, before_id=ids[3])) == ids[0:3]
+    assert run(user_pages(limit=3, before_id=ids[1])) == ids[0:1]
+    assert run(user_pages(limit=3, before_id=ids[0])) == []
+
+async def create_tasks(user_id: int) -> list:
+    """Задачи с повторяющимися приоритетами и датами создания: порядок решает id"""
+    created = datetime(2024, 1, 1)
+    db = AsyncSessionLocal()
+    try:
+        db.add_all([
+            Task(user_id=user_id, title=f"Задача {i}", priority=i % 3 + 1,
+                 created_at=created + timedelta(minutes=i % 2))
+            for i in range(10)
+        ])
+        await db.commit()
+    finally:
+        await db.close()
+
+async def task_page(user_id: int, **kwargs) -> list:
+    db = AsyncSessionLocal()
+    try:
+        return [task.id for task in await AsyncTaskCRUD.get_user_tasks_page(db, user_id, **kwargs)]
+    finally:
+        await db.close()
+
+async def all_tasks(user_id: int) -> list:
+    """Ожидаемый порядок: priority по возрастанию, created_at и id по убыванию"""
+    db = AsyncSessionLocal()
+    try:
+        tasks = await AsyncTaskCRUD.get_user_tasks(db, user_id)
+        tasks = sorted(tasks, key=lambda task: task.id, reverse=True)
+        tasks = sorted(tasks, key=lambda task: task.created_at, reverse=True)
+        return [task.id for task in sorted(tasks, key=lambda task: task.priority)]
+    finally:
+        await db.close()
+
+def test_task_pages_with_equal_keys(run):
+    user_id = run(create_users(1))[0]
+    run(create_tasks(user_id))
+    expected = run(all_tasks(user_id))
+
+    # Вперёд: страницы без пропусков и повторов (с запасом на одну лишнюю страницу)
+    pages = [run(task_page(user_id, limit=3))]
+    while pages[-1] and len(pages) <= len(expected):
+        pages.append(run(task_page(user_id, limit=3, after_id=pages[-1][-1])))
+    assert [task_id for page in pages for task_id in page] == expected
+
+    # Назад от последней страницы - те же страницы
+    backward = [pages[-2]]
+    while backward[0] and len(backward) <= len(expected):
+        backward.insert(0, run(task_page(user_id, limit=3, before_id=backward[0][0])))
+    assert [task_id for page in backward for task_id in page] == expected
@@ -0,0 +1,125 @@
+"""
+Outbox: общий token bucket, приоритеты, интервал для чата и повтор после RetryAfter
+"""
+
+import asyncio
+import socket
+import pytest
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from bot.utils.outbox import (
+    Outbox, priority, PRIORITY_INTERACTIVE, PRIORITY_REMINDER, PRIORITY_NOTIFICATION, PRIORITY_BROADCAST
+)
+from fake_telegram import FakeTelegramServer
+
+async def send(outbox: Outbox, chat_id: int, callback, request_priority: int = PRIORITY_INTERACTIVE):
+    return await outbox.process_request(callback, (chat_id,), {}, 'sendMessage', {'chat_id': chat_id},
+                                        priority(request_priority))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def test_token_bucket():
+    async def scenario():
+        outbox = Outbox(rate=20, burst=2, chat_interval=0)
+        await outbox.initialize()
+        loop = asyncio.get_running_loop()
+        sent_at = []
+
+        async def callback(chat_id):
+            sent_at.append(loop.time())
+
+        started = loop.time()
+        await asyncio.gather(*(send(outbox, chat_id, callback) for chat_id in range(1, 7)))
+        await outbox.shutdown()
+        return [moment - started for moment in sent_at]
+
+    sent_at = asyncio.run(scenario())
+    # Всплеск уходит сразу, остальные - по одному на 1/rate с
+    assert sent_at[1] < 0.05
+    assert sent_at[-1] == pytest.approx(4 / 20, abs=0.05)
+
+def test_highest_priority_first():
+    async def scenario():
+        outbox = Outbox(rate=100, burst=100, chat_interval=0, concurrency=1)
+        await outbox.initialize()
+        order = []
+
+        async def callback(chat_id):
+            order.append(chat_id)
+
+        await asyncio.gather(
+            send(outbox, 1, callback, PRIORITY_BROADCAST),
+            send(outbox, 2, callback, PRIORITY_NOTIFICATION),
+            send(outbox, 3, callback, PRIORITY_REMINDER),
+            send(outbox, 4, callback, PRIORITY_NOTIFICATION),
+            send(outbox, 5, callback, PRIORITY_INTERACTIVE),
+        )
+        await outbox.shutdown()
+        return order
+
+    assert asyncio.run(scenario()) == [5, 3, 2, 4, 1]
+
+def test_chat_interval_except_interactive():
+    async def scenario(request_priority: int) -> float:
+        outbox = Outbox(rate=100, burst=100, chat_interval=0.2)
+        await outbox.initialize()
+        loop = asyncio.get_running_loop()
+
+        async def callback(chat_id):
+            return chat_id
+
+        started = loop.time()
+        await asyncio.gather(*(send(outbox, 7, callback, request_priority) for _ in range(3)))
+        await outbox.shutdown()
+        return loop.time() - started
+
+    # Ответ из нескольких сообщений не ждёт интервала, оповещения в один чат - ждут
+    assert asyncio.run(scenario(PRIORITY_INTERACTIVE)) < 0.1
+    assert asyncio.run(scenario(PRIORITY_NOTIFICATION)) == pytest.approx(0.4, abs=0.1)
+
+def test_retry_limit():
+    async def scenario():
+        outbox = Outbox(rate=100, burst=100, chat_interval=0, max_retries=2)
+        await outbox.initialize()
+
+        async def callback(chat_id):
+            raise RetryAfter(0)
+
+        try:
+            with pytest.raises(RetryAfter):
+                await send(outbox, 1, callback)
+        finally:
+            await outbox.shutdown()
+        return outbox
+
+    outbox = asyncio.run(scenario())
+    assert (outbox.retries, outbox.failed, outbox.sent) == (2, 1, 0)
+
+def test_retry_after_with_fake_server():
+    async def scenario():
+        server = FakeTelegramServer(port=free_port(), rate=0)
+        await server.start()
+        users = server.add_users(2)
+        outbox = Outbox(rate=100, burst=100, chat_interval=0)
+        bot = ExtBot('1:test', base_url=server.base_url, rate_limiter=outbox)
+        try:
+            await bot.initialize()
+            server.flood(1, retry_after=1)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(bot.send_message(user_id, f"Привет, {user_id}") for user_id in users))
+            elapsed = loop.time() - started
+            await bot.shutdown()
+        finally:
+            await server.stop()
+        return server, users, outbox, elapsed
+
+    server, users, outbox, elapsed = asyncio.run(scenario())
+    # Первая отправка получила 429: пауза для всех чатов, затем повтор
+    assert [server.sent_to(user_id) for user_id in users] == [[f"Привет, {user_id}"] for user_id in users]
+    assert len(server.calls_of('sendMessage')) == 3
+    assert (outbox.retries, outbox.failed, outbox.sent) == (1, 0, 2)
+    assert elapsed >= 1
@@ -0,0 +1,44 @@
+"""
+Повторяющиеся напоминания: разбор ввода (parse_recurrence_input) и следующее срабатывание
+"""
+
+from datetime import datetime
+import pytest
+from bot.utils.helpers import parse_recurrence_input
+from database.models import Reminder
+
+DTSTART = datetime(2024, 1, 1, 9, 0)
+
+@pytest.mark.parametrize('text, expected', [
+    ("нет", ''),
+    ("/skip", ''),
+    ("Ежедневно", "FREQ=DAILY"),
+    ("по будням", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"),
+    ("freq=weekly;byday=mo,we", "FREQ=WEEKLY;BYDAY=MO,WE"),
+    ("RRULE:FREQ=MONTHLY;COUNT=3", "FREQ=MONTHLY;COUNT=3"),
+    ("FREQ=HOURLY;INTERVAL=2", "FREQ=HOURLY;INTERVAL=2"),
+    ("FREQ=DAILY;BYHOUR=9,18", "FREQ=DAILY;BYHOUR=9,18"),
+])
+def test_accepted(text, expected):
+    assert parse_recurrence_input(text, DTSTART) == expected
+
+@pytest.mark.parametrize('text', [
+    "каждый час",
+    "FREQ=FORTNIGHTLY",
+    "FREQ=MINUTELY",
+    "FREQ=SECONDLY;INTERVAL=3600",
+    "FREQ=HOURLY;BYMINUTE=0,30",
+    "FREQ=DAILY;BYSECOND=0,1",
+    "DTSTART:20240101T090000\nRRULE:FREQ=DAILY",
+])
+def test_rejected(text):
+    assert parse_recurrence_input(text, DTSTART) is None
+
+def test_next_occurrence():
+    reminder = Reminder(scheduled_time=DTSTART, recurrence_rule="FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;COUNT=3",
+                        recurrence_start=DTSTART)
+    # Понедельник 09:00 -> вторник, затем среда; после третьего повтора - None
+    assert reminder.next_occurrence(DTSTART) == datetime(2024, 1, 2, 9, 0)
+    assert reminder.next_occurrence(datetime(2024, 1, 2, 9, 0)) == datetime(2024, 1, 3, 9, 0)
+    assert reminder.next_occurrence(datetime(2024, 1, 3, 9, 0)) is None
+    assert Reminder(scheduled_time=DTSTART).next_occurrence(DTSTART) is None
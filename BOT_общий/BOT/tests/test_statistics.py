@@ -0,0 +1,48 @@
+"""
+Счётчики статистики: синхронный CRUD меняет их так же, как асинхронный, без сверки
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from database.database import SessionLocal
+from database.crud import UserCRUD, TaskCRUD, ReminderCRUD, EventCRUD, StatisticCRUD
+from database.models import Statistic, TaskStatus
+
+pytestmark = pytest.mark.usefixtures('db_schema')
+
+def counters(db, user_id: int) -> dict:
+    stat = db.query(Statistic).filter(Statistic.user_id == user_id).one()
+    db.refresh(stat)
+    return {
+        'total_tasks': stat.total_tasks,
+        'completed_tasks': stat.completed_tasks,
+        'in_progress_tasks': stat.in_progress_tasks,
+        'total_reminders': stat.total_reminders,
+        'total_events': stat.total_events,
+    }
+
+def test_sync_crud_keeps_counters():
+    db = SessionLocal()
+    try:
+        user = UserCRUD.get_or_create(db, telegram_id=800)
+        tasks = [TaskCRUD.create(db, user.id, f"Задача {i}") for i in range(3)]
+        TaskCRUD.update_status(db, tasks[0].id, TaskStatus.IN_PROGRESS.value)
+        TaskCRUD.update_status(db, tasks[1].id, TaskStatus.COMPLETED.value)
+        TaskCRUD.update_status(db, tasks[0].id, TaskStatus.COMPLETED.value)
+        TaskCRUD.delete(db, tasks[1].id)
+        reminder = ReminderCRUD.create(db, user.id, "Напоминание", scheduled_time=datetime(2024, 1, 1))
+        ReminderCRUD.create(db, user.id, "Ещё одно", scheduled_time=datetime(2024, 1, 2))
+        ReminderCRUD.delete(db, reminder.id)
+        start = datetime(2024, 1, 1, 10, 0)
+        EventCRUD.create(db, user.id, "Пара", start, start + timedelta(hours=1))
+
+        expected = {
+            'total_tasks': 2, 'completed_tasks': 1, 'in_progress_tasks': 0,
+            'total_reminders': 1, 'total_events': 1,
+        }
+        assert counters(db, user.id) == expected
+        # Пересчёт по таблицам даёт то же самое
+        StatisticCRUD.update_stats(db, user.id)
+        assert counters(db, user.id) == expected
+    finally:
+        db.close()
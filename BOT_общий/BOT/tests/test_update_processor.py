@@ -0,0 +1,59 @@
+"""
+KeyedUpdateProcessor: порядок обновлений одного пользователя и общий лимит параллельности
+"""
+
+import asyncio
+from telegram import Update
+from bot.utils.update_processor import KeyedUpdateProcessor
+
+def make_update(update_id: int, user_id: int) -> Update:
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': str(update_id),
+        },
+    }, None)
+
+async def process_all(processor: KeyedUpdateProcessor, updates: list, delays: dict) -> dict:
+    """Обработать обновления; вернуть порядок по пользователям и максимум одновременных"""
+    order = {}
+    state = {'running': 0, 'max_running': 0}
+
+    async def handle(update: Update):
+        state['running'] += 1
+        state['max_running'] = max(state['max_running'], state['running'])
+        await asyncio.sleep(delays[update.update_id])
+        order.setdefault(update.effective_user.id, []).append(update.update_id)
+        state['running'] -= 1
+
+    await asyncio.gather(*(processor.process_update(update, handle(update)) for update in updates))
+    assert processor.pending() == 0
+    return {'order': order, 'max_running': state['max_running']}
+
+def test_same_user_in_arrival_order():
+    processor = KeyedUpdateProcessor(concurrency=4)
+    updates = [make_update(i, user_id=1 + i % 2) for i in range(8)]
+    # Ранние обновления спят дольше: без блокировки пользователя порядок перевернулся бы
+    delays = {update.update_id: 0.01 * (8 - update.update_id) for update in updates}
+
+    result = asyncio.run(process_all(processor, updates, delays))
+    assert result['order'] == {1: [0, 2, 4, 6], 2: [1, 3, 5, 7]}
+    # Разные пользователи при этом обрабатываются одновременно
+    assert result['max_running'] == 2
+
+def test_concurrency_limit():
+    processor = KeyedUpdateProcessor(concurrency=3)
+    updates = [make_update(i, user_id=100 + i) for i in range(10)]
+    delays = {update.update_id: 0.01 for update in updates}
+
+    result = asyncio.run(process_all(processor, updates, delays))
+    assert result['max_running'] == 3
+    assert sorted(result['order']) == [100 + i for i in range(10)]
+
+def test_updates_without_user_are_not_ordered():
+    assert KeyedUpdateProcessor.key(object()) is None
+    assert KeyedUpdateProcessor.key(make_update(1, user_id=42)) == 42
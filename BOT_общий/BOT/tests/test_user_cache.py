@@ -0,0 +1,54 @@
+"""
+Кеш пользователей: смена роли внутри единицы работы сбрасывает кеш после фиксации
+"""
+
+import pytest
+from database.database import AsyncSessionLocal
+from database.crud_async import AsyncUserCRUD
+from database.cache import user_cache
+from bot.utils.session import UpdateSession
+
+pytestmark = pytest.mark.usefixtures('db_schema')
+
+async def read_role(telegram_id: int) -> str:
+    """Роль глазами другого обновления (своя сессия)"""
+    db = AsyncSessionLocal()
+    try:
+        return (await AsyncUserCRUD.get_identity(db, telegram_id)).role
+    finally:
+        await db.close()
+
+def test_role_change_invalidated_after_commit(run):
+    async def scenario():
+        db = AsyncSessionLocal()
+        try:
+            await AsyncUserCRUD.get_or_create(db, telegram_id=700)
+        finally:
+            await db.close()
+
+        holder = UpdateSession(700)
+        await AsyncUserCRUD.set_admin(holder.get(), 700, 'ADMIN')
+        # До фиксации параллельное обновление видит и кеширует старую роль
+        before_commit = await read_role(700)
+        await holder.finish()
+        return before_commit, await read_role(700)
+
+    user_cache.clear()
+    assert run(scenario()) == ('STUDENT', 'ADMIN')
+
+def test_rolled_back_role_change_not_cached(run):
+    async def scenario():
+        db = AsyncSessionLocal()
+        try:
+            await AsyncUserCRUD.get_or_create(db, telegram_id=701)
+        finally:
+            await db.close()
+
+        holder = UpdateSession(701)
+        await AsyncUserCRUD.set_admin(holder.get(), 701, 'ADMIN')
+        holder.failed = True
+        await holder.finish()
+        return await read_role(701)
+
+    user_cache.clear()
+    assert run(scenario()) == 'STUDENT'